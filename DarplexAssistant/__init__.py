@@ -1,11 +1,10 @@
-from .game import *
-from .monitor import *
-from .repository import *
-from .server import *
+from . import game, monitor, repository, server
+from ._lazy import attach
 
-__all__ = (
-        *game.__all__,
-        *monitor.__all__,
-        *repository.__all__,
-        *server.__all__
-        )
+# Subpackages only map names to modules here; nothing heavy is imported until a name is used.
+__getattr__, __dir__, __all__ = attach(__name__, {
+    **dict.fromkeys(game.__all__, '.game'),
+    **dict.fromkeys(monitor.__all__, '.monitor'),
+    **dict.fromkeys(repository.__all__, '.repository'),
+    **dict.fromkeys(server.__all__, '.server'),
+})
@@ -0,0 +1,36 @@
+from importlib import import_module
+import sys
+from types import ModuleType
+from typing import Any, Callable
+
+
+def attach(package: str, exports: dict[str, str]) -> tuple[Callable[[str], Any], Callable[[], list[str]], tuple[str, ...]]:
+    """Lazy re-exports for a package `__init__`: returns its `__getattr__`, `__dir__` and `__all__`.
+    `exports` maps each public name to the (relative) module defining it; the module is only
+    imported when the name is first accessed, then the name is cached on the package.
+
+        __getattr__, __dir__, __all__ = attach(__name__, {'RedisRepository': '.redis_repository'})
+    """
+    module = sys.modules[package]
+    namespace = module.__dict__
+
+    def __getattr__(name: str) -> Any:
+        if (source := exports.get(name)) is None:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        value = getattr(import_module(source, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*namespace, *exports})
+
+    class LazyPackage(ModuleType):
+        def __setattr__(self, name: str, value: Any) -> None:
+            # Importing a submodule binds it on its package. If it shares its name with
+            # what it exports (`scripts.start_server`), keep the export resolvable instead.
+            if isinstance(value, ModuleType) and value.__name__ == package + exports.get(name, '\0'):
+                return
+            super().__setattr__(name, value)
+
+    module.__class__ = LazyPackage
+    return __getattr__, __dir__, tuple(exports)
@@ -0,0 +1,317 @@
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+import json
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, TextIO
+
+from .repository.key_browser import KEY_PAGE_SIZE, KEY_SCAN_COUNT, KeyInfo, PrefixStats
+
+# Commands import what they use (redis alone takes longer to import than the rest of a
+# `--help` run), see `benchmarks/import_time.py`.
+if TYPE_CHECKING:
+    from .monitor.fleet_view import FleetView, GroupView
+    from .server.minecraft_server_snapshot import MinecraftServerSnapshot
+
+
+def format_servers(fleet: 'FleetView') -> list[str]:
+    """All servers and their online statuses (`printservers`), one entry per line."""
+    if len(fleet.groups) == 0:
+        return ['No ServerGroups found.']
+    lines: list[str] = []
+    largest_output_str_len = max(len(f'[servergroups.{prefix}] |') for prefix in fleet.groups)
+    for prefix, view in fleet.groups.items():
+        output_str = f'[servergroups.{prefix}]'
+        output_str += ' ' * (largest_output_str_len - len(output_str) - 1) + '| '
+        init_output_len = len(output_str)
+        online_servers = view.online_servers
+        status = 'Online' if len(online_servers) > 0 else 'Offline'
+        output_str += f'Port Section: {view.group.portSection} | Servers {status} '
+        if len(online_servers) > 0:
+            output_str += f'| Players: {view.player_count} ' \
+                          f'| {len(online_servers)}/{len(view.servers)} servers launched ' \
+                           '|'
+        lines.append(output_str)
+        indent = ' ' * (init_output_len - 2)
+        lines.extend(f'{indent}'
+                     f'| {online_serv.name} '
+                     f'| Port: {online_serv.port} '
+                     f'| Players: {online_serv.player_count}/{online_serv.max_player_count} '
+                      '|'
+                     for online_serv in online_servers)
+    return lines
+
+
+def format_server_statuses(fleet: 'FleetView') -> list[str]:
+    """Detailed server uptime statistics of `fleet` (`server-status-info`), one entry per line."""
+    lines: list[str] = []
+    max_ram = 0
+    ram_usage = 0
+    if len(fleet.groups) == 0:
+        return ['No ServerGroups found.']
+    for prefix, view in fleet.groups.items():
+        server_group = view.group
+        online_servers = view.online_servers
+        offline_servers = view.offline_servers
+        lines.append(f'- {prefix}:')
+        lines.append(f'    - Port Section: {server_group.portSection}')
+        lines.append(f'    - Max Ram: {server_group.ram}MB')
+        lines.append(f'    - Total Servers: {server_group.totalServers}')
+        lines.append(f'    - Joinable Servers: {server_group.joinableServers}')
+        if len(online_servers) + len(offline_servers) > 0:
+            lines.append(f'    - Servers Launched: {len(online_servers)}/{len(view.servers)}')
+            lines.append(f'    - Total Players: {view.player_count}')
+            lines.append(f'    - Servers:')
+        for online_server in online_servers:
+            max_ram += server_group.ram
+            ram = online_server.ram
+            ram_usage += ram
+            lines.append(f'        - {online_server.name} (Online):')
+            lines.append(f'            - Port: {online_server.port}')
+            lines.append(f'            - Startup Date: {online_server.start_up_date}')
+            lines.append(f'            - Uptime: {online_server.uptime} hours')
+            lines.append(f'            - RAM usage: {ram}MB/{server_group.ram}MB')
+            lines.append(f'            - Players: {online_server.player_count}/{server_group.maxPlayers}')
+            if online_server.game is not None:
+                lines.append(f'            - Arcade Stats:')
+                lines.append(f'                - Game: {online_server.game}')
+                lines.append(f'                - Mode: {online_server.mode}')
+                lines.append(f'                - Status: {online_server.status.value}') # type: ignore
+                lines.append(f'                - Joinable: {online_server.joinable.value}') # type: ignore
+        for offline_server in offline_servers:
+            lines.append(f'        - {offline_server.name} (Offline):')
+            lines.append(f'            - Port: {offline_server.port}')
+            lines.append(f'            - Offline since: {offline_server.current_time}')
+            lines.append(f'            - Last uptime: {offline_server.uptime} hours')
+        lines.append('')
+    if max_ram != 0:
+        lines.append(f'Total ram usage: {ram_usage}MB/{max_ram}MB; {round((ram_usage / max_ram) * 100)}% of ram allocated has been used.')
+    return lines
+
+
+def format_key_info(info: KeyInfo) -> str:
+    """One `redis-info` row: key, then `TYPE`, `MEMORY USAGE` and `TTL` if fetched."""
+    if info.type is None and info.memory is None and info.ttl is None:
+        return info.key
+    key_type = info.type or '-'
+    memory = f'{info.memory}B' if info.memory is not None else '-'
+    ttl = {None: '-', -1: 'none', -2: 'gone'}.get(info.ttl, f'{info.ttl}s')
+    return f'{info.key} | {key_type} | {memory} | TTL {ttl}'
+
+
+def format_prefix_stats(stats: list[PrefixStats]) -> list[str]:
+    """`redis-info` summary rows: prefix, key count and memory."""
+    if len(stats) == 0:
+        return ['No keys found.']
+    width = max(len(prefix_stats.prefix) for prefix_stats in stats)
+    return [f'{prefix_stats.prefix.ljust(width)} | {prefix_stats.keys} keys | {prefix_stats.memory / 1024:.1f}KB'
+            for prefix_stats in stats]
+
+
+def snapshot_to_dict(server: 'MinecraftServerSnapshot') -> dict[str, Any]:
+    return {
+        'name': server.name,
+        'group': server.group,
+        'region': server.region.value,
+        'online': server.is_online,
+        'address': server.public_address,
+        'port': server.port,
+        'players': server.player_count,
+        'maxPlayers': server.max_player_count,
+        'ram': server.ram,
+        'maxRam': server.max_ram,
+        'tps': server.tps,
+        'startUpDate': server.start_up_date.isoformat(),
+        'currentTime': server.current_time.isoformat(),
+        'uptimeSeconds': int(server.uptime.total_seconds()),
+        'game': server.game,
+        'mode': server.mode,
+        'status': server.status.value if server.status is not None else None,
+        'joinable': server.joinable.value if server.joinable is not None else None,
+    }
+
+
+def group_to_dict(view: 'GroupView', details: bool = False) -> dict[str, Any]:
+    """`printservers` lists online servers briefly; with `details` every server is listed in full."""
+    online_servers = view.online_servers
+    if details:
+        servers = [snapshot_to_dict(server) for server in view.servers]
+    else:
+        servers = [{'name': server.name,
+                    'port': server.port,
+                    'players': server.player_count,
+                    'maxPlayers': server.max_player_count}
+                   for server in online_servers]
+    return {
+        'prefix': view.group.prefix,
+        'portSection': view.group.portSection,
+        'ram': view.group.ram,
+        'totalServers': view.group.totalServers,
+        'joinableServers': view.group.joinableServers,
+        'serversOnline': len(online_servers),
+        'serversLaunched': len(view.servers),
+        'players': view.player_count,
+        'servers': servers,
+    }
+
+
+def write_records(records: Iterable[dict[str, Any]], output_format: str, out: TextIO) -> None:
+    """Writes `records` as one JSON array or as NDJSON, one record at a time."""
+    if output_format == 'ndjson':
+        for record in records:
+            out.write(json.dumps(record) + '\n')
+        return
+    out.write('[')
+    for i, record in enumerate(records):
+        out.write((',\n' if i else '\n') + json.dumps(record))
+    out.write('\n]\n')
+
+
+def write_lines(lines: Iterable[str], out: TextIO) -> None:
+    for line in lines:
+        out.write(line + '\n')
+
+
+def parse_scale(value: str) -> tuple[str, int]:
+    """`+N`/`-N` -> `('add', ±N)`, `N` -> `('set', N)`."""
+    try:
+        count = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f'expected +N, -N or N, got {value!r}') # argparse hides ValueError messages
+    return ('add', count) if value[:1] in '+-' else ('set', count)
+
+
+def _print_servers(args: Namespace, out: TextIO) -> int:
+    from .monitor.fleet_view import get_fleet_view
+
+    fleet = get_fleet_view()
+    if args.format == 'text':
+        write_lines(format_servers(fleet), out)
+    else:
+        write_records((group_to_dict(view) for view in fleet.groups.values()), args.format, out)
+    return 0
+
+
+def _server_status_info(args: Namespace, out: TextIO) -> int:
+    from .monitor.fleet_view import get_fleet_view
+
+    fleet = get_fleet_view()
+    if args.format == 'text':
+        write_lines(format_server_statuses(fleet), out)
+    else:
+        write_records((group_to_dict(view, details=True) for view in fleet.groups.values()), args.format, out)
+    return 0
+
+
+def _scale(args: Namespace, out: TextIO) -> int:
+    from .repository.redis_repository import get_redis_repo
+    from .server.server_cache import invalidate_server_group
+
+    mode, count = args.count
+    with get_redis_repo() as repo:
+        if mode == 'add':
+            total_servers = repo.scale_total_servers(args.prefix, count)
+        else:
+            total_servers = repo.set_total_servers(args.prefix, count)
+    invalidate_server_group(args.prefix)
+    if total_servers is None:
+        print(f'darplex: ServerGroup {args.prefix} does not exist', file=sys.stderr)
+        return 1
+    if args.format == 'text':
+        out.write(f'{args.prefix} totalServers: {total_servers}\n')
+    else:
+        write_records(({'prefix': args.prefix, 'totalServers': total_servers},), args.format, out)
+    return 0
+
+
+def _redis_info(args: Namespace, out: TextIO) -> int:
+    from .repository.redis_repository import get_redis_repo
+
+    with get_redis_repo() as repo:
+        browser = repo.browse_keys(args.pattern, args.count)
+        if args.summary:
+            stats = browser.summarize(memory=not args.no_memory)
+            if args.format == 'text':
+                write_lines(format_prefix_stats(stats), out)
+            else:
+                write_records(({'prefix': prefix_stats.prefix,
+                                'keys': prefix_stats.keys,
+                                'memory': prefix_stats.memory}
+                               for prefix_stats in stats), args.format, out)
+            return 0
+        infos = _limit((info for page in browser.pages(KEY_PAGE_SIZE, args.details) for info in page), args.limit)
+        if args.format == 'text':
+            write_lines(map(format_key_info, infos), out)
+        elif args.details:
+            write_records(({'key': info.key, 'type': info.type, 'memory': info.memory, 'ttl': info.ttl}
+                           for info in infos), args.format, out)
+        else:
+            write_records(({'key': info.key} for info in infos), args.format, out)
+    return 0
+
+
+def _limit(infos: Iterator[KeyInfo], limit: int) -> Iterator[KeyInfo]:
+    for i, info in enumerate(infos):
+        if limit and i >= limit:
+            return
+        yield info
+
+
+def build_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog='darplex', description='DarplexAssistant commands for scripts and cron jobs.')
+    output = ArgumentParser(add_help=False)
+    formats = output.add_mutually_exclusive_group()
+    formats.add_argument('--json', dest='format', action='store_const', const='json', help='one JSON array')
+    formats.add_argument('--ndjson', dest='format', action='store_const', const='ndjson', help='one JSON object per line')
+    output.set_defaults(format='text')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    printservers = commands.add_parser('printservers', parents=[output],
+                                       help='all servers and their online statuses')
+    printservers.set_defaults(handler=_print_servers)
+
+    status_info = commands.add_parser('server-status-info', parents=[output],
+                                      help='detailed server uptime statistics')
+    status_info.set_defaults(handler=_server_status_info)
+
+    scale = commands.add_parser('scale', parents=[output], help="change a ServerGroup's totalServers")
+    scale.add_argument('prefix', help='ServerGroup prefix, e.g. MB')
+    scale.add_argument('count', type=parse_scale, help='+N or -N to scale by N, N to set')
+    scale.set_defaults(handler=_scale)
+
+    redis_info = commands.add_parser('redis-info', parents=[output], help='list or summarize redis keys')
+    redis_info.add_argument('--pattern', default='*', help="SCAN MATCH pattern (default '*')")
+    redis_info.add_argument('--count', type=int, default=KEY_SCAN_COUNT, help='SCAN COUNT hint')
+    redis_info.add_argument('--limit', type=int, default=0, help='stop after N keys (default: all)')
+    modes = redis_info.add_mutually_exclusive_group()
+    modes.add_argument('--details', action='store_true', help='add TYPE, MEMORY USAGE and TTL')
+    modes.add_argument('--summary', action='store_true', help='key count and memory by prefix')
+    redis_info.add_argument('--no-memory', action='store_true', help='skip MEMORY USAGE in --summary')
+    redis_info.set_defaults(handler=_redis_info)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None, out: TextIO = sys.stdout) -> int:
+    """
+    Non-interactive entry point: runs one command per process, for cron jobs and scripts.
+    Returns the exit code.
+
+        darplex printservers [--json | --ndjson]
+        darplex server-status-info [--json | --ndjson]
+        darplex scale MB +5          (relative: +N / -N, absolute: N)
+        darplex redis-info [--pattern 'serverstatus.*'] [--details | --summary] [--limit N]
+
+    `--json` writes one JSON array, `--ndjson` one JSON object per line (streamed as it's fetched).
+    Errors go to stderr with exit code 1.
+    """
+    args = build_parser().parse_args(argv)
+    from redis.exceptions import RedisError
+
+    try:
+        return args.handler(args, out)
+    except RedisError as e:
+        print(f'darplex: redis error: {e}', file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output closed early (e.g. `| head`); don't let the interpreter complain on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
@@ -1,3 +1,10 @@
-from .game_options import Game, GameOptions
+from typing import TYPE_CHECKING
+from .._lazy import attach
 
-__all__ = ('GameOptions', 'Game')
+if TYPE_CHECKING:
+    from .game_options import Game, GameOptions
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'GameOptions': '.game_options',
+    'Game': '.game_options',
+})
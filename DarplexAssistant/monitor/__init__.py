@@ -1,4 +1,29 @@
+from typing import TYPE_CHECKING
+from .._lazy import attach
 
-from .monitor_repository import MonitorRepository, get_monitor_repo
+if TYPE_CHECKING:
+    from .async_monitor_repository import AsyncMonitorRepository, get_async_monitor_repo
+    from .fleet_view import FleetFrame, FleetPoller, FleetView, GroupView, get_fleet_view, get_refresh_interval
+    from .monitor_repository import MonitorRepository, get_monitor_repo
+    from .placement import Node, PlacementPlan, PlacementScheduler, get_placement_scheduler
+    from .ram_ledger import RamLedger, RamStats, get_ram_ledger
 
-__all__ = ('MonitorRepository', 'get_monitor_repo')
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'MonitorRepository': '.monitor_repository',
+    'get_monitor_repo': '.monitor_repository',
+    'AsyncMonitorRepository': '.async_monitor_repository',
+    'get_async_monitor_repo': '.async_monitor_repository',
+    'RamLedger': '.ram_ledger',
+    'RamStats': '.ram_ledger',
+    'get_ram_ledger': '.ram_ledger',
+    'Node': '.placement',
+    'PlacementPlan': '.placement',
+    'PlacementScheduler': '.placement',
+    'get_placement_scheduler': '.placement',
+    'FleetView': '.fleet_view',
+    'GroupView': '.fleet_view',
+    'get_fleet_view': '.fleet_view',
+    'FleetFrame': '.fleet_view',
+    'FleetPoller': '.fleet_view',
+    'get_refresh_interval': '.fleet_view',
+})
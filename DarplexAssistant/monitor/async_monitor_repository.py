@@ -0,0 +1,129 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional, Self
+
+from ..repository import AsyncRedisRepository
+from ..repository.redis_repository import SERVER_STATUS_BATCH_SIZE
+from ..scripts import stop_server
+from ..server import MinecraftServer, MinecraftServerSnapshot, ServerGroup
+from ..utils import get_settings_loader, Region, SettingsLoader
+from .monitor_repository import LEDGER_MAX_AGE_SECONDS, MonitorRepository
+from .ram_ledger import get_ram_ledger, RamLedger
+
+
+class AsyncMonitorRepository:
+    """asyncio variant of `MonitorRepository`.
+    Same methods, awaited; iterators are async generators.
+    Blocking work (server teardown) runs in a worker thread.
+    """
+
+    def __init__(self, repository: AsyncRedisRepository, settings: Optional[SettingsLoader] = None) -> None:
+        self.repository = repository
+        self.settings = settings or get_settings_loader()
+
+    async def close(self) -> None:
+        """Closes the AsyncMonitorRepository session."""
+        await self.repository.close_connection()
+
+    async def get_all_server_groups(self) -> AsyncIterator[ServerGroup]:
+        """
+        Returns async Iterator of all Redis ServerGroups mapped to `ServerGroup` objects.
+        All hashes are fetched in one pipelined round trip.
+        """
+        groups = [group async for group in self.repository.get_server_groups()]
+        for data in (await self.repository.get_server_group_dicts(groups)).values():
+            yield ServerGroup.from_server_group_dict(data)
+
+    get_region_by_server_status = staticmethod(MonitorRepository.get_region_by_server_status)
+    snapshot_of = staticmethod(MonitorRepository.snapshot_of)
+
+    async def get_server_snapshots(self, batch_size: int = SERVER_STATUS_BATCH_SIZE) -> AsyncIterator[MinecraftServerSnapshot]:
+        """Returns async Iterator of `MinecraftServerSnapshot`, one per ServerStatus cache.
+        Malformed caches are skipped (see `MonitorRepository.snapshot_of`)."""
+        async for key, server_status in self.repository.load_server_statuses(batch_size):
+            if (snapshot := self.snapshot_of(key, server_status)) is not None:
+                yield snapshot
+
+    async def get_minecraft_servers(self, batch_size: int = SERVER_STATUS_BATCH_SIZE) -> AsyncIterator[MinecraftServer]:
+        """Returns async Iterator of `MinecraftServer` built from `get_server_snapshots`."""
+        async for snapshot in self.get_server_snapshots(batch_size):
+            yield MinecraftServer.from_snapshot(snapshot)
+
+    async def get_minecraft_servers_by_region(self, region: Region) -> AsyncIterator[MinecraftServer]:
+        """Returns MinecraftServers by matching region"""
+        async for server in self.get_minecraft_servers():
+            if server.region == region:
+                yield server
+
+    async def get_minecraft_server_by_group(self, group: str, region: Region) -> AsyncIterator[MinecraftServer]:
+        async for server in self.get_minecraft_servers():
+            if server.group == group and server.region == region:
+                yield server
+
+    async def get_alive_servers(self, region: Optional[Region] = None) -> AsyncIterator[MinecraftServerSnapshot]:
+        """
+        Returns async Iterator of all online `MinecraftServerSnapshot`s.
+        Optional: `region` filters by `Region`.
+        """
+        async for server in self.get_server_snapshots():
+            if server.is_online and (region in (None, Region.ALL) or server.region == region):
+                yield server
+
+    async def get_dead_servers(self) -> AsyncIterator[MinecraftServerSnapshot]:
+        """Returns async Iterator of all dead `MinecraftServerSnapshot`."""
+        async for server in self.get_server_snapshots():
+            if not server.is_online:
+                yield server
+
+    async def get_ram_in_use(self) -> int:
+        """Returns total ram in use for all online `MinecraftServer`."""
+        return sum([server.ram async for server in self.get_alive_servers()])
+
+    async def get_ram_ledger(self) -> RamLedger:
+        """Returns the process-wide `RamLedger`, synced from Redis if it is stale."""
+        ledger = get_ram_ledger()
+        ledger.max_ram = self.settings.get().max_ram
+        if not ledger.is_fresh(LEDGER_MAX_AGE_SECONDS):
+            ledger.sync([server async for server in self.get_server_snapshots()])
+        return ledger
+
+    async def get_if_enough_ram_allocated(self, server_group: ServerGroup, count: int = 1) -> bool:
+        """Returns if enough ram is allocated for `count` `MinecraftServer` of type `ServerGroup` to be deployed."""
+        return (await self.get_ram_ledger()).can_admit(server_group.ram * count)
+
+    async def reserve_ram(self, server_group: ServerGroup, server_nums: Iterable[int]) -> list[int]:
+        """Reserves ram for each of `server_nums` until the `ram` limit is reached. Returns the reserved ones."""
+        ledger = await self.get_ram_ledger()
+        return [server_num
+                for server_num in server_nums
+                if ledger.reserve(f'{server_group.prefix}-{server_num}', server_group.prefix, server_group.ram)]
+
+    async def kill_dead_servers(self) -> AsyncIterator[MinecraftServerSnapshot]:
+        """Kills dead servers concurrently, yielding each one as it is stopped."""
+        async def kill(server: MinecraftServerSnapshot) -> MinecraftServerSnapshot:
+            await asyncio.to_thread(stop_server, server.name)
+            return server
+
+        dead_servers = [server async for server in self.get_dead_servers()]
+        for task in asyncio.as_completed([kill(server) for server in dead_servers]):
+            try:
+                yield await task
+            except Exception:
+                continue
+
+    @classmethod
+    def create_session(cls) -> Self:
+        """Creates an AsyncMonitorRepository session using `config.toml` connection information."""
+        return cls(AsyncRedisRepository.create_session())
+
+
+@asynccontextmanager
+async def get_async_monitor_repo() -> AsyncIterator[AsyncMonitorRepository]:
+    """For quick async session in `AsyncMonitorRepository`.
+    Closes the underlying `AsyncRedisRepository` after the block exits.
+    """
+    repository = AsyncMonitorRepository.create_session()
+    try:
+        yield repository
+    finally:
+        await repository.close()
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import logging
+from threading import Event, Thread
+from time import monotonic, perf_counter
+from typing import Callable, Optional, Self
+
+from ..server import MinecraftServerSnapshot, ServerGroup
+from ..utils import Region, get_settings
+from .monitor_repository import MonitorRepository, get_monitor_repo
+
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 2.0
+STOP_TIMEOUT_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class GroupView:
+    """A `ServerGroup` with the snapshots of its servers (in its region)."""
+    group: ServerGroup
+    servers: list[MinecraftServerSnapshot] = field(default_factory=list)
+
+    @property
+    def online_servers(self) -> list[MinecraftServerSnapshot]:
+        return [server for server in self.servers if server.is_online]
+
+    @property
+    def offline_servers(self) -> list[MinecraftServerSnapshot]:
+        return [server for server in self.servers if not server.is_online]
+
+    @property
+    def player_count(self) -> int:
+        return sum(server.player_count for server in self.servers if server.is_online)
+
+
+@dataclass(frozen=True)
+class FleetView:
+    """Every ServerGroup and ServerStatus, fetched at once. Rendering it makes no Redis calls.
+    `groups` is sorted by prefix, servers of a group by server number."""
+    groups: dict[str, GroupView]
+    fetch_seconds: float = 0.0
+
+
+def _server_order(server: MinecraftServerSnapshot) -> tuple[int, str]:
+    _, _, num = server.name.rpartition('-')
+    return int(num) if num.isdigit() else 0, server.name
+
+
+def get_fleet_view(repository: Optional[MonitorRepository] = None) -> FleetView:
+    """Fetches a `FleetView`: one pipelined round trip for all ServerGroup hashes
+    and one `MGET` per `SERVER_STATUS_BATCH_SIZE` ServerStatus keys."""
+    started = perf_counter()
+    if repository is None:
+        with get_monitor_repo() as repo:
+            return get_fleet_view(repo)
+    groups = sorted(repository.get_all_server_groups(), key=lambda group: group.prefix)
+    servers_by_group: dict[str, list[MinecraftServerSnapshot]] = {}
+    for snapshot in repository.get_server_snapshots():
+        servers_by_group.setdefault(snapshot.group, []).append(snapshot)
+    views = dict((group.prefix, GroupView(group, sorted((server
+                                                         for server in servers_by_group.get(group.prefix, [])
+                                                         if group.region == Region.ALL or server.region == group.region),
+                                                        key=_server_order)))
+                 for group in groups)
+    return FleetView(views, perf_counter() - started)
+
+
+@dataclass(frozen=True)
+class FleetFrame:
+    """Rendered lines of the latest `FleetView` fetched by a `FleetPoller`.
+    `error` is set if the last fetch failed; `lines` are then from the last good one."""
+    version: int
+    lines: tuple[str, ...] = ()
+    fetched_at: Optional[datetime] = None
+    fetch_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class FleetPoller:
+    """Fetches a `FleetView` every `interval` seconds on a background thread
+    and renders it with `render`. Readers take `frame`, which never touches Redis,
+    so a slow or unreachable Redis only makes frames older."""
+
+    def __init__(self, render: Callable[[FleetView], list[str]], interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        self.render = render
+        self.interval = interval
+        self._frame = FleetFrame(0)
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def frame(self) -> FleetFrame:
+        return self._frame
+
+    def poll(self, repository: MonitorRepository) -> FleetFrame:
+        """Fetches and renders once, then publishes the new frame."""
+        previous = self._frame
+        try:
+            fleet = get_fleet_view(repository)
+            frame = FleetFrame(previous.version + 1, tuple(self.render(fleet)), datetime.now(), fleet.fetch_seconds)
+        except Exception as e:
+            logger.warning('Fleet poll failed: %s', e)
+            frame = FleetFrame(previous.version + 1, previous.lines, previous.fetched_at, previous.fetch_seconds, str(e))
+        self._frame = frame
+        return frame
+
+    def _run(self) -> None:
+        with get_monitor_repo() as repo:
+            while not self._stop.is_set():
+                started = monotonic()
+                self.poll(repo)
+                self._stop.wait(max(0.0, self.interval - (monotonic() - started)))
+
+    def start(self) -> None:
+        """Starts polling. If a stopped poller is still finishing its fetch, waits for it first,
+        so there is never more than one poller."""
+        if self._thread is not None:
+            if not self._stop.is_set():
+                return
+            self._thread.join()
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name='fleet-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS) -> None:
+        """Stops polling and waits up to `timeout` seconds for the poller to exit.
+        A fetch taking longer is left to finish on its own (the thread is a daemon)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def get_refresh_interval() -> float:
+    """Returns `refresh_interval` of `dashboard`."""
+    return float(get_settings().dashboard.get('refresh_interval', REFRESH_INTERVAL_SECONDS))
@@ -1,61 +1,90 @@
-from pathlib import Path
-from time import perf_counter, sleep
-from typing import Callable
-import toml
+from functools import cache
+from typing import Optional
 
-from DarplexAssistant.utils.redis_utils import CONFIG_PATH
-from ..utils import create_config_if_not_exists, DEFAULT_TOML_CONF
+from ..repository import ChangeFeed, get_shared_repository
+from ..scripts import get_reaper, get_standby_pool
+from ..utils import get_settings_loader
 from ..server import MinecraftServer
-
-
-create_config_if_not_exists()
-
-with open(CONFIG_PATH, 'r') as fp:
-    data = toml.load(fp).get('server_monitor_options', DEFAULT_TOML_CONF['server_monitor_options'])
-
-
-MAX_RAM: int = data.get('ram', 512)
-DEFAULT_BASE_DIR = Path.home() / 'mineplex'
-SERVER_DIR = Path(data.get('servers_directory'))
-JARS_DIRECTORY = Path(data.get('jars_directory'))
-WORLD_ZIP_DIR = Path(data.get('world_zip_folder_directory'))
-
-processes: list[Callable[[Callable, int], None]] = []
+from .monitor_repository import get_monitor_repo
+from .placement import get_node_name, get_placement_scheduler
+from .ram_ledger import get_ram_ledger
+from .reconciler import ActionKind, ServerAction, ServerMonitor, plan_reconcile, plan_restarts
+
+
+@cache
+def get_server_monitor() -> ServerMonitor:
+    """Process-wide `ServerMonitor` configured from `server_monitor_options`.
+    Built on first use, so importing this module reads no config and opens no connections."""
+    settings_loader = get_settings_loader()
+    settings = settings_loader.get()
+    data = settings.server_monitor_options
+    return ServerMonitor(tick_interval=data.get('tick_interval', 5),
+                         max_workers=data.get('max_concurrent_actions', 4),
+                         tick_budget=data.get('tick_budget_ms', 250) / 1000,
+                         max_ram=settings.max_ram,
+                         excluded=settings.excluded_servers,
+                         region=settings.region,
+                         feed=(ChangeFeed(get_shared_repository(), configure=data.get('change_feed_configure_redis', False))
+                               if data.get('change_feed', True) else None),
+                         standby=get_standby_pool(),
+                         settings=settings_loader,
+                         ledger=get_ram_ledger(),
+                         scheduler=get_placement_scheduler(),
+                         node_name=get_node_name())
 
 
 def start_or_restart_server(server: MinecraftServer, 
                             reason = '') -> None:
-    cmd = server.get_create_cmd()
     if server.is_online and not server._needs_restart() and reason != 'Restart': # returns
         return # does not need to happen
+    server.restart_server()
 
 
-def check_servers_needing_restart() -> None:
+def check_servers_needing_restart() -> list[ServerAction]:
     """
     Checks when ServerGroup undergoes Restart or shuts down for any apparent reason. 
     """
+    with get_monitor_repo() as repo:
+        return plan_restarts(snapshot 
+                             for snapshot in repo.get_server_snapshots()
+                             if snapshot.group not in get_server_monitor().excluded)
 
 
-def check_server_count_change() -> None:
+def check_server_count_change() -> list[ServerAction]:
     """
     Checks if `totalServers` or `joinableServers` changes for a ServerGroup
-    Using timer
+    Returns the starts and stops needed to match them.
     """
+    with get_monitor_repo() as repo:
+        plan = plan_reconcile(repo.get_all_server_groups(), repo.get_server_snapshots(), get_server_monitor().excluded)
+    return [*plan.starts, *plan.stops]
 
-def check_personal_or_mcs() -> None:
+def check_personal_or_mcs() -> list[ServerAction]:
     """
     Checks if Personal, Community, or Event servers need to be deployed
     """
-    # TODO: Scan `COM`, `EVENT`, *, serverType == 'Player' 
+    with get_monitor_repo() as repo:
+        groups = [group 
+                  for group in repo.get_all_server_groups()
+                  if group.is_player_server() or group.is_event_server()]
+        prefixes = set(group.prefix for group in groups)
+        plan = plan_reconcile(groups, 
+                              (snapshot for snapshot in repo.get_server_snapshots() if snapshot.group in prefixes),
+                              get_server_monitor().excluded)
+    return [action for action in plan.starts if action.kind == ActionKind.START]
 
 
 
 def start() -> None:
-    # TODO: Concurrency module
-    pass
-
-
-def stop() -> None:
-    for process in processes:
-        ...
-
+    """Starts the ServerMonitor reconcile loop in the background,
+    and the `Reaper` so trash left by the previous run is reclaimed."""
+    get_reaper()
+    get_server_monitor().start()
+
+
+def stop(timeout: Optional[float] = None) -> None:
+    """Stops the ServerMonitor and waits for running actions."""
+    monitor = get_server_monitor()
+    monitor.stop(timeout)
+    if monitor.feed is not None:
+        monitor.feed.stop(timeout)
@@ -1,17 +1,24 @@
 from contextlib import contextmanager
-import toml
-from typing import Iterator, Optional, Self
+import logging
+from typing import Iterable, Iterator, Optional, Self
 
-from DarplexAssistant.repository.redis_repository import get_redis_repo
+from DarplexAssistant.repository.redis_repository import SERVER_STATUS_BATCH_SIZE, get_redis_repo
 from DarplexAssistant.utils.region import Region
 from ..repository import RedisRepository 
-from ..server import MinecraftServer, ServerGroup
-from ..utils import CONFIG_PATH, DEFAULT_TOML_CONF
+from ..server import MinecraftServer, MinecraftServerSnapshot, ServerGroup
+from ..utils import get_settings_loader, SettingsLoader
+from .ram_ledger import get_ram_ledger, RamLedger
+
+
+LEDGER_MAX_AGE_SECONDS = 10
+
+logger = logging.getLogger(__name__)
 
 
 class MonitorRepository:
-    def __init__(self, repository: RedisRepository) -> None:
+    def __init__(self, repository: RedisRepository, settings: Optional[SettingsLoader] = None) -> None:
         self.repository = repository
+        self.settings = settings or get_settings_loader()
 
     def close(self) -> None:
         """Closes the MonitorRepository session."""
@@ -23,9 +30,11 @@ class MonitorRepository:
         `ServerGroup` object represents type of Server.
             - Contains vital information about `ram`, `totalServers`
             - `MinecraftServer` objects linked to `ServerGroup` represent deployed servers.
+        All hashes are fetched in one pipelined round trip.
         """
-        yield from map(ServerGroup.convert_to_server_group,
-                       self.repository.get_server_groups())
+        groups = list(self.repository.get_server_groups())
+        yield from map(ServerGroup.from_server_group_dict,
+                       self.repository.get_server_group_dicts(groups).values())
 
     def get_minecraft_servers_by_region(self, region: Region) -> Iterator[MinecraftServer]:
         """Returns MinecraftServers by matching region"""
@@ -38,45 +47,61 @@ class MonitorRepository:
                           for region in Region
                           if region.value in server_status_key)), Region.US)
 
-    def get_minecraft_servers(self) -> Iterator[MinecraftServer]:
+    @classmethod
+    def snapshot_of(cls, key: str, server_status: dict[str, str]) -> Optional[MinecraftServerSnapshot]:
+        """Returns snapshot of the decoded ServerStatus at `key`,
+        or `None` (logged) if it has no `_name` or malformed fields, so one bad cache can't abort a bulk load."""
+        if '_name' not in server_status:
+            return None
+        try:
+            return MinecraftServerSnapshot.from_server_status_dict(server_status, cls.get_region_by_server_status(key))
+        except (ValueError, TypeError, OverflowError) as e:
+            logger.warning('Skipping malformed ServerStatus %s (%s)', key, e)
+            return None
+
+    def get_server_snapshots(self, batch_size: int = SERVER_STATUS_BATCH_SIZE) -> Iterator[MinecraftServerSnapshot]:
+        """
+        Returns Iterator of `MinecraftServerSnapshot`, one per ServerStatus cache.
+        Keys come from the ServerStatus index with one `MGET` per `batch_size` keys;
+        each payload is decoded once and snapshots make no further Redis calls.
+        Malformed caches are skipped (see `snapshot_of`).
+        """
+        for key, server_status in self.repository.load_server_statuses(batch_size):
+            if (snapshot := self.snapshot_of(key, server_status)) is not None:
+                yield snapshot
+
+    def get_minecraft_servers(self, batch_size: int = SERVER_STATUS_BATCH_SIZE) -> Iterator[MinecraftServer]:
         """
         Returns Iterator of `MinecraftServer`.
         Each `MinecraftServer` represents a ServerStatus cache.
         
         Transposes all ServerStatus redis caches into MinecraftServer objects.
+        Built from `get_server_snapshots`, so no per-property Redis calls are made.
         """
-        servers = self.repository.get_available_minecraft_servers()
-        available_minecraft_servers = self.repository.get_available_minecraft_servers()
-        if len(set(available_minecraft_servers).copy()) == 0:
-            yield from ()
-            return
-        servers, regions = zip(*((server, self.get_region_by_server_status(server)) 
-                   for server in self.repository.get_available_minecraft_servers())) # numpy transpose?
-        yield from map(MinecraftServer.convert_to_minecraft_server, servers, regions)
+        yield from map(MinecraftServer.from_snapshot, self.get_server_snapshots(batch_size))
 
     def get_minecraft_server_by_group(self, group: str, region: Region) -> Iterator[MinecraftServer]:
         yield from filter(lambda minecraft_server: minecraft_server.group == group 
                        and minecraft_server.region == region, self.get_minecraft_servers())
 
-    def get_alive_servers(self, region: Optional[Region] = None) -> Iterator[MinecraftServer]:
+    def get_alive_servers(self, region: Optional[Region] = None) -> Iterator[MinecraftServerSnapshot]:
         """
-        Returns Iterator of all online `MinecraftServer`s.
-        `MinecraftServer` represents a ServerStatus cache in Redis.
+        Returns Iterator of all online `MinecraftServerSnapshot`s.
+        `MinecraftServerSnapshot` represents a ServerStatus cache in Redis.
 
-        Optional: `region` filters `MinecraftServer` by `Region`.
+        Optional: `region` filters `MinecraftServerSnapshot` by `Region`.
         """
-        yield from filter(lambda server: (server.exists and
-                                          server.is_online and  
-                                          (server.region == region if region in (Region.US, None) else True)),
-                           self.get_minecraft_servers())
+        yield from filter(lambda server: (server.is_online and
+                                          (region in (None, Region.ALL) or server.region == region)),
+                           self.get_server_snapshots())
 
-    def get_dead_servers(self) -> Iterator[MinecraftServer]:
+    def get_dead_servers(self) -> Iterator[MinecraftServerSnapshot]:
         """
-        Returns Iterator of all dead `MinecraftServer`.
-        MinecraftServer represents a ServerStatus cache in Redis.
+        Returns Iterator of all dead `MinecraftServerSnapshot`.
+        `MinecraftServerSnapshot` represents a ServerStatus cache in Redis.
         """
-        yield from filter(lambda server: server.exists and not server.is_online,
-                           self.get_minecraft_servers())
+        yield from filter(lambda server: not server.is_online,
+                           self.get_server_snapshots())
 
     def get_ram_in_use(self) -> int:
         """
@@ -84,25 +109,39 @@ class MonitorRepository:
         """
         return sum(server.ram for server in self.get_alive_servers())
 
-    def get_if_enough_ram_allocated(self, server_group: ServerGroup) -> bool:
+    def get_ram_ledger(self) -> RamLedger:
+        """Returns the process-wide `RamLedger`, synced from Redis if no sync happened
+        within `LEDGER_MAX_AGE_SECONDS` (the running `ServerMonitor` syncs it every tick)."""
+        ledger = get_ram_ledger()
+        ledger.max_ram = self.settings.get().max_ram
+        if not ledger.is_fresh(LEDGER_MAX_AGE_SECONDS):
+            ledger.sync(self.get_server_snapshots())
+        return ledger
+
+    def get_if_enough_ram_allocated(self, server_group: ServerGroup, count: int = 1) -> bool:
         """
-        Returns if enough ram is allocated for a `MinecraftServer` of type `ServerGroup` to be deployed. 
+        Returns if enough ram is allocated for `count` `MinecraftServer` of type `ServerGroup` to be deployed. 
         `MinecraftServer` is an instance or node created based on `ServerGroup`.
             - Represents deployed Server.
         (`MinecraftServer` has a relationship to `ServerGroup`)
+        Reserved ram of servers still being deployed counts as allocated.
         """
-        with open(CONFIG_PATH, 'r') as fp:
-            max_ram: int = toml.load(fp) \
-                          .get('server_monitor_options', DEFAULT_TOML_CONF['server_monitor_options']) \
-                          .get('ram')
-        return server_group.ram + self.get_ram_in_use() <= max_ram
+        return self.get_ram_ledger().can_admit(server_group.ram * count)
+
+    def reserve_ram(self, server_group: ServerGroup, server_nums: Iterable[int]) -> list[int]:
+        """Reserves ram for each of `server_nums` until the `ram` limit is reached.
+        Returns the server numbers which got a reservation, e.g. for `ServerGroup.deploy_servers`."""
+        ledger = self.get_ram_ledger()
+        return [server_num
+                for server_num in server_nums
+                if ledger.reserve(f'{server_group.prefix}-{server_num}', server_group.prefix, server_group.ram)]
 
     
-    def kill_dead_servers(self) -> Iterator[MinecraftServer]:
+    def kill_dead_servers(self) -> Iterator[MinecraftServerSnapshot]:
         """Kills dead servers"""
         for server in self.get_dead_servers():
             try:
-                server.kill_server()
+                MinecraftServer.from_snapshot(server).kill_server()
             except Exception:
                 continue
             yield server
@@ -0,0 +1,191 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from functools import cache
+import logging
+from math import ceil, inf
+import socket
+from typing import Iterable, Optional
+
+from ..server import MinecraftServerSnapshot, ServerGroup
+from ..utils import get_settings, get_settings_loader, Settings
+
+
+logger = logging.getLogger(__name__)
+
+MAX_GROUP_SHARE = 0.5
+
+
+@dataclass(frozen=True)
+class Node:
+    """A host servers can be placed on. `address` is the `_publicAddress` its servers report.
+    `cpu` is compared against `ServerGroup.cpu`; `None` doesn't limit it."""
+    name: str
+    address: str
+    ram: int
+    cpu: Optional[int] = None
+
+
+@dataclass
+class PlacementPlan:
+    """Output of `PlacementScheduler`.
+    - `placements`: new server name -> node name.
+    - `unplaced`: servers which fit on no node.
+    - `free_ram`/`free_cpu`: per node, after running and placed servers.
+    """
+    placements: dict[str, str] = field(default_factory=dict)
+    unplaced: list[str] = field(default_factory=list)
+    free_ram: dict[str, int] = field(default_factory=dict)
+    free_cpu: dict[str, float] = field(default_factory=dict)
+
+    def for_node(self, node_name: str) -> list[str]:
+        """Returns servers placed on `node_name`."""
+        return [server_name for server_name, node in self.placements.items() if node == node_name]
+
+
+def _server_num(server_name: str) -> int:
+    _, _, num = server_name.rpartition('-')
+    return int(num) if num.isdigit() else 0
+
+
+class _NodeState:
+    __slots__ = ('node', 'free_ram', 'free_cpu', 'group_counts')
+
+    def __init__(self, node: Node) -> None:
+        self.node = node
+        self.free_ram = node.ram
+        self.free_cpu: float = node.cpu if node.cpu is not None else inf
+        self.group_counts: dict[str, int] = {}
+
+    def take(self, group: str, ram: int, cpu: int) -> None:
+        self.free_ram -= ram
+        self.free_cpu -= cpu
+        self.group_counts[group] = self.group_counts.get(group, 0) + 1
+
+
+class PlacementScheduler:
+    """Places servers on `nodes` with best-fit bin packing.
+
+    - Servers are placed in rounds: every group's first server, then every group's second, ...,
+      largest (`ram`, then `cpu`) first within a round. Each goes on the node which is left with
+      the least free RAM that still fits it. RAM is what gets packed; `cpu` only has to fit.
+    - Spread: no node gets more than `max_group_share` of a group's servers
+      (at least an even share over all nodes), so e.g. `SKY` doesn't end up on one box.
+      Placing in rounds spreads every group over the nodes as they fill up, so the cap rarely
+      leaves servers unplaced.
+    - Running servers stay where they are; they are matched to nodes by `_publicAddress`.
+
+    Nodes are kept sorted by free RAM, so placing a server is a bisect plus a scan which
+    usually stops at the first node (the best fit); see `benchmarks/placement.py`.
+    """
+
+    def __init__(self, nodes: Iterable[Node], max_group_share: float = MAX_GROUP_SHARE) -> None:
+        self.nodes = list(nodes)
+        self.max_group_share = max_group_share
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Takes over `nodes` and `max_group_share` of `server_monitor_options`.
+        Removing every node (back to a single machine) needs a restart, so the current nodes are kept."""
+        options = settings.server_monitor_options
+        nodes = get_nodes(options)
+        if len(nodes) == 0:
+            logger.warning('`nodes` of server_monitor_options is empty; keeping %d nodes until a restart', len(self.nodes))
+        else:
+            self.nodes = nodes
+        self.max_group_share = float(options.get('max_group_share', MAX_GROUP_SHARE))
+
+    def get_node(self, name: Optional[str]) -> Optional[Node]:
+        return next((node for node in self.nodes if node.name == name), None)
+
+    def _group_cap(self, total: int) -> int:
+        return max(1, ceil(total / len(self.nodes)), ceil(total * self.max_group_share))
+
+    def place(
+        self,
+        requests: Iterable[tuple[str, ServerGroup]],
+        snapshots: Iterable[MinecraftServerSnapshot] = (),
+        groups: Iterable[ServerGroup] = ()
+    ) -> PlacementPlan:
+        """Places `(server_name, ServerGroup)` requests next to the online `snapshots`.
+        `groups` (defaults to the groups of `requests`) give the RAM of running servers;
+        servers of unknown groups count with the RAM they report."""
+        requests = list(requests)
+        groups_by_prefix = dict((group.prefix, group) for group in groups)
+        groups_by_prefix.update((group.prefix, group) for _, group in requests)
+        states = [_NodeState(node) for node in self.nodes]
+        by_address = dict((state.node.address, state) for state in states)
+        running: set[str] = set()
+        group_totals: dict[str, int] = {}
+        for snapshot in snapshots:
+            if not snapshot.is_online:
+                continue
+            running.add(snapshot.name)
+            group_totals[snapshot.group] = group_totals.get(snapshot.group, 0) + 1
+            if (state := by_address.get(snapshot.public_address)) is not None:
+                group = groups_by_prefix.get(snapshot.group)
+                state.take(snapshot.group,
+                           group.ram if group is not None else max(snapshot.ram, 0),
+                           group.cpu if group is not None else 1)
+        requests = [(server_name, group) for server_name, group in requests if server_name not in running]
+        for _, group in requests:
+            group_totals[group.prefix] = group_totals.get(group.prefix, 0) + 1
+        caps = dict((prefix, self._group_cap(total)) for prefix, total in group_totals.items())
+
+        plan = PlacementPlan()
+        index = sorted((state.free_ram, i) for i, state in enumerate(states))
+        requests.sort(key=lambda request: (_server_num(request[0]), -request[1].ram, -request[1].cpu, request[0]))
+        for server_name, group in requests:
+            cap = caps[group.prefix]
+            chosen = None
+            for position in range(bisect_left(index, (group.ram, -1)), len(index)):
+                state = states[index[position][1]]
+                if state.free_cpu >= group.cpu and state.group_counts.get(group.prefix, 0) < cap:
+                    chosen = position
+                    break
+            if chosen is None:
+                plan.unplaced.append(server_name)
+                continue
+            _, i = index.pop(chosen)
+            states[i].take(group.prefix, group.ram, group.cpu)
+            insort(index, (states[i].free_ram, i))
+            plan.placements[server_name] = states[i].node.name
+        plan.free_ram = dict((state.node.name, state.free_ram) for state in states)
+        plan.free_cpu = dict((state.node.name, state.free_cpu) for state in states)
+        return plan
+
+    def plan(self, groups: Iterable[ServerGroup], snapshots: Iterable[MinecraftServerSnapshot] = ()) -> PlacementPlan:
+        """Places servers 1..`totalServers` of every group which aren't online yet."""
+        groups = list(groups)
+        return self.place(((f'{group.prefix}-{server_num}', group)
+                           for group in groups
+                           for server_num in range(1, group.totalServers + 1)),
+                          snapshots,
+                          groups)
+
+
+def get_node_name() -> str:
+    """Returns `node_name` of `server_monitor_options`, defaulting to the host name."""
+    return get_settings().server_monitor_options.get('node_name') or socket.gethostname()
+
+
+def get_nodes(options: dict) -> list[Node]:
+    """Returns the `Node`s of `nodes` in `options` (`server_monitor_options`)."""
+    return [Node(str(node['name']),
+                 str(node.get('address', node['name'])),
+                 int(node['ram']),
+                 int(node['cpu']) if 'cpu' in node else None)
+            for node in options.get('nodes', [])]
+
+
+@cache
+def get_placement_scheduler() -> Optional[PlacementScheduler]:
+    """Returns a `PlacementScheduler` over `nodes` of `server_monitor_options`,
+    or `None` if no nodes are configured (single machine).
+    Follows reloads of `config.toml` (see `PlacementScheduler.apply_settings`); configuring
+    nodes when there were none needs a restart."""
+    settings = get_settings()
+    if len(get_nodes(settings.server_monitor_options)) == 0:
+        return None
+    scheduler = PlacementScheduler(())
+    scheduler.apply_settings(settings)
+    get_settings_loader().on_reload(scheduler.apply_settings)
+    return scheduler
@@ -0,0 +1,180 @@
+from collections import deque
+from dataclasses import dataclass
+from functools import cache
+from threading import Lock
+from time import monotonic
+from typing import Iterable, Optional
+
+from ..server import MinecraftServerSnapshot
+from ..utils import get_settings, get_settings_loader, Settings
+
+
+RESERVATION_TTL_SECONDS = 120
+
+
+@dataclass(frozen=True)
+class RamStats:
+    """Snapshot of a `RamLedger` (MB)."""
+    max_ram: int
+    used: int
+    reserved: int
+    servers: int
+    reservations: int
+
+    @property
+    def available(self) -> int:
+        return self.max_ram - self.used - self.reserved
+
+
+class RamLedger:
+    """In-memory RAM accounting of this node against the `ram` limit of `server_monitor_options`.
+
+    - `used`: RAM of servers known to be online, per server and per group.
+    - `reserved`: RAM promised to servers being deployed but not online yet.
+      `reserve` checks and reserves in one step, so concurrent deploy decisions
+      can't oversubscribe `max_ram`. Reservations expire after `reservation_ttl`
+      seconds in case a server never comes up.
+
+    Every check and update is O(1) (expiry is amortized). `sync` rebuilds `used`
+    from a full list of snapshots to correct drift.
+    """
+
+    def __init__(self, max_ram: int, reservation_ttl: float = RESERVATION_TTL_SECONDS) -> None:
+        self.max_ram = max_ram
+        self.reservation_ttl = reservation_ttl
+        self.last_sync: Optional[float] = None
+        self._used: dict[str, tuple[str, int]] = {}
+        self._reserved: dict[str, tuple[str, int, float]] = {}
+        self._expiry: deque[tuple[float, str]] = deque()
+        self._used_total = 0
+        self._reserved_total = 0
+        self._group_used: dict[str, int] = {}
+        self._group_reserved: dict[str, int] = {}
+        self._lock = Lock()
+
+    def _add(self, totals: dict[str, int], group: str, ram: int) -> None:
+        totals[group] = totals.get(group, 0) + ram
+        if totals[group] == 0:
+            del totals[group]
+
+    def _drop_reservation(self, server_name: str) -> None:
+        if (reservation := self._reserved.pop(server_name, None)) is None:
+            return
+        group, ram, _ = reservation
+        self._reserved_total -= ram
+        self._add(self._group_reserved, group, -ram)
+
+    def _drop_usage(self, server_name: str) -> None:
+        if (usage := self._used.pop(server_name, None)) is None:
+            return
+        group, ram = usage
+        self._used_total -= ram
+        self._add(self._group_used, group, -ram)
+
+    def _expire(self) -> None:
+        now = monotonic()
+        while self._expiry and now - self._expiry[0][0] > self.reservation_ttl:
+            reserved_at, server_name = self._expiry.popleft()
+            reservation = self._reserved.get(server_name)
+            if reservation is not None and reservation[2] == reserved_at:
+                self._drop_reservation(server_name)
+
+    @property
+    def used(self) -> int:
+        return self._used_total
+
+    @property
+    def reserved(self) -> int:
+        with self._lock:
+            self._expire()
+            return self._reserved_total
+
+    @property
+    def available(self) -> int:
+        with self._lock:
+            self._expire()
+            return self.max_ram - self._used_total - self._reserved_total
+
+    def can_admit(self, ram: int) -> bool:
+        """Returns if `ram` MB fit next to used and reserved RAM."""
+        return ram <= self.available
+
+    def reserve(self, server_name: str, group: str, ram: int) -> bool:
+        """Reserves `ram` MB for `server_name` if they fit. Returns `False` (and reserves nothing) otherwise.
+        Already online or reserved servers are admitted without reserving again."""
+        with self._lock:
+            self._expire()
+            if server_name in self._used or server_name in self._reserved:
+                return True
+            if self._used_total + self._reserved_total + ram > self.max_ram:
+                return False
+            now = monotonic()
+            self._reserved[server_name] = (group, ram, now)
+            self._expiry.append((now, server_name))
+            self._reserved_total += ram
+            self._add(self._group_reserved, group, ram)
+            return True
+
+    def mark_online(self, server_name: str, group: str, ram: int) -> None:
+        """Turns the reservation of `server_name` (if any) into used RAM."""
+        with self._lock:
+            self._drop_reservation(server_name)
+            self._drop_usage(server_name)
+            self._used[server_name] = (group, ram)
+            self._used_total += ram
+            self._add(self._group_used, group, ram)
+
+    def release(self, server_name: str) -> None:
+        """Frees RAM used or reserved by `server_name` (stopped, down or failed to deploy)."""
+        with self._lock:
+            self._drop_reservation(server_name)
+            self._drop_usage(server_name)
+
+    def sync(self, snapshots: Iterable[MinecraftServerSnapshot]) -> None:
+        """Rebuilds used RAM from `snapshots` (offline ones are ignored).
+        Reservations of servers which are online now are dropped."""
+        used = dict((snapshot.name, (snapshot.group, snapshot.ram))
+                    for snapshot in snapshots
+                    if snapshot.is_online)
+        group_used: dict[str, int] = {}
+        for group, ram in used.values():
+            self._add(group_used, group, ram)
+        with self._lock:
+            for server_name in used.keys() & self._reserved.keys():
+                self._drop_reservation(server_name)
+            self._used = used
+            self._group_used = group_used
+            self._used_total = sum(group_used.values())
+            self.last_sync = monotonic()
+
+    def is_fresh(self, max_age: float) -> bool:
+        """Returns if `sync` ran within the last `max_age` seconds."""
+        return self.last_sync is not None and monotonic() - self.last_sync <= max_age
+
+    def group_usage(self, group: str) -> tuple[int, int]:
+        """Returns `(used, reserved)` RAM of `group`."""
+        with self._lock:
+            self._expire()
+            return self._group_used.get(group, 0), self._group_reserved.get(group, 0)
+
+    def stats(self) -> RamStats:
+        """Returns current `RamStats`."""
+        with self._lock:
+            self._expire()
+            return RamStats(self.max_ram, self._used_total, self._reserved_total,
+                            len(self._used), len(self._reserved))
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Takes over `ram` of `server_monitor_options`. Servers already over a lowered
+        limit keep running; `reserve` admits nothing until they free enough RAM."""
+        with self._lock:
+            self.max_ram = settings.max_ram
+
+
+@cache
+def get_ram_ledger() -> RamLedger:
+    """Process-wide `RamLedger` limited to `ram` of `server_monitor_options`,
+    which follows reloads of `config.toml`."""
+    ledger = RamLedger(get_settings().max_ram)
+    get_settings_loader().on_reload(ledger.apply_settings)
+    return ledger
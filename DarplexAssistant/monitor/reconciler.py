@@ -0,0 +1,435 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from enum import Enum
+import logging
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter
+from typing import Callable, Iterable, Optional
+
+from ..repository.change_feed import ChangeEvent, ChangeEventKind, ChangeFeed
+from ..scripts import ServerSpec, StandbyPool, stop_server
+from ..server import MinecraftServerSnapshot, ServerGroup
+from ..utils import GameJoinStatus, GameStatusDisplay, Region, Settings, SettingsLoader
+from .monitor_repository import MonitorRepository, get_monitor_repo
+from .placement import Node, PlacementPlan, PlacementScheduler
+from .ram_ledger import RamLedger
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActionKind(Enum):
+    START = 'START'
+    STOP = 'STOP'
+    RESTART = 'RESTART'
+
+
+@dataclass(frozen=True)
+class ServerAction:
+    kind: ActionKind
+    group: str
+    server_num: int
+    reason: str = ''
+
+    @property
+    def server_name(self) -> str:
+        return f'{self.group}-{self.server_num}'
+
+
+@dataclass
+class ReconcilePlan:
+    starts: list[ServerAction] = field(default_factory=list)
+    stops: list[ServerAction] = field(default_factory=list)
+    restarts: list[ServerAction] = field(default_factory=list)
+
+    @property
+    def actions(self) -> list[ServerAction]:
+        """Stops first (frees ram and ports), then restarts, then starts."""
+        return [*self.stops, *self.restarts, *self.starts]
+
+    def __len__(self) -> int:
+        return len(self.starts) + len(self.stops) + len(self.restarts)
+
+
+def get_server_num(server_name: str) -> Optional[int]:
+    """Returns `n` of `(group)-(n)`, or `None` if not numbered."""
+    _, _, num = server_name.rpartition('-')
+    return int(num) if num.isdigit() else None
+
+
+def is_joinable(snapshot: MinecraftServerSnapshot) -> bool:
+    """Returns if players can still join (non-arcade servers always count as joinable)."""
+    if not snapshot.is_online or snapshot.player_count >= snapshot.max_player_count:
+        return False
+    if snapshot.joinable is None:
+        return True
+    return snapshot.joinable == GameJoinStatus.OPEN and snapshot.status != GameStatusDisplay.IN_PROGRESS
+
+
+def plan_restarts(snapshots: Iterable[MinecraftServerSnapshot]) -> list[ServerAction]:
+    """Restarts servers which are dead or report `Restarting`/`Finished` in their motd."""
+    restarts: list[ServerAction] = []
+    for snapshot in snapshots:
+        if (server_num := get_server_num(snapshot.name)) is None:
+            continue
+        if not snapshot.is_online:
+            restarts.append(ServerAction(ActionKind.RESTART, snapshot.group, server_num, 'Dead'))
+        elif snapshot.needs_restart():
+            restarts.append(ServerAction(ActionKind.RESTART, snapshot.group, server_num, 'Restart'))
+    return restarts
+
+
+def plan_scaling(group: ServerGroup, snapshots: list[MinecraftServerSnapshot]) -> tuple[list[ServerAction], list[ServerAction]]:
+    """Returns `(starts, stops)` so `group` runs `totalServers` servers
+    and at least `joinableServers` of them are joinable.
+    New servers take the lowest free numbers; the highest numbers are stopped first."""
+    running = dict((num, snapshot)
+                   for snapshot in snapshots
+                   if (num := get_server_num(snapshot.name)) is not None)
+    joinable_count = sum(1 for snapshot in running.values() if is_joinable(snapshot))
+    # new servers start joinable, so non-joinable ones only add to the count
+    desired = max(group.totalServers, len(running) - joinable_count + group.joinableServers)
+    starts: list[ServerAction] = []
+    num = 1
+    while len(running) + len(starts) < desired:
+        if num not in running:
+            starts.append(ServerAction(ActionKind.START, group.prefix, num, 'Scale up'))
+        num += 1
+    stops = [ServerAction(ActionKind.STOP, group.prefix, num, 'Scale down')
+             for num in sorted(running, reverse=True)[:max(0, len(running) - desired)]]
+    return starts, stops
+
+
+def plan_reconcile(
+    groups: Iterable[ServerGroup],
+    snapshots: Iterable[MinecraftServerSnapshot],
+    excluded: Iterable[str] = (),
+    ram_available: Optional[int] = None,
+    in_flight: Iterable[str] = ()
+) -> ReconcilePlan:
+    """Diffs desired `totalServers`/`joinableServers` of each `ServerGroup` against live snapshots.
+    - Servers of unknown groups are stopped.
+    - Servers with an action already `in_flight` are left alone.
+    - Starts stop once `ram_available` (MB) is used up.
+    Runs in O(groups + servers).
+    """
+    excluded = set(excluded)
+    in_flight = set(in_flight)
+    groups_by_prefix = dict((group.prefix, group) for group in groups if group.prefix not in excluded)
+    snapshots_by_group: dict[str, list[MinecraftServerSnapshot]] = {}
+    plan = ReconcilePlan()
+    for snapshot in snapshots:
+        if snapshot.group in excluded or snapshot.name in in_flight:
+            continue
+        if snapshot.group not in groups_by_prefix:
+            if (server_num := get_server_num(snapshot.name)) is not None:
+                plan.stops.append(ServerAction(ActionKind.STOP, snapshot.group, server_num, 'No ServerGroup'))
+            continue
+        snapshots_by_group.setdefault(snapshot.group, []).append(snapshot)
+    for prefix, group in groups_by_prefix.items():
+        group_snapshots = snapshots_by_group.get(prefix, [])
+        starts, stops = plan_scaling(group, group_snapshots)
+        stopped = set(action.server_num for action in stops)
+        plan.stops.extend(stops)
+        plan.restarts.extend(action
+                             for action in plan_restarts(group_snapshots)
+                             if action.server_num not in stopped)
+        for action in starts:
+            if action.server_name in in_flight:
+                continue
+            if ram_available is not None:
+                if ram_available < group.ram:
+                    break
+                ram_available -= group.ram
+            plan.starts.append(action)
+    return plan
+
+
+class ServerMonitor:
+    """Reconcile loop keeping deployed servers in line with their `ServerGroup`s.
+
+    Every `tick_interval` seconds it loads all ServerGroups and ServerStatus snapshots
+    (a few pipelined round trips), plans starts/stops/restarts and hands them to a pool of
+    `max_workers` threads. Ticks never wait for actions to finish, so tick latency only
+    covers fetching and planning; ticks over `tick_budget` seconds are logged.
+    Started/restarted servers are left alone for `start_grace` seconds while they boot.
+    Only ServerGroups deploying into `region` (and their servers) are reconciled.
+
+    With a `ChangeFeed`, ticks read its in-memory mirror instead of Redis and
+    any group change or server up/down/stale event wakes the loop right away.
+    With a `StandbyPool`, starts of its groups claim pre-staged directories and
+    each tick tops the pool back up after dispatching its actions.
+    With a `SettingsLoader`, each tick picks up edits of `config.toml` (see `apply_settings`).
+    With a `RamLedger`, starts reserve their RAM when dispatched, so servers still booting
+    count against `max_ram`; server up/down events update it between ticks.
+    With a `PlacementScheduler`, starts are placed across all nodes and this monitor
+    only runs the ones placed on `node_name` (every node plans the same placement);
+    stops and restarts are limited to servers running on `node_name`, and the `RamLedger`
+    only counts those servers against the `ram` of that node.
+    """
+
+    def __init__(self,
+        tick_interval: float = 5,
+        max_workers: int = 4,
+        tick_budget: float = 0.25,
+        max_ram: Optional[int] = None,
+        excluded: Iterable[str] = (),
+        region: Region = Region.US,
+        start_grace: float = 120,
+        feed: Optional[ChangeFeed] = None,
+        standby: Optional[StandbyPool] = None,
+        settings: Optional[SettingsLoader] = None,
+        ledger: Optional[RamLedger] = None,
+        scheduler: Optional[PlacementScheduler] = None,
+        node_name: Optional[str] = None
+    ) -> None:
+        self.tick_interval = tick_interval
+        self.max_workers = max_workers
+        self.tick_budget = tick_budget
+        self.max_ram = max_ram
+        self.excluded = set(excluded)
+        self.region = region
+        self.start_grace = start_grace
+        self.last_tick_seconds = 0.0
+        self.last_plan = ReconcilePlan()
+        self.feed = feed
+        self.standby = standby
+        self.settings = settings
+        self.ledger = ledger
+        self.scheduler = scheduler
+        self.node_name = node_name
+        self.last_placement: Optional[PlacementPlan] = None
+        if ledger is not None and max_ram is not None:
+            ledger.max_ram = max_ram
+        self._stop_event = Event()
+        self._wake_event = Event()
+        self._unsubscribe: Optional[Callable[[], None]] = None
+        self._unsubscribe_settings: Optional[Callable[[], None]] = None
+        self._thread: Optional[Thread] = None
+        self._owns_feed = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: dict[str, Future] = {}
+        self._in_flight_lock = Lock()
+        self._booting: dict[str, float] = {}
+
+    def execute(self, action: ServerAction, group: Optional[ServerGroup]) -> None:
+        """Runs one action (blocking). Starts claim a standby directory when one is ready.
+        Only stops delete the server directory; restarts redeploy into it."""
+        if action.kind in (ActionKind.STOP, ActionKind.RESTART):
+            stop_server(action.server_name, keep_directory=action.kind == ActionKind.RESTART)
+        if action.kind not in (ActionKind.START, ActionKind.RESTART) or group is None:
+            return
+        if action.kind == ActionKind.START and self.standby is not None and group.prefix in self.standby.groups:
+            group.expect_servers([action.server_num])
+            if self.standby.deploy(ServerSpec(*group.start_server_params(action.server_num))): # type: ignore
+                return
+        group.deploy_server(action.server_num)
+
+    def _replenish(self, group: ServerGroup) -> None:
+        """Tops up standby directories of `group` unless it is already being topped up."""
+        assert self._executor is not None and self.standby is not None
+        key = f'standby:{group.prefix}'
+        # server number 0 is never deployed; the spec is only a staging template
+        spec = ServerSpec(*group.start_server_params(0)) # type: ignore
+        def done(future: Future) -> None:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+            if not future.cancelled() and (error := future.exception()) is not None:
+                logger.error('Replenishing standby of %s failed: %s', group.prefix, error)
+        with self._in_flight_lock:
+            if key in self._in_flight:
+                return
+            future = self._executor.submit(self.standby.replenish, spec)
+            self._in_flight[key] = future
+        future.add_done_callback(done)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Takes over `tick_interval`, `tick_budget_ms`, `ram`, `excluded_servers` and `region`
+        of `server_monitor_options`. `max_concurrent_actions` only applies on the next `start`."""
+        options = settings.server_monitor_options
+        self.tick_interval = options.get('tick_interval', self.tick_interval)
+        self.tick_budget = options.get('tick_budget_ms', self.tick_budget * 1000) / 1000
+        self.max_workers = options.get('max_concurrent_actions', self.max_workers)
+        self.max_ram = settings.max_ram
+        if self.ledger is not None:
+            self.ledger.max_ram = settings.max_ram
+        self.excluded = set(settings.excluded_servers)
+        self.region = settings.region
+        self._wake_event.set()
+
+    def _local_node(self) -> Optional[Node]:
+        """Returns the `Node` of `node_name` when placing with a `PlacementScheduler`."""
+        return self.scheduler.get_node(self.node_name) if self.scheduler is not None else None
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if self.ledger is not None and event.key.startswith('serverstatus.'):
+            if self.region == Region.ALL or MonitorRepository.get_region_by_server_status(event.key) == self.region:
+                if event.kind == ChangeEventKind.SERVER_UP:
+                    if (node := self._local_node()) is not None and event.data.get('_publicAddress') != node.address:
+                        return # runs on another node
+                    self.ledger.mark_online(event.name, event.name.split('-')[0], int(event.data.get('_ram', 0)))
+                else:
+                    self.ledger.release(event.name)
+        if event.kind != ChangeEventKind.SERVER_UP:
+            self._wake_event.set()
+
+    def _manages(self, group: ServerGroup) -> bool:
+        """Returns if `group` deploys into this monitor's region (`Region.ALL` groups deploy to US)."""
+        region = Region.US if group.region == Region.ALL else group.region
+        return self.region == Region.ALL or region == self.region
+
+    def _fetch(self) -> tuple[list[ServerGroup], list[MinecraftServerSnapshot]]:
+        if self.feed is not None and self.feed.running and self.feed.synced.is_set():
+            groups, servers = self.feed.mirror()
+            snapshots = [snapshot
+                         for key, server_status in servers.items()
+                         if (snapshot := MonitorRepository.snapshot_of(key, server_status)) is not None]
+            return ([ServerGroup.from_server_group_dict(data) for data in groups.values()],
+                    [snapshot for snapshot in snapshots
+                     if self.region == Region.ALL or snapshot.region == self.region])
+        with get_monitor_repo() as repo:
+            groups = list(repo.get_all_server_groups())
+            snapshots = [snapshot
+                         for snapshot in repo.get_server_snapshots()
+                         if self.region == Region.ALL or snapshot.region == self.region]
+        return groups, snapshots
+
+    def _dispatch(self, action: ServerAction, group: Optional[ServerGroup]) -> None:
+        assert self._executor is not None
+        if action.kind == ActionKind.START and self.ledger is not None and group is not None:
+            if not self.ledger.reserve(action.server_name, group.prefix, group.ram):
+                logger.info('Not starting %s, not enough RAM available', action.server_name)
+                return
+        def done(future: Future) -> None:
+            with self._in_flight_lock:
+                self._in_flight.pop(action.server_name, None)
+            error = None if future.cancelled() else future.exception()
+            if error is not None:
+                logger.error('%s %s failed: %s', action.kind.value, action.server_name, error)
+            if self.ledger is not None and (action.kind == ActionKind.STOP or future.cancelled() or error is not None):
+                self.ledger.release(action.server_name)
+        with self._in_flight_lock:
+            future = self._executor.submit(self.execute, action, group)
+            self._in_flight[action.server_name] = future
+            if action.kind != ActionKind.STOP:
+                self._booting[action.server_name] = monotonic()
+        future.add_done_callback(done)
+
+    def tick(self) -> ReconcilePlan:
+        """Runs one reconcile pass and dispatches its actions. Returns the plan."""
+        started = perf_counter()
+        groups, snapshots = self._fetch()
+        # groups of other regions are left to their own monitor, servers included
+        excluded = self.excluded.union(group.prefix for group in groups if not self._manages(group))
+        groups = [group for group in groups if self._manages(group)]
+        ram_available = None
+        node = self._local_node()
+        if self.ledger is not None:
+            if node is not None: # the ledger accounts for this node only
+                self.ledger.max_ram = node.ram
+                self.ledger.sync(snapshot for snapshot in snapshots if snapshot.public_address == node.address)
+            else:
+                self.ledger.sync(snapshots)
+        if self.scheduler is None: # otherwise node capacity is checked by the scheduler
+            if self.ledger is not None:
+                ram_available = self.ledger.available
+            elif self.max_ram is not None:
+                ram_available = self.max_ram - sum(snapshot.ram for snapshot in snapshots if snapshot.is_online)
+        now = monotonic()
+        with self._in_flight_lock:
+            self._booting = dict((name, since)
+                                 for name, since in self._booting.items()
+                                 if now - since < self.start_grace)
+            in_flight = set(self._in_flight).union(self._booting)
+        plan = plan_reconcile(groups, snapshots, excluded, ram_available, in_flight)
+        groups_by_prefix = dict((group.prefix, group) for group in groups)
+        if self.scheduler is not None:
+            self.last_placement = self.scheduler.place(((action.server_name, groups_by_prefix[action.group])
+                                                        for action in plan.starts),
+                                                       snapshots,
+                                                       groups)
+            plan.starts = [action
+                           for action in plan.starts
+                           if self.last_placement.placements.get(action.server_name) == self.node_name]
+            if node is not None:
+                local = set(snapshot.name for snapshot in snapshots if snapshot.public_address == node.address)
+                plan.stops = [action for action in plan.stops if action.server_name in local]
+                plan.restarts = [action for action in plan.restarts if action.server_name in local]
+        if self._executor is not None and not self._stop_event.is_set():
+            for action in plan.actions:
+                self._dispatch(action, groups_by_prefix.get(action.group))
+            if self.standby is not None:
+                # queued after this tick's actions, so staging spares never delays a real start
+                for prefix in self.standby.groups.intersection(groups_by_prefix).difference(excluded):
+                    self._replenish(groups_by_prefix[prefix])
+        self.last_plan = plan
+        self.last_tick_seconds = perf_counter() - started
+        if self.last_tick_seconds > self.tick_budget:
+            logger.warning('Reconcile tick took %.3fs (budget %.3fs) for %d servers',
+                           self.last_tick_seconds, self.tick_budget, len(snapshots))
+        return plan
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if self.settings is not None:
+                    self.settings.get() # reloads and calls `apply_settings` if config.toml changed
+                self.tick()
+            except Exception:
+                logger.exception('Reconcile tick failed')
+            self._wake_event.wait(self.tick_interval)
+            self._wake_event.clear()
+
+    def start(self) -> None:
+        """Starts the reconcile loop in a background thread. If a stopped loop is still
+        finishing its tick, waits for it first, so there is never more than one loop."""
+        if self._thread is not None:
+            if not self._stop_event.is_set():
+                return
+            self._thread.join()
+        self._stop_event.clear()
+        if self.feed is not None:
+            self._unsubscribe = self.feed.subscribe(self._on_change)
+            self._owns_feed = not self.feed.running
+            self.feed.start()
+        if self.settings is not None:
+            self._unsubscribe_settings = self.settings.on_reload(self.apply_settings)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='server-monitor')
+        self._thread = Thread(target=self._run, name='server-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the loop (and the `ChangeFeed` if `start` started it), drops queued actions
+        and waits for running ones, all within `timeout` seconds if given.
+        A tick or action taking longer is left to finish on its own."""
+        deadline = None if timeout is None else monotonic() + timeout
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - monotonic())
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(remaining())
+            if not self._thread.is_alive():
+                self._thread = None
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._unsubscribe_settings is not None:
+            self._unsubscribe_settings()
+            self._unsubscribe_settings = None
+        if self.feed is not None and self._owns_feed:
+            self.feed.stop(remaining())
+            self._owns_feed = False
+        if self._executor is not None:
+            with self._in_flight_lock:
+                running = list(self._in_flight.values())
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            wait(running, remaining())
+            self._executor = None
+        with self._in_flight_lock:
+            self._in_flight.clear()
+            self._booting.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
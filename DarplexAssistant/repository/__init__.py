@@ -1,3 +1,26 @@
-from .redis_repository import RedisRepository, get_redis_repo
+from typing import TYPE_CHECKING
+from .._lazy import attach
 
-__all__ = ('RedisRepository', 'get_redis_repo')
+if TYPE_CHECKING:
+    from .async_redis_repository import AsyncRedisRepository, get_async_redis_repo
+    from .change_feed import ChangeEvent, ChangeEventKind, ChangeFeed
+    from .connection_pool import PoolStats, close_connection_pool, get_pool_stats
+    from .key_browser import KeyBrowser, KeyInfo, PrefixStats
+    from .redis_repository import RedisRepository, get_redis_repo, get_shared_repository
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'RedisRepository': '.redis_repository',
+    'get_redis_repo': '.redis_repository',
+    'get_shared_repository': '.redis_repository',
+    'AsyncRedisRepository': '.async_redis_repository',
+    'get_async_redis_repo': '.async_redis_repository',
+    'PoolStats': '.connection_pool',
+    'get_pool_stats': '.connection_pool',
+    'close_connection_pool': '.connection_pool',
+    'ChangeFeed': '.change_feed',
+    'ChangeEvent': '.change_feed',
+    'ChangeEventKind': '.change_feed',
+    'KeyBrowser': '.key_browser',
+    'KeyInfo': '.key_browser',
+    'PrefixStats': '.key_browser',
+})
@@ -0,0 +1,253 @@
+from contextlib import asynccontextmanager
+from random import randint
+from time import time
+from redis.asyncio import Redis
+from typing import AsyncIterator, Iterable, Optional, Self
+from ..utils import Region
+from .connection_pool import get_redis_address
+from .port_allocator import MAX_PORT, MIN_PORT, AsyncPortSectionAllocator, PortRangeStats
+from .redis_repository import (RedisRepository,
+                               SCALE_TOTAL_SERVERS_SCRIPT,
+                               SERVER_STATUS_BATCH_SIZE,
+                               scale_keys,
+                               scaled_count)
+from .server_status_index import (BUILT_KEY,
+                                  EXPECT_SECONDS,
+                                  EXPECTED_KEY,
+                                  SCAN_COUNT,
+                                  SERVER_STATUS_PATTERN,
+                                  SETS_KEY,
+                                  ServerStatusIndex)
+
+
+class AsyncServerStatusIndex:
+    """asyncio variant of `ServerStatusIndex`: same Redis sets and rebuild rules, which it
+    takes from `ServerStatusIndex`; only the round trips are awaited."""
+
+    def __init__(self, redis: Redis, rebuild_interval: Optional[int] = None) -> None:
+        self.redis = redis
+        self._rebuild_interval = rebuild_interval
+
+    rebuild_interval = ServerStatusIndex.rebuild_interval
+
+    async def rebuild(self) -> int:
+        """Rebuilds every index from one SCAN pass (plus keys still `expect`ed). Returns number of indexed keys."""
+        scanned = set([key async for key in self.redis.scan_iter(SERVER_STATUS_PATTERN, count=SCAN_COUNT)])
+        members = ServerStatusIndex.group_by_index(scanned.union(await self.redis.zrangebyscore(EXPECTED_KEY,
+                                                                                                time(), '+inf')))
+        previous = await self.redis.smembers(SETS_KEY)
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            ServerStatusIndex.queue_rebuild(pipeline, previous, members, self.rebuild_interval)
+            await pipeline.execute()
+        return len(members[ServerStatusIndex.index_key()])
+
+    async def invalidate(self) -> None:
+        await self.redis.delete(BUILT_KEY)
+
+    async def ensure_built(self) -> None:
+        if not await self.redis.exists(BUILT_KEY):
+            await self.rebuild()
+
+    async def members(self, region: Optional[Region] = None, group: Optional[str] = None) -> set[str]:
+        await self.ensure_built()
+        return await self.redis.sunion(*ServerStatusIndex.member_index_keys(region, group))
+
+    async def add(self, server_status_key: str) -> None:
+        if not await self.redis.exists(BUILT_KEY):
+            return
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            ServerStatusIndex.queue_add(pipeline, server_status_key)
+            await pipeline.execute()
+
+    async def expect(self, server_status_keys: Iterable[str], within: float = EXPECT_SECONDS) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            ServerStatusIndex.queue_expect(pipeline, server_status_keys, within)
+            await pipeline.execute()
+
+    async def remove(self, server_status_keys: Iterable[str]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            ServerStatusIndex.queue_remove(pipeline, server_status_keys)
+            await pipeline.execute()
+
+    async def prune(self, missing_keys: Iterable[str]) -> None:
+        now = time()
+        expected = set(await self.redis.zrangebyscore(EXPECTED_KEY, now, '+inf'))
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            ServerStatusIndex.queue_remove(pipeline, (key for key in missing_keys if key not in expected))
+            pipeline.zremrangebyscore(EXPECTED_KEY, '-inf', now)
+            await pipeline.execute()
+
+
+class AsyncRedisRepository:
+    """asyncio variant of `RedisRepository` built on `redis.asyncio`.
+    Same methods, awaited; iterators are async generators.
+    Pass `redis` to use an existing client (e.g. a local stand-in in tests).
+    """
+
+    def __init__(self, host: str, port: int, redis: Optional[Redis] = None) -> None:
+        self.redis = redis if redis is not None else Redis(host=host, port=port, db=0, decode_responses=True)
+        self.server_status_index = AsyncServerStatusIndex(self.redis)
+        self.port_allocator = AsyncPortSectionAllocator(self.redis)
+        self._scale_script = self.redis.register_script(SCALE_TOTAL_SERVERS_SCRIPT)
+
+    async def close_connection(self) -> None:
+        """Closes redis connection."""
+        await self.redis.aclose()
+
+    async def server_group_exists(self, prefix: str) -> bool:
+        """Returns whether a server-group exists based on prefix."""
+        return await self.redis.exists(f'servergroups.{prefix}') > 0
+
+    async def delete_server_group(self, prefix: str) -> None:
+        """Deletes `ServerGroup` with specified server prefix from Redis.
+        If `ServerGroup cache DNE, method does nothing.
+        """
+        if not await self.server_group_exists(prefix):
+            return
+        await self.redis.srem('servergroups', prefix)
+        await self.redis.delete(f'servergroups.{prefix}')
+        await self.port_allocator.release(prefix)
+
+    async def get_if_port_conflicts(self, port: int) -> bool:
+        """Returns if `port` conflicts with any existing port sections in the Redis db."""
+        return await self.port_allocator.conflicts(port)
+
+    async def create_server_group(self, prefix: str, data: dict[str, str]) -> None:
+        """Creates `ServerGroup` with specified server prefix from Redis.
+        If `ServerGroup exists, method does nothing.
+        """
+        if await self.server_group_exists(prefix):
+            return
+        await self.redis.sadd('servergroups', prefix)
+        await self.redis.hset(f'servergroups.{prefix}', mapping=data)
+        if data.get('portSection', '').isdigit():
+            port = await self.port_allocator.reserve(prefix, int(data['portSection']))
+            if port != int(data['portSection']): # taken meanwhile
+                await self.redis.hset(f'servergroups.{prefix}', 'portSection', port)
+
+    async def scale_total_servers(self, prefix: str, delta: int) -> Optional[int]:
+        """Atomically adds `delta` to `totalServers` (clamped at 0).
+        Returns new `totalServers` or `None` if ServerGroup DNE."""
+        return scaled_count(await self._scale_script(keys=scale_keys(prefix), args=[delta, 'add']))
+
+    async def set_total_servers(self, prefix: str, count: int) -> Optional[int]:
+        """Atomically sets `totalServers` to `count` (clamped at 0).
+        Returns new `totalServers` or `None` if ServerGroup DNE."""
+        return scaled_count(await self._scale_script(keys=scale_keys(prefix), args=[count, 'set']))
+
+    async def scale_server_groups(self, deltas: dict[str, int]) -> dict[str, Optional[int]]:
+        """Scales many ServerGroups in a single pipelined round trip."""
+        if len(deltas) == 0:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for prefix, delta in deltas.items():
+                await self._scale_script(keys=scale_keys(prefix), args=[delta, 'add'], client=pipeline)
+            counts = await pipeline.execute()
+        return dict((prefix, scaled_count(count)) for prefix, count in zip(deltas, counts))
+
+    @staticmethod
+    def generate_random_port() -> int:
+        """Returns random port."""
+        return randint(MIN_PORT, MAX_PORT)
+
+    async def next_available_port(self) -> int:
+        """Gets next available non-conflicting port. Does not reserve it."""
+        return await self.port_allocator.peek()
+
+    async def reserve_port_section(self, prefix: str, preferred: Optional[int] = None) -> int:
+        """Atomically reserves a port section for `prefix`."""
+        return await self.port_allocator.reserve(prefix, preferred)
+
+    async def get_port_range_stats(self) -> PortRangeStats:
+        return await self.port_allocator.stats()
+
+    async def get_available_minecraft_servers(self) -> AsyncIterator[str]:
+        """Returns async Iterator of ALL cached Minecraft servers."""
+        for key in await self.server_status_index.members():
+            yield key
+
+    async def get_server_groups(self) -> AsyncIterator[str]:
+        """Returns async Iterator of ServerGroups keys (from the `servergroups` set)."""
+        for prefix in await self.redis.smembers('servergroups'):
+            yield f'servergroups.{prefix}'
+
+    async def iterate_minecraft_servers_by_group(self, group: str, region: Region) -> AsyncIterator[str]:
+        """Returns async Iterator of matching MinecraftServer keys by region.
+        If region == `Region.ALL`, returns under all regions."""
+        for key in await self.server_status_index.members(region, group):
+            yield key
+
+    async def expect_minecraft_servers(self, server_names: Iterable[str], region: Region) -> None:
+        """Indexes ServerStatus keys of servers being deployed, so reads find them as soon as they boot."""
+        await self.server_status_index.expect(ServerStatusIndex.server_status_key(server_name, region)
+                                              for server_name in server_names)
+
+    async def get_if_minecraft_server_exists(self, server_name: str, region: Region) -> bool:
+        """Returns if MinecraftServer exists in the Redis cache."""
+        return await self.redis.get(f'serverstatus.minecraft.{region.value}.{server_name}') is not None
+
+    async def get_server_group_dict(self, group: str) -> dict[str, str]:
+        """Returns Json dictionary of ServerGroup from Redis."""
+        group = group.replace('servergroups.', '')
+        return self.decode_server_group(await self.redis.hgetall(f'servergroups.{group}'))
+
+    async def get_server_group_dicts(self, groups: list[str]) -> dict[str, dict[str, str]]:
+        """Returns Json dictionaries of many ServerGroups in one pipelined round trip."""
+        prefixes = [group.replace('servergroups.', '') for group in groups]
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for prefix in prefixes:
+                pipeline.hgetall(f'servergroups.{prefix}')
+            results = await pipeline.execute()
+        return dict((prefix, result) for prefix, result in zip(prefixes, results) if result)
+
+    decode_server_group = staticmethod(RedisRepository.decode_server_group)
+    decode_server_status = staticmethod(RedisRepository.decode_server_status)
+    decode_server_statuses = staticmethod(RedisRepository.decode_server_statuses)
+
+    async def get_server_status_dict(self, server_name: str, region: Region) -> dict[str, str]:
+        """Returns Json dictionary of ServerStatus from Redis."""
+        server_key = f'serverstatus.minecraft.{region.value}.{server_name}'
+        if server_name.count('.') == 3:
+            server_key = server_name
+        return self.decode_server_status(await self.redis.get(server_key))
+
+    async def get_server_status_dicts(self, server_keys: list[str]) -> dict[str, dict[str, str]]:
+        """Returns Json dictionaries of many ServerStatus keys in one `MGET`.
+        Missing and undecodable keys are left out."""
+        if len(server_keys) == 0:
+            return {}
+        return self.decode_server_statuses(server_keys, await self.redis.mget(server_keys))
+
+    async def load_server_statuses(self,
+        batch_size: int = SERVER_STATUS_BATCH_SIZE,
+        region: Optional[Region] = None,
+        group: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, dict[str, str]]]:
+        """Returns async Iterator of `(key, ServerStatus dict)` for every indexed ServerStatus key.
+        One `MGET` round trip per `batch_size` keys; missing keys are `prune`d from the index."""
+        keys = list(await self.server_status_index.members(region, group))
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            server_statuses = await self.get_server_status_dicts(batch)
+            if len(server_statuses) < len(batch):
+                await self.server_status_index.prune(key for key in batch if key not in server_statuses)
+            for item in server_statuses.items():
+                yield item
+
+    @classmethod
+    def create_session(cls) -> Self:
+        """Creates an AsyncRedisRepository session using `config.toml` connection information."""
+        address, port = get_redis_address()
+        return cls(address, port)
+
+
+@asynccontextmanager
+async def get_async_redis_repo() -> AsyncIterator[AsyncRedisRepository]:
+    """For quick async session in `AsyncRedisRepository`.
+    Closes session after the block exits.
+    """
+    repository = AsyncRedisRepository.create_session()
+    try:
+        yield repository
+    finally:
+        await repository.close_connection()
@@ -0,0 +1,261 @@
+from dataclasses import dataclass, field
+from enum import Enum
+import logging
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Optional
+from redis import Redis
+from redis.exceptions import ConnectionError, ResponseError
+from .redis_repository import RedisRepository
+
+
+logger = logging.getLogger(__name__)
+
+# K: keyspace channel, g: DEL/RENAME..., $: strings, h: hashes, s: sets, x: expired, e: evicted
+NOTIFY_KEYSPACE_EVENTS = 'Kg$hsxe'
+# event classes `A` stands for; it doesn't include the K/E channel flags
+ALL_KEYSPACE_EVENTS = 'g$lshzxetd'
+STALE_AFTER_SECONDS = 30
+POLL_TIMEOUT = 1.0
+
+
+class ChangeEventKind(Enum):
+    GROUP_CREATED = 'GROUP_CREATED'
+    GROUP_CHANGED = 'GROUP_CHANGED'
+    GROUP_DELETED = 'GROUP_DELETED'
+    SERVER_UP = 'SERVER_UP'
+    SERVER_DOWN = 'SERVER_DOWN'
+    SERVER_STALE = 'SERVER_STALE'
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One change of the mirror.
+    - `key`: Redis key (`servergroups.(prefix)` or `serverstatus.minecraft.(REGION).(name)`).
+    - `name`: ServerGroup prefix or server name.
+    - `data`: current ServerGroup/ServerStatus dict (`{}` once deleted).
+    """
+    kind: ChangeEventKind
+    key: str
+    name: str
+    data: dict[str, str] = field(default_factory=dict)
+
+
+ChangeListener = Callable[[ChangeEvent], None]
+
+
+class ChangeFeed:
+    """In-memory mirror of ServerGroups and ServerStatus caches kept up to date
+    by Redis keyspace notifications instead of polling.
+
+    - `start` subscribes first, then loads everything once (pipelined), so no write is missed.
+    - Each notification re-reads only the key it names (one round trip) and publishes a `ChangeEvent`.
+    - ServerStatus keys not rewritten for `stale_after` seconds publish `SERVER_STALE` once.
+    - On connection loss (or any other error) the feed resubscribes and resyncs the whole mirror;
+      `synced` is cleared until the resync is done.
+
+    Listeners run on the feed thread and should return quickly.
+    Requires `notify-keyspace-events` to include `Kg$hsxe`. `start` checks it and logs a warning
+    if it doesn't; only with `configure=True` does it CONFIG SET the missing flags itself
+    (this changes a server-wide setting of a possibly shared Redis).
+    """
+
+    def __init__(self,
+        repository: RedisRepository,
+        stale_after: float = STALE_AFTER_SECONDS,
+        configure: bool = False
+    ) -> None:
+        self.repository = repository
+        self.stale_after = stale_after
+        self.configure = configure
+        self.groups: dict[str, dict[str, str]] = {}
+        self.servers: dict[str, dict[str, str]] = {}
+        self.synced = Event()
+        self._seen: dict[str, float] = {}
+        self._stale: set[str] = set()
+        self._last_stale_check = 0.0
+        self._listeners: list[ChangeListener] = []
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self.repository.redis
+
+    @property
+    def _channel_prefix(self) -> str:
+        return f'__keyspace@{self.redis.connection_pool.connection_kwargs.get("db", 0)}__:'
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        """Registers `listener` for every `ChangeEvent`. Returns a function removing it."""
+        with self._lock:
+            self._listeners.append(listener)
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def mirror(self) -> tuple[dict[str, dict[str, str]], dict[str, dict[str, str]]]:
+        """Returns copies of `(groups by prefix, ServerStatus dicts by key)`."""
+        return dict(self.groups), dict(self.servers)
+
+    def _publish(self, event: ChangeEvent) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception('ChangeFeed listener failed on %s', event.kind.value)
+
+    @staticmethod
+    def _server_name(key: str) -> str:
+        return key.split('.', 3)[-1]
+
+    def _enable_notifications(self) -> None:
+        """Checks `notify-keyspace-events` and, if `configure`, adds the missing flags."""
+        try:
+            flags = set(self.redis.config_get('notify-keyspace-events').get('notify-keyspace-events', ''))
+        except ResponseError as e:
+            logger.warning('Could not check keyspace notifications (%s); ChangeFeed misses changes unless '
+                           'notify-keyspace-events includes %s', e, NOTIFY_KEYSPACE_EVENTS)
+            return
+        enabled = flags.union(ALL_KEYSPACE_EVENTS) if 'A' in flags else flags
+        if enabled.issuperset(NOTIFY_KEYSPACE_EVENTS):
+            return
+        missing = ''.join(sorted(set(NOTIFY_KEYSPACE_EVENTS).difference(enabled)))
+        if not self.configure:
+            logger.warning('Keyspace notifications are off (notify-keyspace-events=%r, missing %r): ChangeFeed '
+                           'misses changes until the next resync. Set them in redis.conf or enable '
+                           '`change_feed_configure_redis`', ''.join(sorted(flags)), missing)
+            return
+        try:
+            self.redis.config_set('notify-keyspace-events', ''.join(flags.union(NOTIFY_KEYSPACE_EVENTS)))
+            logger.info('Enabled keyspace notifications %r', missing)
+        except ResponseError as e:
+            logger.warning('Could not enable keyspace notifications (%s); ChangeFeed misses changes', e)
+
+    def resync(self) -> None:
+        """Reloads the whole mirror and publishes the differences as events."""
+        groups = self.repository.get_server_group_dicts(list(self.repository.get_server_groups()))
+        self.repository.server_status_index.rebuild()
+        servers = dict(self.repository.load_server_statuses())
+        for prefix in set(self.groups).difference(groups):
+            self._apply_group(prefix, {})
+        for prefix, data in groups.items():
+            self._apply_group(prefix, data)
+        for key in set(self.servers).difference(servers):
+            self._apply_server(key, {})
+        for key, data in servers.items():
+            self._apply_server(key, data)
+        self.synced.set()
+
+    def _apply_group(self, prefix: str, data: dict[str, str]) -> None:
+        key = f'servergroups.{prefix}'
+        previous = self.groups.get(prefix)
+        if not data:
+            if previous is None:
+                return
+            del self.groups[prefix]
+            self._publish(ChangeEvent(ChangeEventKind.GROUP_DELETED, key, prefix))
+            return
+        if previous == data:
+            return
+        self.groups[prefix] = data
+        kind = ChangeEventKind.GROUP_CREATED if previous is None else ChangeEventKind.GROUP_CHANGED
+        self._publish(ChangeEvent(kind, key, prefix, data))
+
+    def _apply_server(self, key: str, data: dict[str, str]) -> None:
+        name = self._server_name(key)
+        if not data:
+            self._seen.pop(key, None)
+            self._stale.discard(key)
+            if self.servers.pop(key, None) is not None:
+                self.repository.server_status_index.remove([key])
+                self._publish(ChangeEvent(ChangeEventKind.SERVER_DOWN, key, name))
+            return
+        self._seen[key] = monotonic()
+        was_up = key in self.servers and key not in self._stale
+        self._stale.discard(key)
+        self.servers[key] = data
+        if not was_up:
+            self.repository.server_status_index.add(key)
+            self._publish(ChangeEvent(ChangeEventKind.SERVER_UP, key, name, data))
+
+    def _check_stale(self) -> None:
+        now = monotonic()
+        if now - self._last_stale_check < POLL_TIMEOUT:
+            return
+        self._last_stale_check = now
+        for key, seen in list(self._seen.items()):
+            if key not in self._stale and now - seen > self.stale_after:
+                self._stale.add(key)
+                self._publish(ChangeEvent(ChangeEventKind.SERVER_STALE, key,
+                                          self._server_name(key), self.servers.get(key, {})))
+
+    def _handle(self, message: dict) -> None:
+        key = message['channel'][len(self._channel_prefix):]
+        if key.startswith('servergroups.'):
+            prefix = key[len('servergroups.'):]
+            self._apply_group(prefix, self.repository.get_server_group_dicts([prefix]).get(prefix, {}))
+        elif key.startswith('serverstatus.minecraft.'):
+            if message['data'] == 'expire':
+                return # comes with the `set` of SETEX
+            if message['data'] in ('del', 'expired', 'evicted'):
+                self._apply_server(key, {})
+            else:
+                try:
+                    data = self.repository.decode_server_status(self.redis.get(key))
+                except ValueError as e:
+                    logger.warning('Skipping undecodable ServerStatus %s (%s)', key, e)
+                    return
+                self._apply_server(key, data)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                self._enable_notifications()
+                pubsub.psubscribe(f'{self._channel_prefix}servergroups.*',
+                                  f'{self._channel_prefix}serverstatus.minecraft.*')
+                self.resync()
+                while not self._stop_event.is_set():
+                    if (message := pubsub.get_message(timeout=POLL_TIMEOUT)) is not None:
+                        self._handle(message)
+                    self._check_stale()
+            except ConnectionError as e:
+                self.synced.clear()
+                logger.warning('ChangeFeed lost connection (%s); resyncing', e)
+                self._stop_event.wait(POLL_TIMEOUT)
+            except Exception:
+                # timeouts, error replies, undecodable values...: the mirror can't be trusted anymore
+                self.synced.clear()
+                logger.exception('ChangeFeed failed; resyncing')
+                self._stop_event.wait(POLL_TIMEOUT)
+            finally:
+                pubsub.close()
+
+    def start(self) -> None:
+        """Starts following changes in a background thread.
+        If a stopped feed is still shutting down, waits for it first."""
+        if self._thread is not None:
+            if not self._stop_event.is_set():
+                return
+            self._thread.join()
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+        self.synced.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
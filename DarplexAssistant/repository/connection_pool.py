@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+import logging
+from threading import Lock, local
+from typing import Any, Optional
+from redis import ConnectionPool
+from ..utils import get_settings, get_settings_loader, Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """Snapshot of connection churn for a `TrackedConnectionPool`.
+    - `checked_out`: connections currently in use.
+    - `created`: connections opened since the pool was created.
+    - `reused`: checkouts served by an already open connection.
+    """
+    checked_out: int
+    created: int
+    reused: int
+
+    @property
+    def checkouts(self) -> int:
+        return self.created + self.reused
+
+
+class TrackedConnectionPool(ConnectionPool):
+    """`redis.ConnectionPool` which keeps track of created and reused connections."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._stats_lock = Lock()
+        self._created = 0
+        self._reused = 0
+        # set by `make_connection` on the thread whose checkout had to open a connection
+        self._checkout = local()
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self._checkout.created = True
+        with self._stats_lock:
+            self._created += 1
+        return connection
+
+    def get_connection(self, *args: Any, **kwargs: Any):
+        self._checkout.created = False
+        connection = super().get_connection(*args, **kwargs)
+        if not self._checkout.created: # taken from the available connections
+            with self._stats_lock:
+                self._reused += 1
+        return connection
+
+    def stats(self) -> PoolStats:
+        """Returns current `PoolStats`."""
+        with self._stats_lock:
+            return PoolStats(checked_out=len(self._in_use_connections),
+                             created=self._created,
+                             reused=self._reused)
+
+
+_pool: Optional[TrackedConnectionPool] = None
+_pool_lock = Lock()
+
+
+def get_redis_address(settings: Optional[Settings] = None) -> tuple[str, int]:
+    """Returns `(address, port)` from the `redis_user` section of `settings` (current `config.toml` by default).
+    New sessions use the current address; the process-wide pool keeps the one it was created with."""
+    data = (settings or get_settings()).redis_user
+    return data.get('redis_address', '127.0.0.1'), int(data.get('redis_port', 6379))
+
+
+def _warn_if_address_changed(settings: Settings) -> None:
+    if _pool is None:
+        return
+    host, port = get_redis_address(settings)
+    if (host, port) != (_pool.connection_kwargs['host'], _pool.connection_kwargs['port']):
+        logger.warning('redis_address/redis_port changed to %s:%d; the shared connection pool '
+                       'keeps using %s:%d until a restart', host, port,
+                       _pool.connection_kwargs['host'], _pool.connection_kwargs['port'])
+
+
+def get_connection_pool() -> TrackedConnectionPool:
+    """Returns the process-wide `TrackedConnectionPool` (created on first call).
+    It keeps its address when `config.toml` is reloaded; changing it needs a restart."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            host, port = get_redis_address()
+            _pool = TrackedConnectionPool(host=host, port=port, db=0, decode_responses=True)
+            get_settings_loader().on_reload(_warn_if_address_changed)
+        return _pool
+
+
+def close_connection_pool() -> None:
+    """Disconnects every connection of the process-wide pool.
+    Connections are reopened lazily on the next command."""
+    with _pool_lock:
+        if _pool is not None:
+            _pool.disconnect()
+
+
+def get_pool_stats() -> PoolStats:
+    """Returns `PoolStats` of the process-wide pool."""
+    return get_connection_pool().stats()
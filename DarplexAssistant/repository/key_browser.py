@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+
+KEY_SCAN_COUNT = 1000
+KEY_PAGE_SIZE = 50
+SUMMARY_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class KeyInfo:
+    """A Redis key with its `TYPE`, `MEMORY USAGE` (bytes) and `TTL` (seconds, -1 if none).
+    Columns which weren't fetched (or aren't supported by the server) are `None`."""
+    key: str
+    type: Optional[str] = None
+    memory: Optional[int] = None
+    ttl: Optional[int] = None
+
+
+@dataclass
+class PrefixStats:
+    """Key count and memory (bytes) of keys sharing a prefix, e.g. `serverstatus.minecraft.US.*`."""
+    prefix: str
+    keys: int = 0
+    memory: int = 0
+
+
+def key_prefix(key: str) -> str:
+    """Groups `key` with its siblings: `servergroups.MB` -> `servergroups.*`.
+    Keys without a `.` are their own group."""
+    head, dot, _ = key.rpartition('.')
+    return f'{head}.*' if dot else key
+
+
+class KeyBrowser:
+    """Streams keys matching `pattern` with `SCAN` (`count` keys per call) instead of `KEYS`,
+    so memory stays O(page) and the first page prints right away however big the database is.
+    SCAN may return a key more than once while keys are being added; pages are sorted,
+    the whole listing is not."""
+
+    def __init__(self, redis: 'Redis', pattern: str = '*', count: int = KEY_SCAN_COUNT) -> None:
+        self.redis = redis
+        self.pattern = pattern
+        self.count = count
+
+    def keys(self) -> Iterator[str]:
+        yield from self.redis.scan_iter(match=self.pattern, count=self.count)
+
+    def _batches(self, size: int) -> Iterator[list[str]]:
+        keys = self.keys()
+        while batch := list(islice(keys, size)):
+            yield batch
+
+    def describe(self, keys: list[str], memory: bool = True) -> list[KeyInfo]:
+        """Fetches `TYPE`, `TTL` and (if `memory`) `MEMORY USAGE` of `keys` in one pipelined round trip."""
+        pipeline = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.type(key)
+            pipeline.ttl(key)
+            if memory:
+                pipeline.memory_usage(key)
+        results = pipeline.execute(raise_on_error=False)
+        step = 3 if memory else 2
+        infos = []
+        for i, key in enumerate(keys):
+            key_type, ttl, *usage = results[i * step:(i + 1) * step]
+            infos.append(KeyInfo(key,
+                                 key_type if isinstance(key_type, str) else None,
+                                 usage[0] if usage and isinstance(usage[0], int) else None,
+                                 ttl if isinstance(ttl, int) else None))
+        return infos
+
+    def pages(self, page_size: int = KEY_PAGE_SIZE, details: bool = False) -> Iterator[list[KeyInfo]]:
+        """Returns Iterator of sorted pages of at most `page_size` keys.
+        With `details`, every page costs one extra pipelined round trip for its columns."""
+        for batch in self._batches(page_size):
+            batch.sort()
+            yield self.describe(batch) if details else [KeyInfo(key) for key in batch]
+
+    def summarize(self, memory: bool = True) -> list[PrefixStats]:
+        """Aggregates key count (and `MEMORY USAGE` if `memory`) by `key_prefix`.
+        Memory is fetched in pipelined batches of `SUMMARY_BATCH_SIZE` keys.
+        Returns stats sorted by memory, then key count."""
+        stats: dict[str, PrefixStats] = {}
+        for batch in self._batches(SUMMARY_BATCH_SIZE):
+            usages: list = [None] * len(batch)
+            if memory:
+                pipeline = self.redis.pipeline(transaction=False)
+                for key in batch:
+                    pipeline.memory_usage(key)
+                usages = pipeline.execute(raise_on_error=False)
+            for key, usage in zip(batch, usages):
+                prefix = key_prefix(key)
+                if (prefix_stats := stats.get(prefix)) is None:
+                    prefix_stats = stats[prefix] = PrefixStats(prefix)
+                prefix_stats.keys += 1
+                if isinstance(usage, int):
+                    prefix_stats.memory += usage
+        return sorted(stats.values(), key=lambda prefix_stats: (-prefix_stats.memory, -prefix_stats.keys, prefix_stats.prefix))
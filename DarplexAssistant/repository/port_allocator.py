@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+from redis import Redis
+
+
+PORT_SECTIONS_KEY = 'darplexassistant.portsections'
+SERVER_GROUPS_KEY = 'servergroups'
+MIN_PORT = 25000
+MAX_PORT = 26000
+PORT_SECTION_WIDTH = 10
+
+
+class PortRangeExhaustedException(Exception):
+    pass
+
+
+# Lua merging the `portSection` of every ServerGroup hash (except `skip`'s) into the sorted set.
+# Runs at the start of every script, so groups written by other tools (redis-cli, the Mineplex
+# side, older versions) are always taken into account, atomically with the allocation itself.
+# KEYS[1]: sorted set (member: prefix, score: portSection), KEYS[2]: `servergroups` set
+MERGE_SECTIONS = """
+local function merge_sections(skip)
+    for _, prefix in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+        if prefix ~= skip then
+            local port = tonumber(redis.call('HGET', 'servergroups.' .. prefix, 'portSection'))
+            if port and tonumber(redis.call('ZSCORE', KEYS[1], prefix)) ~= port then
+                redis.call('ZADD', KEYS[1], port, prefix)
+            end
+        end
+    end
+end
+"""
+
+# KEYS: see `MERGE_SECTIONS`
+# ARGV: prefix, preferred port ('' for none), min port, max port, width, reserve ('1' or '0')
+# Returns allocated port or -1 if no gap is wide enough.
+# The prefix's own hash is not merged: its `portSection` is only kept (as preferred port) if it is free.
+ALLOCATE_SCRIPT = MERGE_SECTIONS + """
+local prefix, preferred = ARGV[1], tonumber(ARGV[2])
+local low, high, width = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local reserve = ARGV[6] == '1'
+merge_sections(prefix)
+if reserve then
+    local existing = redis.call('ZSCORE', KEYS[1], prefix)
+    if existing then return tonumber(existing) end
+    preferred = preferred or tonumber(redis.call('HGET', 'servergroups.' .. prefix, 'portSection'))
+end
+local function take(port)
+    if reserve then redis.call('ZADD', KEYS[1], port, prefix) end
+    return port
+end
+if preferred and preferred >= low and preferred <= high
+   and #redis.call('ZRANGEBYSCORE', KEYS[1], preferred - width, preferred + width, 'LIMIT', 0, 1) == 0 then
+    return take(preferred)
+end
+local candidate = low
+local sections = redis.call('ZRANGEBYSCORE', KEYS[1], low - width, '+inf', 'WITHSCORES')
+for i = 2, #sections, 2 do
+    local port = tonumber(sections[i])
+    if port - width > candidate then break end
+    candidate = math.max(candidate, port + width + 1)
+end
+if candidate > high then return -1 end
+return take(candidate)
+"""
+
+# KEYS: see `MERGE_SECTIONS`
+SYNC_SCRIPT = MERGE_SECTIONS + """
+merge_sections(nil)
+return redis.call('ZCARD', KEYS[1])
+"""
+
+SECTION_KEYS = [PORT_SECTIONS_KEY, SERVER_GROUPS_KEY]
+
+
+def allocate_args(prefix: str, preferred: Optional[int], reserve: bool,
+    low: int = MIN_PORT,
+    high: int = MAX_PORT,
+    width: int = PORT_SECTION_WIDTH
+) -> list:
+    """`ARGV` of `ALLOCATE_SCRIPT`."""
+    return [prefix, '' if preferred is None else preferred, low, high, width, int(reserve)]
+
+
+def allocated_port(result: Any) -> int:
+    """Returns the port `ALLOCATE_SCRIPT` returned. Raises `PortRangeExhaustedException` if none."""
+    port = int(result)
+    if port < 0:
+        raise PortRangeExhaustedException()
+    return port
+
+
+@dataclass(frozen=True)
+class PortRangeStats:
+    """Usage of the port range.
+    - `free_ports`: ports which could start a new section.
+    - `gaps`: number of separate free runs.
+    - `remaining_groups`: how many more sections fit.
+    - `fragmentation`: `1 - largest_gap / free_ports` (0 when free space is contiguous).
+    """
+    allocated: int
+    free_ports: int
+    gaps: int
+    largest_gap: int
+    remaining_groups: int
+
+    @property
+    def fragmentation(self) -> float:
+        if self.free_ports == 0:
+            return 0.0
+        return 1 - self.largest_gap / self.free_ports
+
+
+class PortSectionAllocator:
+    """Allocates ServerGroup `portSection`s from a Redis sorted set.
+    Sections must be more than `width` ports apart (same rule as `get_if_port_conflicts`).
+    Reservations run as one Lua script, so concurrent `ServerGroup.create()` calls can't collide.
+    Every call first merges the `portSection` of every ServerGroup hash into the set (in the same
+    script), so groups created without this allocator are never handed out again.
+    Sections of groups deleted by other tools stay taken until `release`d.
+    """
+
+    def __init__(self,
+        redis: Redis,
+        low: int = MIN_PORT,
+        high: int = MAX_PORT,
+        width: int = PORT_SECTION_WIDTH
+    ) -> None:
+        self.redis = redis
+        self.low = low
+        self.high = high
+        self.width = width
+        self._script = redis.register_script(ALLOCATE_SCRIPT)
+        self._sync_script = redis.register_script(SYNC_SCRIPT)
+
+    def sync(self) -> int:
+        """Merges the `portSection` of every ServerGroup hash into the sorted set.
+        Returns number of allocated sections."""
+        return int(self._sync_script(keys=SECTION_KEYS))
+
+    def _run(self, prefix: str, preferred: Optional[int], reserve: bool) -> int:
+        args = allocate_args(prefix, preferred, reserve, self.low, self.high, self.width)
+        return allocated_port(self._script(keys=SECTION_KEYS, args=args))
+
+    def peek(self) -> int:
+        """Returns first free port section without reserving it."""
+        return self._run('', None, False)
+
+    def reserve(self, prefix: str, preferred: Optional[int] = None) -> int:
+        """Atomically reserves a port section for `prefix` and returns it.
+        Keeps `preferred` (default: `portSection` of its hash) if it is free; returns the existing
+        section if `prefix` already has one. Raises `PortRangeExhaustedException` if no gap is wide enough."""
+        return self._run(prefix, preferred, True)
+
+    def release(self, prefix: str) -> None:
+        self.redis.zrem(PORT_SECTIONS_KEY, prefix)
+
+    def conflicts(self, port: int) -> bool:
+        """Returns if `port` is within `width` of an allocated section."""
+        pipeline = self.redis.pipeline(transaction=False)
+        self._sync_script(keys=SECTION_KEYS, client=pipeline)
+        pipeline.zrangebyscore(PORT_SECTIONS_KEY, port - self.width, port + self.width, start=0, num=1)
+        return len(pipeline.execute()[-1]) > 0
+
+    def stats(self) -> PortRangeStats:
+        pipeline = self.redis.pipeline(transaction=False)
+        self._sync_script(keys=SECTION_KEYS, client=pipeline)
+        pipeline.zrange(PORT_SECTIONS_KEY, 0, -1, withscores=True)
+        sections = [int(port) for _, port in pipeline.execute()[-1]]
+        return compute_port_range_stats(sections, self.low, self.high, self.width)
+
+
+class AsyncPortSectionAllocator:
+    """asyncio variant of `PortSectionAllocator` for `redis.asyncio` clients:
+    same scripts, arguments and results, only the round trips are awaited."""
+
+    def __init__(self,
+        redis,
+        low: int = MIN_PORT,
+        high: int = MAX_PORT,
+        width: int = PORT_SECTION_WIDTH
+    ) -> None:
+        self.redis = redis
+        self.low = low
+        self.high = high
+        self.width = width
+        self._script = redis.register_script(ALLOCATE_SCRIPT)
+        self._sync_script = redis.register_script(SYNC_SCRIPT)
+
+    async def sync(self) -> int:
+        return int(await self._sync_script(keys=SECTION_KEYS))
+
+    async def _run(self, prefix: str, preferred: Optional[int], reserve: bool) -> int:
+        args = allocate_args(prefix, preferred, reserve, self.low, self.high, self.width)
+        return allocated_port(await self._script(keys=SECTION_KEYS, args=args))
+
+    async def peek(self) -> int:
+        return await self._run('', None, False)
+
+    async def reserve(self, prefix: str, preferred: Optional[int] = None) -> int:
+        return await self._run(prefix, preferred, True)
+
+    async def release(self, prefix: str) -> None:
+        await self.redis.zrem(PORT_SECTIONS_KEY, prefix)
+
+    async def conflicts(self, port: int) -> bool:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            await self._sync_script(keys=SECTION_KEYS, client=pipeline)
+            pipeline.zrangebyscore(PORT_SECTIONS_KEY, port - self.width, port + self.width, start=0, num=1)
+            return len((await pipeline.execute())[-1]) > 0
+
+    async def stats(self) -> PortRangeStats:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            await self._sync_script(keys=SECTION_KEYS, client=pipeline)
+            pipeline.zrange(PORT_SECTIONS_KEY, 0, -1, withscores=True)
+            sections = [int(port) for _, port in (await pipeline.execute())[-1]]
+        return compute_port_range_stats(sections, self.low, self.high, self.width)
+
+
+def compute_port_range_stats(sections: list[int],
+    low: int = MIN_PORT,
+    high: int = MAX_PORT,
+    width: int = PORT_SECTION_WIDTH
+) -> PortRangeStats:
+    """Returns `PortRangeStats` of allocated `sections` within `low`..`high`."""
+    runs: list[int] = []
+    candidate = low
+    for port in sorted(sections):
+        if port - width > candidate:
+            # free starting ports are candidate .. port - width - 1
+            runs.append(min(port - width - 1, high) - candidate + 1)
+        candidate = max(candidate, port + width + 1)
+        if candidate > high:
+            break
+    if candidate <= high:
+        runs.append(high - candidate + 1)
+    return PortRangeStats(allocated=len(sections),
+                          free_ports=sum(runs),
+                          gaps=len(runs),
+                          largest_gap=max(runs, default=0),
+                          remaining_groups=sum((run - 1) // (width + 1) + 1 for run in runs))
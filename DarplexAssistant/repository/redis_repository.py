@@ -1,25 +1,68 @@
 from contextlib import contextmanager
 import json
 from random import randint
-from redis import Redis
-from typing import Any, ContextManager, Iterator, Optional, Self
-import toml
-from ..utils import CONFIG_PATH, create_config_if_not_exists, Region
+from redis import ConnectionPool, Redis
+from threading import Lock
+from typing import Any, ContextManager, Iterable, Iterator, Optional, Self
+from ..utils import Region
+from .connection_pool import PoolStats, TrackedConnectionPool, get_connection_pool
+from .key_browser import KEY_SCAN_COUNT, KeyBrowser
+from .port_allocator import MAX_PORT, MIN_PORT, PortRangeStats, PortSectionAllocator
+from .server_status_index import ServerStatusIndex
+
+
+SERVER_STATUS_BATCH_SIZE = 500
+
+# KEYS[1]: servergroups.(prefix); ARGV: delta or absolute count, 'set' or 'add'
+# Returns new `totalServers` (clamped at 0) or -1 if the ServerGroup DNE.
+SCALE_TOTAL_SERVERS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+local count = tonumber(ARGV[1])
+if ARGV[2] == 'add' then
+    count = (tonumber(redis.call('HGET', KEYS[1], 'totalServers')) or 0) + count
+end
+if count < 0 then count = 0 end
+redis.call('HSET', KEYS[1], 'totalServers', count)
+return count
+"""
+
+
+def scale_keys(prefix: str) -> list[str]:
+    """`KEYS` of `SCALE_TOTAL_SERVERS_SCRIPT`."""
+    return [f'servergroups.{prefix}']
+
+
+def scaled_count(result: Any) -> Optional[int]:
+    """Returns new `totalServers` `SCALE_TOTAL_SERVERS_SCRIPT` returned, or `None` if the ServerGroup DNE."""
+    count = int(result)
+    return None if count < 0 else count
 
     
 class RedisRepository:
-    def __init__(self, host: str, port: int) -> None:
-        self.redis = Redis(host=host, port=port, db=0, decode_responses=True)
+    def __init__(self, host: str, port: int, connection_pool: Optional[ConnectionPool] = None) -> None:
+        if connection_pool is not None:
+            self.redis = Redis(connection_pool=connection_pool)
+        else:
+            self.redis = Redis(host=host, port=port, db=0, decode_responses=True)
+        self.server_status_index = ServerStatusIndex(self.redis)
+        self.port_allocator = PortSectionAllocator(self.redis)
+        self._scale_script = self.redis.register_script(SCALE_TOTAL_SERVERS_SCRIPT)
     
     def close_connection(self) -> None:
-        """Closes redis connection."""
+        """Closes redis connection.
+        Connections of a shared pool are released back to the pool instead."""
         self.redis.close()
 
+    def pool_stats(self) -> Optional[PoolStats]:
+        """Returns `PoolStats` if backed by a `TrackedConnectionPool`."""
+        pool = self.redis.connection_pool
+        if not isinstance(pool, TrackedConnectionPool):
+            return None
+        return pool.stats()
+
     def server_group_exists(self, prefix: str) -> bool:
         """Returns whether a server-group exists based on prefix."""
-        for _ in self.redis.scan_iter(f'servergroups.{prefix}'):
-            return True
-        return False
+        return self.redis.exists(f'servergroups.{prefix}') > 0
 
     def delete_server_group(self, prefix: str) -> None:
         """Deletes `ServerGroup` with specified server prefix from Redis.
@@ -29,13 +72,11 @@ class RedisRepository:
             return
         self.redis.srem('servergroups', prefix)
         self.redis.delete(f'servergroups.{prefix}')
+        self.port_allocator.release(prefix)
 
     def get_if_port_conflicts(self, port: int) -> bool:
         """Returns if `port` conflicts with any existing port sections in the Redis db."""
-        return any(port - 10 <= port_section <= port + 10
-                   for port_section in 
-                   map(lambda group: int(self.redis.hget(group, 'portSection') or 0),
-                                         self.get_server_groups()))
+        return self.port_allocator.conflicts(port)
 
     def create_server_group(self, prefix: str, data: dict[str, str]) -> None:
         """Creates `ServerGroup` with specified server prefix from Redis.
@@ -45,37 +86,75 @@ class RedisRepository:
             return
         self.redis.sadd('servergroups', prefix)
         self.redis.hmset(f'servergroups.{prefix}', data)
+        if data.get('portSection', '').isdigit():
+            port = self.port_allocator.reserve(prefix, int(data['portSection']))
+            if port != int(data['portSection']): # taken meanwhile
+                self.redis.hset(f'servergroups.{prefix}', 'portSection', port)
+
+    def scale_total_servers(self, prefix: str, delta: int) -> Optional[int]:
+        """Atomically adds `delta` to `totalServers` (clamped at 0) in one round trip.
+        Returns new `totalServers` or `None` if ServerGroup DNE."""
+        return scaled_count(self._scale_script(keys=scale_keys(prefix), args=[delta, 'add']))
+
+    def set_total_servers(self, prefix: str, count: int) -> Optional[int]:
+        """Atomically sets `totalServers` to `count` (clamped at 0).
+        Returns new `totalServers` or `None` if ServerGroup DNE."""
+        return scaled_count(self._scale_script(keys=scale_keys(prefix), args=[count, 'set']))
+
+    def scale_server_groups(self, deltas: dict[str, int]) -> dict[str, Optional[int]]:
+        """Scales many ServerGroups in a single pipelined round trip.
+        `deltas` maps prefix to change of `totalServers`.
+        Returns prefix mapped to new `totalServers` (`None` if ServerGroup DNE)."""
+        if len(deltas) == 0:
+            return {}
+        pipeline = self.redis.pipeline(transaction=False)
+        for prefix, delta in deltas.items():
+            self._scale_script(keys=scale_keys(prefix), args=[delta, 'add'], client=pipeline)
+        return dict((prefix, scaled_count(count)) for prefix, count in zip(deltas, pipeline.execute()))
 
     @staticmethod
     def generate_random_port() -> int:
         """Returns random port."""
-        return randint(25000, 26000)
+        return randint(MIN_PORT, MAX_PORT)
 
     def next_available_port(self) -> int:
-        """Gets next available non-conflicting port (not between ten of any existing ports)"""
-        port = self.generate_random_port()
-        while self.get_if_port_conflicts(port):
-            port = self.generate_random_port()
-        return port
+        """Gets next available non-conflicting port (not between ten of any existing ports).
+        Does not reserve it; see `reserve_port_section`."""
+        return self.port_allocator.peek()
+
+    def reserve_port_section(self, prefix: str, preferred: Optional[int] = None) -> int:
+        """Atomically reserves a port section for `prefix`.
+        Keeps `preferred` if it does not conflict."""
+        return self.port_allocator.reserve(prefix, preferred)
+
+    def get_port_range_stats(self) -> PortRangeStats:
+        """Returns allocation and fragmentation stats of the port range."""
+        return self.port_allocator.stats()
 
     def get_available_minecraft_servers(self) -> Iterator[str]:
         """Returns Iterator of ALL cached Minecraft servers.
         ServerStatus is a cached ServerGroup for online servers.
+        Read from `ServerStatusIndex` (SCAN only when the index is rebuilt).
         """
-        yield from self.redis.scan_iter('serverstatus.minecraft.*.*')
+        yield from self.server_status_index.members()
+
+    def browse_keys(self, pattern: str = '*', count: int = KEY_SCAN_COUNT) -> KeyBrowser:
+        """Returns a `KeyBrowser` streaming keys which match `pattern`."""
+        return KeyBrowser(self.redis, pattern, count)
 
     def get_server_groups(self) -> Iterator[str]:
-        """Returns Iterator of ServerGroups keys."""
-        yield from self.redis.scan_iter('servergroups.*')
+        """Returns Iterator of ServerGroups keys (from the `servergroups` set)."""
+        yield from (f'servergroups.{prefix}' for prefix in self.redis.smembers('servergroups'))
 
     def iterate_minecraft_servers_by_group(self, group: str, region: Region) -> Iterator[str]:
         """Returns Iterator of matching MinecraftServer keys by region.
         If region == `Region.ALL`, returns under all regions."""
-        if region == Region.ALL:
-            yield from self.redis.scan_iter(f'serverstatus.minecraft.{Region.US.value}.{group}-*')
-            yield from self.redis.scan_iter(f'serverstatus.minecraft.{Region.EU.value}.{group}-*')
-        else:
-            yield from self.redis.scan_iter(f'serverstatus.minecraft.{region.value}.{group}-*')
+        yield from self.server_status_index.members(region, group)
+
+    def expect_minecraft_servers(self, server_names: Iterable[str], region: Region) -> None:
+        """Indexes ServerStatus keys of servers being deployed, so reads find them as soon as they boot."""
+        self.server_status_index.expect(ServerStatusIndex.server_status_key(server_name, region)
+                                        for server_name in server_names)
 
     def get_if_minecraft_server_exists(self, server_name: str, region: Region) -> bool:
         """Returns if MinecraftServer exists in the Redis cache."""
@@ -84,7 +163,40 @@ class RedisRepository:
     def get_server_group_dict(self, group: str) -> dict[str, str]:
         """Returns Json dictionary of ServerGroup from Redis."""
         group = group.replace('servergroups.', '')
-        res = self.redis.hgetall(f'servergroups.{group}')
+        return self.decode_server_group(self.redis.hgetall(f'servergroups.{group}'))
+
+    @staticmethod
+    def decode_server_group(res: Optional[dict]) -> dict[str, str]:
+        """Decodes `HGETALL` of a ServerGroup into Json dictionary (`{}` if missing)."""
+        if res is None:
+            return {}
+        return json.loads(str(res).replace("'", '"'))
+
+    @classmethod
+    def decode_server_statuses(cls, server_keys: list[str], values: list[Optional[str]]) -> dict[str, dict[str, str]]:
+        """Decodes `MGET` values of `server_keys`, leaving out missing and undecodable ones."""
+        server_statuses = {}
+        for key, value in zip(server_keys, values):
+            if value is None:
+                continue
+            try:
+                server_statuses[key] = cls.decode_server_status(value)
+            except ValueError:
+                continue # not written by a server; one bad key mustn't hide the others
+        return server_statuses
+
+    def get_server_group_dicts(self, groups: list[str]) -> dict[str, dict[str, str]]:
+        """Returns Json dictionaries of many ServerGroups in one pipelined round trip.
+        ServerGroups which DNE are left out."""
+        prefixes = [group.replace('servergroups.', '') for group in groups]
+        pipeline = self.redis.pipeline(transaction=False)
+        for prefix in prefixes:
+            pipeline.hgetall(f'servergroups.{prefix}')
+        return dict((prefix, result) for prefix, result in zip(prefixes, pipeline.execute()) if result)
+
+    @staticmethod
+    def decode_server_status(res: Optional[str]) -> dict[str, str]:
+        """Decodes raw ServerStatus value into Json dictionary (`{}` if missing)."""
         if res is None:
             return {}
         return json.loads(str(res).replace("'", '"'))
@@ -94,14 +206,39 @@ class RedisRepository:
         server_key = f'serverstatus.minecraft.{region.value}.{server_name}'
         if server_name.count('.') == 3:
             server_key = server_name
-        res = self.redis.get(server_key)
-        if res is None:
+        return self.decode_server_status(self.redis.get(server_key))
+
+    def get_server_status_dicts(self, server_keys: list[str]) -> dict[str, dict[str, str]]:
+        """Returns Json dictionaries of many ServerStatus keys in one pipelined `MGET`.
+        Keys which expired between SCAN and MGET or aren't valid Json are left out."""
+        if len(server_keys) == 0:
             return {}
-        return json.loads(str(res).replace("'", '"'))
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.mget(server_keys)
+        values, = pipeline.execute()
+        return self.decode_server_statuses(server_keys, values)
+
+    def load_server_statuses(self, 
+        batch_size: int = SERVER_STATUS_BATCH_SIZE,
+        region: Optional[Region] = None,
+        group: Optional[str] = None
+    ) -> Iterator[tuple[str, dict[str, str]]]:
+        """Returns Iterator of `(key, ServerStatus dict)` for every indexed ServerStatus key.
+        Reads key names from `ServerStatusIndex`, then one `MGET` round trip per `batch_size` keys.
+        Keys which no longer exist are dropped from the index (unless their server is still being deployed).
+        """
+        keys = list(self.server_status_index.members(region, group))
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            server_statuses = self.get_server_status_dicts(batch)
+            if len(server_statuses) < len(batch):
+                self.server_status_index.prune(key for key in batch if key not in server_statuses)
+            yield from server_statuses.items()
 
     @classmethod
     def create_session(cls) -> Self:
         """Creates a RedisRepository session using default connection information.
+        Sessions share the process-wide connection pool.
         
         Defaults: 
         - Address: 127.0.0.1
@@ -109,22 +246,31 @@ class RedisRepository:
 
         Change these in config/`config.toml`
         """
+        pool = get_connection_pool()
+        kwargs = pool.connection_kwargs
+        return cls(kwargs.get('host', '127.0.0.1'), kwargs.get('port', 6379), pool)
+
+
+_shared_repository: Optional[RedisRepository] = None
+_shared_repository_lock = Lock()
+
 
-        create_config_if_not_exists()
-        with open(CONFIG_PATH, 'r') as fp:
-            data = toml.load(fp).get('redis_user', None)
-        address, port = data.get('redis_address', '127.0.0.1'), data.get('redis_port', 6379)
-        return cls(address, port)
+def get_shared_repository() -> RedisRepository:
+    """Returns the process-wide `RedisRepository`.
+    Thread-safe: every command checks a connection out of the shared pool."""
+    global _shared_repository
+    if _shared_repository is not None:
+        return _shared_repository
+    with _shared_repository_lock:
+        if _shared_repository is None:
+            _shared_repository = RedisRepository.create_session()
+        return _shared_repository
 
 
 @contextmanager
 def get_redis_repo() -> Iterator[RedisRepository]:
     """For quick function call in `RedisRepository`. 
-    Closes session immediately after result is retrieved.
+    Yields the shared repository; connections are returned to the pool, not closed.
     """
-    repository = RedisRepository.create_session()
-    try:
-        yield repository
-    finally:
-        repository.close_connection()
+    yield get_shared_repository()
 
@@ -0,0 +1,183 @@
+from time import time
+from typing import Iterable, Optional
+from redis import Redis
+from ..utils import get_settings, Region
+
+
+INDEX_PREFIX = 'darplexassistant.index.serverstatus'
+SETS_KEY = f'{INDEX_PREFIX}.sets'
+BUILT_KEY = f'{INDEX_PREFIX}.built'
+EXPECTED_KEY = f'{INDEX_PREFIX}.expected'
+SERVER_STATUS_PATTERN = 'serverstatus.minecraft.*.*'
+INDEX_REBUILD_INTERVAL = 300
+EXPECT_SECONDS = 300
+SCAN_COUNT = 1000
+
+
+def get_index_rebuild_interval() -> int:
+    """Returns `index_rebuild_interval` of the `cache` section of `config.toml`."""
+    return int(get_settings().cache.get('index_rebuild_interval', INDEX_REBUILD_INTERVAL))
+
+
+class ServerStatusIndex:
+    """Secondary indexes of ServerStatus keys kept as Redis sets:
+    - `darplexassistant.index.serverstatus`: every ServerStatus key.
+    - `darplexassistant.index.serverstatus.(REGION)`: keys per region.
+    - `darplexassistant.index.serverstatus.(REGION).(group)`: keys per region and group.
+
+    ServerStatus keys are written by the servers themselves, so indexes are kept current by:
+    - `expect`: a server is being deployed; its key is indexed before the server writes it.
+    - `add`/`remove`: a key showed up or went away (as `ChangeFeed` reports).
+    - `prune`: keys found missing while reading are dropped, unless still `expect`ed.
+    A full SCAN only happens when the index is missing, was `invalidate`d, or is older than
+    `rebuild_interval` seconds (default: `index_rebuild_interval` of `config.toml`), which
+    picks up servers nobody reported. Only the `.built` marker expires; the sets never do,
+    and a rebuild swaps them in one transaction, so a read never sees an index which is partly gone.
+    """
+
+    def __init__(self, redis: Redis, rebuild_interval: Optional[int] = None) -> None:
+        self.redis = redis
+        self._rebuild_interval = rebuild_interval
+
+    @property
+    def rebuild_interval(self) -> int:
+        return self._rebuild_interval if self._rebuild_interval is not None else get_index_rebuild_interval()
+
+    @staticmethod
+    def index_key(region: Optional[Region] = None, group: Optional[str] = None) -> str:
+        """Returns index set name. `group` requires `region`."""
+        if region is None or region == Region.ALL:
+            return INDEX_PREFIX
+        if group is None:
+            return f'{INDEX_PREFIX}.{region.value}'
+        return f'{INDEX_PREFIX}.{region.value}.{group}'
+
+    @staticmethod
+    def parse_server_status_key(server_status_key: str) -> Optional[tuple[Region, str]]:
+        """Returns `(Region, group)` of `serverstatus.minecraft.(REGION).(group)-(n)`."""
+        parts = server_status_key.split('.')
+        if len(parts) != 4:
+            return None
+        region = next((region for region in Region if region.value == parts[2]), Region.US)
+        return region, parts[3].split('-')[0]
+
+    @classmethod
+    def index_keys_of(cls, server_status_key: str) -> tuple[str, ...]:
+        """Returns every index set `server_status_key` belongs in (none if it isn't a ServerStatus key)."""
+        parsed = cls.parse_server_status_key(server_status_key)
+        if parsed is None:
+            return ()
+        region, group = parsed
+        return (cls.index_key(), cls.index_key(region), cls.index_key(region, group))
+
+    @classmethod
+    def member_index_keys(cls, region: Optional[Region] = None, group: Optional[str] = None) -> list[str]:
+        """Returns the index sets to union for `members(region, group)`."""
+        if group is not None and region in (None, Region.ALL):
+            return [cls.index_key(region, group) for region in Region if region != Region.ALL]
+        return [cls.index_key(region, group)]
+
+    @classmethod
+    def group_by_index(cls, server_status_keys: Iterable[str]) -> dict[str, set[str]]:
+        """Returns members of every index set for a full list of ServerStatus keys."""
+        members: dict[str, set[str]] = {cls.index_key(): set()}
+        for key in server_status_keys:
+            for index_key in cls.index_keys_of(key):
+                members.setdefault(index_key, set()).add(key)
+        return members
+
+    @staticmethod
+    def server_status_key(server_name: str, region: Region) -> str:
+        return f'serverstatus.minecraft.{region.value}.{server_name}'
+
+    @staticmethod
+    def queue_rebuild(pipeline, previous: set[str], members: dict[str, set[str]], ttl: int) -> None:
+        """Queues swapping the index sets `previous` for `members` on a `MULTI` pipeline (sync or async)."""
+        pipeline.delete(*previous.union(members), SETS_KEY)
+        for index_key, keys in members.items():
+            if len(keys) > 0:
+                pipeline.sadd(index_key, *keys)
+        pipeline.sadd(SETS_KEY, *members)
+        # marker keeps an empty keyspace from being rescanned on every call, and
+        # is the only key to expire: sets stay readable until the next rebuild swaps them
+        pipeline.set(BUILT_KEY, 1, ex=ttl)
+        pipeline.zremrangebyscore(EXPECTED_KEY, '-inf', time())
+
+    @classmethod
+    def queue_add(cls, pipeline, server_status_key: str) -> None:
+        """Queues indexing a ServerStatus key on a pipeline (sync or async)."""
+        if len(index_keys := cls.index_keys_of(server_status_key)) == 0:
+            return
+        for index_key in index_keys:
+            pipeline.sadd(index_key, server_status_key)
+        pipeline.sadd(SETS_KEY, *index_keys)
+
+    @classmethod
+    def queue_expect(cls, pipeline, server_status_keys: Iterable[str], within: float) -> None:
+        """Queues indexing keys of servers being deployed, which `prune` keeps for `within` seconds."""
+        deadline = time() + within
+        for key in server_status_keys:
+            cls.queue_add(pipeline, key)
+            pipeline.zadd(EXPECTED_KEY, {key: deadline})
+
+    @classmethod
+    def queue_remove(cls, pipeline, server_status_keys: Iterable[str]) -> None:
+        """Queues dropping ServerStatus keys from every index on a pipeline (sync or async)."""
+        for key in server_status_keys:
+            for index_key in cls.index_keys_of(key):
+                pipeline.srem(index_key, key)
+
+    def rebuild(self) -> int:
+        """Rebuilds every index from one SCAN pass (plus keys still `expect`ed). Returns number of indexed keys."""
+        scanned = set(self.redis.scan_iter(SERVER_STATUS_PATTERN, count=SCAN_COUNT))
+        members = self.group_by_index(scanned.union(self.redis.zrangebyscore(EXPECTED_KEY, time(), '+inf')))
+        previous = self.redis.smembers(SETS_KEY)
+        pipeline = self.redis.pipeline(transaction=True)
+        self.queue_rebuild(pipeline, previous, members, self.rebuild_interval)
+        pipeline.execute()
+        return len(members[self.index_key()])
+
+    def invalidate(self) -> None:
+        """Makes the next read rebuild the index."""
+        self.redis.delete(BUILT_KEY)
+
+    def ensure_built(self) -> None:
+        if not self.redis.exists(BUILT_KEY):
+            self.rebuild()
+
+    def members(self, region: Optional[Region] = None, group: Optional[str] = None) -> set[str]:
+        """Returns indexed ServerStatus keys.
+        If region == `Region.ALL` and `group` is set, returns the group under all regions."""
+        self.ensure_built()
+        return self.redis.sunion(*self.member_index_keys(region, group))
+
+    def add(self, server_status_key: str) -> None:
+        """Indexes a ServerStatus key which showed up.
+        Does nothing if indexes are not built; the next rebuild picks it up."""
+        if not self.redis.exists(BUILT_KEY):
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        self.queue_add(pipeline, server_status_key)
+        pipeline.execute()
+
+    def expect(self, server_status_keys: Iterable[str], within: float = EXPECT_SECONDS) -> None:
+        """Indexes keys of servers being deployed before they write them,
+        so reads pick them up as soon as they do (`prune` keeps them for `within` seconds)."""
+        pipeline = self.redis.pipeline(transaction=False)
+        self.queue_expect(pipeline, server_status_keys, within)
+        pipeline.execute()
+
+    def remove(self, server_status_keys: Iterable[str]) -> None:
+        """Drops ServerStatus keys from every index."""
+        pipeline = self.redis.pipeline(transaction=False)
+        self.queue_remove(pipeline, server_status_keys)
+        pipeline.execute()
+
+    def prune(self, missing_keys: Iterable[str]) -> None:
+        """Drops keys found missing while reading, except ones still `expect`ed."""
+        now = time()
+        expected = set(self.redis.zrangebyscore(EXPECTED_KEY, now, '+inf'))
+        pipeline = self.redis.pipeline(transaction=False)
+        self.queue_remove(pipeline, (key for key in missing_keys if key not in expected))
+        pipeline.zremrangebyscore(EXPECTED_KEY, '-inf', now)
+        pipeline.execute()
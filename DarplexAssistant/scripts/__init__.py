@@ -1,4 +1,33 @@
-from .start_server import start_server
-from .stop_server import stop_server
+from typing import TYPE_CHECKING
+from .._lazy import attach
 
-__all__ = ('start_server', 'stop_server')
+if TYPE_CHECKING:
+    from .provision import ProvisionResult, ServerSpec, provision_many
+    from .reaper import Reaper, get_reaper
+    from .server_config import RenderResult, render_server_files, write_rendered_files
+    from .standby_pool import StandbyPool, get_standby_pool
+    from .start_server import start_server
+    from .stop_server import stop_server
+    from .supervisor import ProcessSupervisor, ServerProcess, ServerStillRunningException, get_supervisor
+    from .world_templates import WorldTemplateCache, get_world_template_cache
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'start_server': '.start_server',
+    'stop_server': '.stop_server',
+    'WorldTemplateCache': '.world_templates',
+    'get_world_template_cache': '.world_templates',
+    'ServerSpec': '.provision',
+    'ProvisionResult': '.provision',
+    'provision_many': '.provision',
+    'StandbyPool': '.standby_pool',
+    'get_standby_pool': '.standby_pool',
+    'ProcessSupervisor': '.supervisor',
+    'ServerProcess': '.supervisor',
+    'ServerStillRunningException': '.supervisor',
+    'get_supervisor': '.supervisor',
+    'RenderResult': '.server_config',
+    'render_server_files': '.server_config',
+    'write_rendered_files': '.server_config',
+    'Reaper': '.reaper',
+    'get_reaper': '.reaper',
+})
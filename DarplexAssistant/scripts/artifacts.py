@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+from typing import Iterable
+
+from ..utils import LinkMode, clone_file
+from .reaper import get_reaper
+from .server_config import RENDER_MANIFEST_FILE, read_render_manifest
+
+
+MANIFEST_FILE = '.darplex-artifacts.json'
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """Immutable file from `jars_directory` placed at `destination` (relative to the server directory)."""
+    source: Path
+    destination: str
+
+
+@dataclass(frozen=True)
+class MaterializeResult:
+    refreshed: list[str]
+    unchanged: list[str]
+    removed: list[str]
+
+
+def get_server_artifacts(
+    jar_path: Path,
+    plugin_file: str,
+    add_anticheat: bool,
+    add_worldedit: bool
+) -> list[Artifact]:
+    """Returns jars a server needs: `spigot.jar`, its plugin and optional AntiCheat/WorldEdit/ViaVersion."""
+    artifacts = [Artifact(jar_path / 'spigot.jar', 'spigot.jar'),
+                 Artifact(jar_path / plugin_file, f'plugins/{plugin_file}')]
+    optional = (('AntiCheat.jar', add_anticheat), ('WorldEdit.jar', add_worldedit), ('ViaVersion.jar', True))
+    artifacts.extend(Artifact(jar_path / jar, f'plugins/{jar}')
+                     for jar, wanted in optional
+                     if wanted and (jar_path / jar).exists())
+    return artifacts
+
+
+def read_manifest(server_path: Path) -> dict[str, dict]:
+    """Returns `destination -> {source, size, mtime_ns, requested, mode}` of linked artifacts (`{}` if none)."""
+    try:
+        with open(server_path / MANIFEST_FILE, 'r') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_manifest(server_path: Path, manifest: dict[str, dict]) -> None:
+    temp = server_path / f'{MANIFEST_FILE}.tmp'
+    with open(temp, 'w') as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(temp, server_path / MANIFEST_FILE)
+
+
+def clear_server_directory(server_path: Path) -> None:
+    """Deletes everything in `server_path` except artifacts and rendered configs listed in
+    their manifests (and the directories holding them), so a redeploy starts clean but
+    only rewrites what changed.
+    Directories (e.g. worlds) are handed to the `Reaper` instead of being deleted in place."""
+    if not server_path.exists():
+        return
+    keep = set(read_manifest(server_path)) \
+        .union(read_render_manifest(server_path)) \
+        .union([MANIFEST_FILE, RENDER_MANIFEST_FILE])
+    keep_dirs = set(str(parent) for destination in keep for parent in Path(destination).parents)
+    for root, dirs, files in os.walk(server_path, topdown=True):
+        relative = Path(root).relative_to(server_path)
+        for name in list(dirs):
+            path = relative / name
+            if str(path) not in keep_dirs:
+                get_reaper().discard(Path(root) / name)
+                dirs.remove(name)
+        for name in files:
+            if str(relative / name) not in keep:
+                (Path(root) / name).unlink()
+
+
+def materialize_artifacts(
+    server_path: Path,
+    artifacts: Iterable[Artifact],
+    mode: LinkMode = LinkMode.HARDLINK
+) -> MaterializeResult:
+    """Links `artifacts` into `server_path` (see `clone_file`) and records them in the manifest.
+    - An artifact whose source size/mtime and link mode match the manifest is left as is.
+    - Artifacts in the manifest but not in `artifacts` are deleted.
+
+    Hardlinks/symlinks share the file in `jars_directory`: replace jars there with a
+    new file (`mv`, not writing over the old one) so running servers are unaffected.
+    """
+    manifest = read_manifest(server_path)
+    updated: dict[str, dict] = {}
+    refreshed: list[str] = []
+    unchanged: list[str] = []
+    for artifact in artifacts:
+        stat = artifact.source.stat()
+        entry = manifest.get(artifact.destination)
+        destination = server_path / artifact.destination
+        if (entry is not None
+            and entry['source'] == str(artifact.source)
+            and entry['size'] == stat.st_size
+            and entry['mtime_ns'] == stat.st_mtime_ns
+            and entry['requested'] == mode.value
+            and os.path.lexists(destination)):
+            updated[artifact.destination] = entry
+            unchanged.append(artifact.destination)
+            continue
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if os.path.lexists(destination):
+            destination.unlink()
+        used = clone_file(artifact.source, destination, mode)
+        updated[artifact.destination] = dict(source=str(artifact.source),
+                                             size=stat.st_size,
+                                             mtime_ns=stat.st_mtime_ns,
+                                             requested=mode.value,
+                                             mode=used.value)
+        refreshed.append(artifact.destination)
+    removed = [destination for destination in manifest if destination not in updated]
+    for destination in removed:
+        if os.path.lexists(server_path / destination):
+            (server_path / destination).unlink()
+    server_path.mkdir(parents=True, exist_ok=True)
+    write_manifest(server_path, updated)
+    return MaterializeResult(refreshed, unchanged, removed)
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+from time import monotonic, perf_counter, sleep
+from typing import Iterable, NamedTuple, Optional
+
+from ..utils import get_settings
+from .start_server import launch_server, stage_server
+
+
+logger = logging.getLogger(__name__)
+
+PROVISION_WORKERS = 4
+LAUNCH_STAGGER_SECONDS = 2.0
+
+
+def get_provision_options() -> tuple[int, float]:
+    """Returns `(provision_workers, launch_stagger)` from `server_monitor_options` of `config.toml`."""
+    options = get_settings().server_monitor_options
+    return (int(options.get('provision_workers', PROVISION_WORKERS)),
+            float(options.get('launch_stagger', LAUNCH_STAGGER_SECONDS)))
+
+
+class ServerSpec(NamedTuple):
+    """Arguments of `start_server`, e.g. `ServerSpec(*server_group.start_server_params(n))`."""
+    port: int
+    ram: int
+    zip_file: str
+    plugin_file: str
+    config_path: str
+    server_group: str
+    server_name: str
+    is_us: bool
+    add_anticheat: bool
+    add_worldedit: bool
+
+
+@dataclass
+class ProvisionResult:
+    """Outcome of one server in `provision_many`.
+    `error` is set if staging or launching failed (the server was not launched)."""
+    server_name: str
+    stage_seconds: float = 0.0
+    launch_seconds: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def provision_many(
+    specs: Iterable[ServerSpec],
+    max_workers: Optional[int] = None,
+    stagger: Optional[float] = None
+) -> list[ProvisionResult]:
+    """Starts many servers at once.
+    - Staging (jars, world, configs; see `stage_server`) runs on `max_workers` threads.
+    - JVMs are launched as soon as their server is staged, at most one every `stagger` seconds,
+      so a batch doesn't boot every JVM in the same instant.
+    Failures are collected per server instead of aborting the batch.
+    Returns one `ProvisionResult` per spec, in order.
+    `max_workers` and `stagger` default to `provision_workers`/`launch_stagger` of `config.toml`.
+    """
+    if max_workers is None or stagger is None:
+        default_workers, default_stagger = get_provision_options()
+        max_workers = default_workers if max_workers is None else max_workers
+        stagger = default_stagger if stagger is None else stagger
+    specs = list(specs)
+    results = [ProvisionResult(spec.server_name) for spec in specs]
+
+    def stage(index: int) -> Path:
+        started = perf_counter()
+        try:
+            return stage_server(*specs[index])
+        finally:
+            results[index].stage_seconds = perf_counter() - started
+
+    last_launch: Optional[float] = None
+    with ThreadPoolExecutor(max(1, max_workers), thread_name_prefix='provision') as executor:
+        futures = dict((executor.submit(stage, index), index) for index in range(len(specs)))
+        for future in as_completed(futures):
+            index = futures[future]
+            result = results[index]
+            if (error := future.exception()) is not None:
+                result.error = error
+                logger.error('Staging %s failed: %s', result.server_name, error)
+                continue
+            if last_launch is not None and (wait := stagger - (monotonic() - last_launch)) > 0:
+                sleep(wait)
+            last_launch = monotonic()
+            started = perf_counter()
+            try:
+                launch_server(result.server_name, future.result(), specs[index].ram)
+            except Exception as e:
+                result.error = e
+                logger.error('Launching %s failed: %s', result.server_name, e)
+            result.launch_seconds = perf_counter() - started
+    return results
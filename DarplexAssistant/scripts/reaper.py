@@ -0,0 +1,140 @@
+from functools import cache
+import logging
+import os
+from pathlib import Path
+import shutil
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+from typing import Optional
+from uuid import uuid4
+
+from ..utils import get_settings, get_settings_loader, Settings
+
+
+logger = logging.getLogger(__name__)
+
+TRASH_DIRECTORY = '.trash'
+BYTES_PER_SECOND = 64 * 1024 * 1024
+FILES_PER_SECOND = 5000
+
+
+class Reaper:
+    """Deletes server directories in the background.
+
+    `discard` renames a directory into `trash_directory` (same filesystem, so it is
+    atomic and instant) and returns; the path can be reused right away.
+    A daemon thread then deletes the trash, throttled to `bytes_per_second`
+    and `files_per_second` so teardown doesn't starve running servers of disk I/O.
+    Trash left by a previous run is deleted when the thread starts.
+    """
+
+    def __init__(self,
+        trash_directory: Path,
+        bytes_per_second: int = BYTES_PER_SECOND,
+        files_per_second: int = FILES_PER_SECOND
+    ) -> None:
+        self.trash_directory = Path(trash_directory)
+        self.bytes_per_second = bytes_per_second
+        self.files_per_second = files_per_second
+        self._wake_event = Event()
+        self._idle_event = Event()
+        self._idle_event.set()
+        self._state_lock = Lock() # so the thread can't report idle while `discard` hands it new trash
+        self._thread: Optional[Thread] = None
+
+    def discard(self, path: Path) -> None:
+        """Moves `path` out of the way and schedules its deletion.
+        Deletes it synchronously if it can't be renamed into the trash (e.g. another filesystem)."""
+        path = Path(path)
+        if not path.exists():
+            return
+        self.trash_directory.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(path, self.trash_directory / f'{path.name}.{uuid4().hex[:12]}')
+        except OSError as e:
+            logger.warning('Could not move %s to trash (%s); deleting in place', path, e)
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        self.start()
+        with self._state_lock:
+            self._idle_event.clear()
+            self._wake_event.set()
+
+    def _delete(self, path: Path) -> None:
+        window_started = monotonic()
+        window_bytes = 0
+        window_files = 0
+        for root, dirs, files in os.walk(path, topdown=False):
+            for name in files:
+                file = os.path.join(root, name)
+                try:
+                    window_bytes += os.lstat(file).st_size
+                    os.unlink(file)
+                except FileNotFoundError:
+                    continue
+                window_files += 1
+                if window_bytes >= self.bytes_per_second or window_files >= self.files_per_second:
+                    if (elapsed := monotonic() - window_started) < 1:
+                        sleep(1 - elapsed)
+                    window_started = monotonic()
+                    window_bytes = 0
+                    window_files = 0
+            for name in dirs:
+                directory = os.path.join(root, name)
+                if os.path.islink(directory):
+                    os.unlink(directory)
+                else:
+                    os.rmdir(directory)
+        os.rmdir(path)
+
+    def _run(self) -> None:
+        while True:
+            self._wake_event.clear()
+            try:
+                entries = list(self.trash_directory.iterdir()) if self.trash_directory.exists() else []
+            except OSError:
+                entries = []
+            for entry in entries:
+                try:
+                    if entry.is_dir() and not entry.is_symlink():
+                        self._delete(entry)
+                    else:
+                        entry.unlink()
+                except OSError as e:
+                    logger.error('Could not delete %s: %s', entry, e)
+            with self._state_lock:
+                if not self._wake_event.is_set():
+                    self._idle_event.set()
+            self._wake_event.wait()
+
+    def start(self) -> None:
+        """Starts the reaper thread (`get_reaper` and `discard` do this)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._idle_event.clear()
+        self._thread = Thread(target=self._run, name='reaper', daemon=True)
+        self._thread.start()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the trash is empty. Returns `False` on timeout."""
+        return self._idle_event.wait(timeout)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Takes over `teardown_bytes_per_second` and `teardown_files_per_second` of `server_monitor_options`.
+        The trash stays where it is until a restart, even if `servers_directory` changed."""
+        options = settings.server_monitor_options
+        self.bytes_per_second = int(options.get('teardown_bytes_per_second', BYTES_PER_SECOND))
+        self.files_per_second = int(options.get('teardown_files_per_second', FILES_PER_SECOND))
+
+
+@cache
+def get_reaper() -> Reaper:
+    """Process-wide `Reaper` with its trash in `servers_directory/.trash`.
+    Its thread is started right away, so trash left by a previous run is reclaimed
+    even if nothing is discarded. Follows reloads of `config.toml` (see `Reaper.apply_settings`)."""
+    settings = get_settings()
+    reaper = Reaper(settings.servers_directory / TRASH_DIRECTORY)
+    reaper.apply_settings(settings)
+    get_settings_loader().on_reload(reaper.apply_settings)
+    reaper.start()
+    return reaper
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+from uuid import uuid4
+
+from ..utils import (BUKKIT_YML_DICT,
+                     DATABASES,
+                     format_config,
+                     MICROSERVICES,
+                     REDIS_CONN_NAMES,
+                     REDIS_CONN_TYPES,
+                     SERVER_PROPERTIES,
+                     Settings,
+                     SPIGOT_YML_DICT)
+
+
+RENDER_MANIFEST_FILE = '.darplex-rendered.json'
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    written: list[str]
+    unchanged: list[str]
+    removed: list[str]
+
+
+def render_server_files(
+    settings: Settings,
+    port: int,
+    config_path: str,
+    server_group: str,
+    server_name: str,
+    is_us: bool
+) -> dict[str, str]:
+    """Returns content of every generated file of a server, keyed by path relative to the server directory.
+    No file I/O."""
+    sql_options = settings.sql
+    redis_options = settings.redis_user
+    api_options = settings.api
+    microservice_ports = settings.microservice_ports
+
+    SQL_ADDRESS = os.environ.get('MYSQL_ADDRESS', sql_options.get('address', '127.0.0.1'))
+    SQL_USERNAME = sql_options.get('username', 'root')
+    SQL_PASSWORD = sql_options.get('password', 'password')
+    SQL_PORT: int = sql_options.get('port', 3306)
+    REDIS_ADDRESS = os.environ.get('REDIS_ADDRESS', redis_options.get('redis_address', '127.0.0.1'))
+    MONITOR_ADDRESS = os.environ.get('MONITOR_ADDRESS', api_options.get('address', '127.0.0.1'))
+
+    ACCOUNTS_PORT: int = microservice_ports.get('accounts', 1000)
+    MICROSERVICE_PORTS = tuple(microservice_ports.get(service, 1000)
+                               for service in ('amplifiers', 'antispam', 'enderchest', 'banner'))
+
+    server_properties = SERVER_PROPERTIES.copy()
+    server_properties['server-port'] = f'{port}'
+
+    plugin_config_dict: dict[str, str] = {
+        'webServer': f'http://{MONITOR_ADDRESS}:{ACCOUNTS_PORT}/',
+        'serverstatus': '',
+        '  group': server_group,
+        '  name': server_name,
+        '  us': str(is_us).lower(),
+        '  connectionurl': f'{SQL_ADDRESS}:{SQL_PORT}',
+        '  username': SQL_USERNAME,
+        '  password': SQL_PASSWORD,
+    }
+
+    files = {
+        'server.properties': format_config(server_properties, '='),
+        'bukkit.yml': format_config(BUKKIT_YML_DICT),
+        'spigot.yml': format_config(SPIGOT_YML_DICT),
+        str(Path(config_path) / 'config.yml'): format_config(plugin_config_dict),
+        'api-config.dat': '\n'.join(f'{service}:\n  ip: {MONITOR_ADDRESS}\n  port: {service_port}'
+                                    for service, service_port in zip(MICROSERVICES, MICROSERVICE_PORTS)),
+        'redis-config.dat': '\n'.join(f'{REDIS_ADDRESS} 6379 {conn_type} {name}'
+                                      for conn_type in REDIS_CONN_TYPES
+                                      for name in REDIS_CONN_NAMES),
+        'database-config.dat': '\n'.join(f'{database} {SQL_ADDRESS} {SQL_USERNAME} {SQL_PASSWORD}'
+                                         for database in DATABASES),
+    }
+    if not is_us:
+        files['eu.dat'] = '' # marks server as EU
+    return files
+
+
+def fingerprint(content: str) -> str:
+    return sha256(content.encode()).hexdigest()
+
+
+def read_render_manifest(server_path: Path) -> dict[str, dict]:
+    """Returns `path -> {sha256, size, mtime_ns}` of files written by `write_rendered_files` (`{}` if none)."""
+    try:
+        with open(server_path / RENDER_MANIFEST_FILE, 'r') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_atomic(path: Path, content: str) -> None:
+    """Writes `content` to a temporary file and renames it over `path`, so readers never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.parent / f'.{path.name}.{uuid4().hex[:8]}.tmp'
+    try:
+        with open(temp, 'w') as writer:
+            writer.write(content)
+        os.replace(temp, path)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+
+
+def write_rendered_files(server_path: Path, files: dict[str, str]) -> RenderResult:
+    """Writes `files` (see `render_server_files`) into `server_path`, skipping files whose content is unchanged.
+    - A file is unchanged if its size/mtime still match the manifest and its fingerprint matches,
+      or (without a manifest entry) if its content on disk matches.
+    - Changed files are written with `write_atomic`.
+    - Files rendered last time but not in `files` anymore (e.g. `eu.dat`) are deleted.
+    """
+    manifest = read_render_manifest(server_path)
+    updated: dict[str, dict] = {}
+    written: list[str] = []
+    unchanged: list[str] = []
+    for name, content in files.items():
+        path = server_path / name
+        digest = fingerprint(content)
+        entry = manifest.get(name)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            stat = None
+        if stat is not None:
+            if entry is not None and entry == dict(sha256=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns):
+                same = True
+            else:
+                with open(path, 'r', errors='replace') as reader:
+                    same = fingerprint(reader.read()) == digest
+            if same:
+                updated[name] = dict(sha256=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                unchanged.append(name)
+                continue
+        write_atomic(path, content)
+        stat = path.stat()
+        updated[name] = dict(sha256=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        written.append(name)
+    removed = [name for name in manifest if name not in updated]
+    for name in removed:
+        if (server_path / name).exists():
+            (server_path / name).unlink()
+    if updated != manifest:
+        write_atomic(server_path / RENDER_MANIFEST_FILE, json.dumps(updated, indent=2))
+    return RenderResult(written, unchanged, removed)
@@ -0,0 +1,197 @@
+from collections import deque
+from functools import cache
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Iterable, Optional
+from uuid import uuid4
+
+from ..utils import get_settings, get_settings_loader, Settings
+from .artifacts import get_server_artifacts
+from .provision import ServerSpec
+from .reaper import get_reaper
+from .start_server import launch_server, stage_server, write_server_identity
+
+
+STANDBY_DIRECTORY = '.standby'
+STANDBY_FILE = '.darplex-standby.json'
+DEMAND_WINDOW_SECONDS = 600
+
+
+def _file_version(path: Path) -> Optional[list[int]]:
+    """`[size, mtime_ns]` of `path` (`None` if missing): changes whenever it is replaced."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def get_standby_fingerprint(spec: ServerSpec, world_zip: Path, jar_path: Path) -> dict:
+    """What a standby directory was staged from. A directory only matches a spec
+    of the same group with unchanged jars (from `jar_path`) and an unchanged world zip."""
+    return dict(server_group=spec.server_group,
+                zip_file=spec.zip_file,
+                plugin_file=spec.plugin_file,
+                config_path=spec.config_path,
+                add_anticheat=spec.add_anticheat,
+                add_worldedit=spec.add_worldedit,
+                world=_file_version(world_zip),
+                jars=dict((artifact.destination, _file_version(artifact.source))
+                          for artifact in get_server_artifacts(jar_path, spec.plugin_file,
+                                                               spec.add_anticheat, spec.add_worldedit)))
+
+
+class StandbyPool:
+    """Pre-staged, not yet named server directories kept per hot ServerGroup.
+
+    Standby directories live in `servers_directory/.standby/(prefix).(id)` and are staged
+    with `stage_server` like any server. `claim` turns one into `servers_directory/(name)`
+    with a rename and `write_server_identity`, so a scale up only waits for the JVM boot.
+
+    How many directories a group keeps follows demand: the number of claims within the
+    last `window` seconds, at least `min_size` and at most `max_size`.
+    Directories staged from an older world zip or older jars (e.g. a plugin replaced
+    with `mv`) are discarded instead of claimed.
+    """
+
+    def __init__(self,
+        servers_directory: Path,
+        world_directory: Path,
+        jars_directory: Path,
+        groups: Iterable[str],
+        min_size: int = 1,
+        max_size: int = 3,
+        window: float = DEMAND_WINDOW_SECONDS
+    ) -> None:
+        self.servers_directory = Path(servers_directory)
+        self.world_directory = Path(world_directory)
+        self.jars_directory = Path(jars_directory)
+        self.groups = set(groups)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.window = window
+        self._claims: dict[str, deque[float]] = {}
+        self._lock = Lock()
+
+    @property
+    def directory(self) -> Path:
+        return self.servers_directory / STANDBY_DIRECTORY
+
+    def _fingerprint(self, spec: ServerSpec) -> dict:
+        return get_standby_fingerprint(spec, self.world_directory / spec.zip_file, self.jars_directory)
+
+    def standby_directories(self, prefix: str) -> list[Path]:
+        """Returns fully staged standby directories of `prefix`."""
+        if not self.directory.exists():
+            return []
+        return sorted(path
+                      for path in self.directory.glob(f'{prefix}.*')
+                      if (path / STANDBY_FILE).exists())
+
+    def target_size(self, prefix: str) -> int:
+        """Returns how many standby directories `prefix` should have."""
+        if prefix not in self.groups:
+            return 0
+        now = monotonic()
+        with self._lock:
+            claims = self._claims.setdefault(prefix, deque())
+            while claims and now - claims[0] > self.window:
+                claims.popleft()
+            demand = len(claims)
+        return max(self.min_size, min(self.max_size, demand))
+
+    def replenish(self, spec: ServerSpec) -> int:
+        """Stages standby directories for `spec.server_group` up to `target_size`.
+        Stale directories of the group are deleted. Returns number of directories staged.
+        Not safe to run concurrently for the same group (`ServerMonitor` runs one at a time)."""
+        prefix = spec.server_group
+        fingerprint = self._fingerprint(spec)
+        if self.directory.exists():
+            # left over by an interrupted replenish
+            for path in self.directory.glob(f'.{prefix}.*'):
+                get_reaper().discard(path)
+        ready = 0
+        for path in self.standby_directories(prefix):
+            if self._read_fingerprint(path) == fingerprint:
+                ready += 1
+            else:
+                get_reaper().discard(path)
+        staged = 0
+        for _ in range(self.target_size(prefix) - ready):
+            standby_id = uuid4().hex[:12]
+            # staged under a temporary name, so `standby_directories` never sees half-staged ones
+            path = self.directory / f'.{prefix}.{standby_id}'
+            stage_server(*spec._replace(server_name=f'{prefix}-standby'), server_path=path)
+            with open(path / STANDBY_FILE, 'w') as fp:
+                json.dump(fingerprint, fp)
+            os.rename(path, self.directory / f'{prefix}.{standby_id}')
+            staged += 1
+        return staged
+
+    @staticmethod
+    def _read_fingerprint(path: Path) -> Optional[dict]:
+        try:
+            with open(path / STANDBY_FILE, 'r') as fp:
+                return json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def claim(self, spec: ServerSpec) -> Optional[Path]:
+        """Turns a standby directory of `spec.server_group` into the server directory of `spec.server_name`.
+        Returns the server directory, or `None` if no matching standby directory is ready."""
+        with self._lock:
+            self._claims.setdefault(spec.server_group, deque()).append(monotonic())
+        fingerprint = self._fingerprint(spec)
+        destination = self.servers_directory / spec.server_name
+        for path in self.standby_directories(spec.server_group):
+            if self._read_fingerprint(path) != fingerprint:
+                continue
+            claimed = self.directory / f'.claimed.{path.name}'
+            try:
+                os.rename(path, claimed) # only one claimer can win this rename
+            except OSError:
+                continue
+            get_reaper().discard(destination)
+            os.rename(claimed, destination)
+            (destination / STANDBY_FILE).unlink()
+            write_server_identity(destination, get_settings(), spec.port, spec.config_path,
+                                  spec.server_group, spec.server_name, spec.is_us)
+            return destination
+        return None
+
+    def deploy(self, spec: ServerSpec) -> bool:
+        """Launches `spec` from a standby directory. Returns `False` if none was ready."""
+        if (server_path := self.claim(spec)) is None:
+            return False
+        launch_server(spec.server_name, server_path, spec.ram)
+        return True
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Takes over `standby_groups`, `standby_min`, `standby_max` and `standby_window`
+        of `server_monitor_options`. Groups which were dropped keep no standby directories
+        (`target_size` is 0); the directories stay where they are until a restart."""
+        options = settings.server_monitor_options
+        self.groups = set(options.get('standby_groups', []))
+        self.min_size = int(options.get('standby_min', 1))
+        self.max_size = int(options.get('standby_max', 3))
+        self.window = float(options.get('standby_window', DEMAND_WINDOW_SECONDS))
+
+
+@cache
+def get_standby_pool() -> Optional[StandbyPool]:
+    """Returns the `StandbyPool` configured in `server_monitor_options`, or `None` if `standby_groups` is empty.
+    Follows reloads of `config.toml` (see `StandbyPool.apply_settings`); turning the pool on
+    when `standby_groups` was empty needs a restart."""
+    settings = get_settings()
+    if len(settings.server_monitor_options.get('standby_groups', [])) == 0:
+        return None
+    pool = StandbyPool(settings.servers_directory,
+                       settings.world_directory,
+                       settings.jars_directory,
+                       ())
+    pool.apply_settings(settings)
+    get_settings_loader().on_reload(pool.apply_settings)
+    return pool
@@ -1,22 +1,13 @@
 
-import os
 from pathlib import Path
-import shutil
-import toml
-from zipfile import ZipFile
+from typing import Optional
 
 
-from ..utils import (BUKKIT_YML_DICT, 
-                     DATABASES,
-                     DEFAULT_TOML_CONF,
-                     CONFIG_PATH,
-                     create_config_if_not_exists,
-                     MICROSERVICES,
-                     REDIS_CONN_NAMES,
-                     REDIS_CONN_TYPES,
-                     SERVER_PROPERTIES,
-                     SPIGOT_YML_DICT,
-                     write_to_file)
+from ..utils import get_settings, LinkMode, Settings
+from .artifacts import clear_server_directory, get_server_artifacts, materialize_artifacts
+from .server_config import RenderResult, render_server_files, write_rendered_files
+from .supervisor import get_supervisor
+from .world_templates import get_world_template_cache
 
 
 
@@ -38,6 +29,9 @@ def start_server(
         - `ram`: max ram you want to allocate. (will not exceed usage threshold)
         - `server_directory`: path to your servers folder. Where your servers will be generated.
         - `jars_directory`: Directory of all your jar files.
+        - `artifact_link_mode`: How jars get into server directories: `hardlink` (default), `symlink`, `reflink` or `copy`.
+        - `world_template_directory`: Where world zips are extracted once and reused (see `WorldTemplateCache`).
+        - `hardlink_worlds`: Hardlink template files instead of copying. Only if worlds are never saved.
         - `world_zip_folder_directory`: Directory of all zipped world files.
             - Ensure the following exist in the directory:
                 - `lobby.zip` - Lobby 
@@ -63,115 +57,70 @@ def start_server(
             - List of servers you want DarplexServerMonitor to ignore
     - `sql`
     """
-    create_config_if_not_exists()
+    server_path = stage_server(port, ram, zip_file, plugin_file, config_path, server_group, server_name,
+                               is_us, add_anticheat, add_worldedit)
+    launch_server(server_name, server_path, ram)
 
-    with open(CONFIG_PATH, 'r') as fp:
-        data = toml.load(fp)
 
-    monitor_options = data.get('server_monitor_options', DEFAULT_TOML_CONF['server_monitor_options'])
-    sql_options = data.get('sql', DEFAULT_TOML_CONF['sql'])
-    api_options = data.get('api', DEFAULT_TOML_CONF['api'])
-    microservice_ports = data.get('microservice_ports', DEFAULT_TOML_CONF['microservice_ports'])
-
-    DEFAULT_WORK_DIR = Path.home() / 'mineplex'
-    SERVER_PATH = Path(monitor_options.get('servers_directory', DEFAULT_WORK_DIR / 'servers')) / server_name
-    WORLD_PATH = Path(monitor_options.get('world_zip_folder_directory', DEFAULT_WORK_DIR / 'worlds'))
-    JAR_PATH = Path(monitor_options.get('jars_directory', DEFAULT_WORK_DIR / 'jars')) 
-    PLUGINS_DIR = SERVER_PATH / 'plugins'
-
-    SQL_ADDRESS = os.environ.get('MYSQL_ADDRESS', sql_options.get('address', '127.0.0.1'))
-    SQL_USERNAME = sql_options.get('username', 'root')
-    SQL_PASSWORD = sql_options.get('password', 'password')
-    SQL_PORT: int = sql_options('port', 3306)
-
-    REDIS_ADDRESS = os.environ.get('REDIS_ADDRESS', 
-                                   sql_options.get('redis_user', DEFAULT_TOML_CONF['redis_user']).get('redis_address', '127.0.0.1')) 
-
-    MONITOR_ADDRESS = os.environ.get('MONITOR_ADDRESS', api_options.get('address', '127.0.0.1'))
-
-    ACCOUNTS_PORT: int = microservice_ports.get('accounts', 1000)
-    AMPLIFIERS_PORT: int = microservice_ports.get('amplifiers', 1000)
-    ANTISPAM_PORT: int = microservice_ports.get('antispam', 1000)
-    ENDERCHEST_PORT: int = microservice_ports.get('enderchest', 1000)
-    BANNER_PORT: int = microservice_ports.get('banner', 1000)
-
-    MICROSERVICE_PORTS = (AMPLIFIERS_PORT, ANTISPAM_PORT, ENDERCHEST_PORT, BANNER_PORT)
-
-    if SERVER_PATH.exists():
-        shutil.rmtree(SERVER_PATH)
-
-    os.makedirs(SERVER_PATH)
-
-    server_properties = SERVER_PROPERTIES.copy()
-    server_properties['server-port'] = f'{port}'
-   
-    plugin_config_dict: dict[str, str] = {
-        'webServer': f'http://{MONITOR_ADDRESS}:{ACCOUNTS_PORT}/',
-        'serverstatus': '',
-        '  group': server_group,
-        '  name': server_name,
-        '  us': str(is_us).lower(),
-        '  connectionurl': f'{SQL_ADDRESS}:{SQL_PORT}',
-        '  username': SQL_USERNAME,
-        '  password': SQL_PASSWORD,
-    }
-
-    if not is_us:
-        with open(SERVER_PATH / 'eu.dat', 'w') as _: # creates eu.dat file if Region != US
-           pass 
-
-
-    write_to_file(SERVER_PATH / 'server.properties', server_properties, '=')
-    write_to_file(SERVER_PATH / 'bukkit.yml', BUKKIT_YML_DICT)
-    write_to_file(SERVER_PATH / 'spigot.yml', SPIGOT_YML_DICT)
-
-    shutil.copy(JAR_PATH / 'spigot.jar', SERVER_PATH)
-
-    PLUGINS_DIR.mkdir()
-
-    shutil.copy(JAR_PATH / plugin_file, PLUGINS_DIR)
-
-    if add_anticheat and (JAR_PATH / 'AntiCheat.jar').exists():
-        shutil.copy(JAR_PATH / 'AntiCheat.jar', PLUGINS_DIR)
-
-    if add_worldedit and (JAR_PATH / 'WorldEdit.jar').exists():
-        shutil.copy(JAR_PATH / 'WorldEdit.jar', PLUGINS_DIR)
-
-    if (JAR_PATH / 'ViaVersion.jar').exists():
-        shutil.copy(JAR_PATH / 'ViaVersion.jar', PLUGINS_DIR)
-    
+def stage_server(
+    port: int,
+    ram: int,
+    zip_file: str,
+    plugin_file: str,
+    config_path: str,
+    server_group: str,
+    server_name: str,
+    is_us: bool,
+    add_anticheat: bool,
+    add_worldedit: bool,
+    server_path: Optional[Path] = None,
+    settings: Optional[Settings] = None
+) -> Path:
+    """Writes the server directory of `start_server` (jars, world, configs) without launching it.
+    `server_path` defaults to `servers_directory`/`server_name`. Returns the server directory.
+    `settings` default to `get_settings()`."""
+    settings = settings or get_settings()
+    monitor_options = settings.server_monitor_options
+    SERVER_PATH = server_path or settings.servers_directory / server_name
+    WORLD_PATH = settings.world_directory
+    JAR_PATH = settings.jars_directory
+    TEMPLATE_PATH = settings.template_directory
 
-    with ZipFile(WORLD_PATH / zip_file, 'r') as zip_ref:
-       zip_ref.extractall(SERVER_PATH)
+    clear_server_directory(SERVER_PATH) # keeps linked jars and rendered configs
 
-    os.makedirs(SERVER_PATH / config_path)
+    SERVER_PATH.mkdir(parents=True, exist_ok=True)
 
-    write_to_file(SERVER_PATH / config_path / 'config.yml', plugin_config_dict)
+    materialize_artifacts(SERVER_PATH,
+                          get_server_artifacts(JAR_PATH, plugin_file, add_anticheat, add_worldedit),
+                          LinkMode(monitor_options.get('artifact_link_mode', LinkMode.HARDLINK.value)))
 
+    get_world_template_cache(str(TEMPLATE_PATH), monitor_options.get('hardlink_worlds', False)) \
+        .materialize(WORLD_PATH / zip_file, SERVER_PATH)
 
-    with open(SERVER_PATH / 'api-config.dat', 'w') as writer:
-        writer.write('\n'.join(
-            f'{service}:\n  ip: {MONITOR_ADDRESS}\n  port: {port}'
-            for service, port in zip(MICROSERVICES, MICROSERVICE_PORTS)
-            ))
+    write_server_identity(SERVER_PATH, settings, port, config_path, server_group, server_name, is_us)
 
-    with open(SERVER_PATH / 'redis-config.dat', 'w') as writer:
-        writer.write('\n'.join(
-                    f'{REDIS_ADDRESS} 6379 {conn_type} {name}'
-                    for conn_type in REDIS_CONN_TYPES
-                    for name in REDIS_CONN_NAMES
-                    )
-                )
+    return SERVER_PATH
 
-    with open(SERVER_PATH / 'database-config.dat', 'w') as writer:
-        writer.write('\n'.join(
-                    f'{database} {SQL_ADDRESS} {SQL_USERNAME} {SQL_PASSWORD}'
-                    for database in DATABASES
-                    )
-                )
-        
-    os.system(f'cd \'{SERVER_PATH}\';'
-              f'screen -XS {server_name} kill;' 
-              f'screen -XS {server_name} quit;'
-              f'screen -dmS {server_name} java -Xmx{ram}M -Xms{ram}M -jar spigot.jar')
 
+def write_server_identity(
+    server_path: Path,
+    settings: Settings,
+    port: int,
+    config_path: str,
+    server_group: str,
+    server_name: str,
+    is_us: bool
+) -> RenderResult:
+    """Renders every generated config of a server (`server.properties`, `bukkit.yml`, `spigot.yml`,
+    plugin `config.yml`, `*-config.dat`, `eu.dat`) and writes only those which changed.
+    Rewriting these is all it takes to turn a staged directory into another server of its group."""
+    return write_rendered_files(server_path,
+                                render_server_files(settings, port, config_path, server_group, server_name, is_us))
+
+
+def launch_server(server_name: str, server_path: Path, ram: int) -> None:
+    """Launches the JVM of a staged server directory under the `ProcessSupervisor`.
+    Returns once the process is spawned."""
+    get_supervisor().launch(server_name,
+                            ['java', f'-Xmx{ram}M', f'-Xms{ram}M', '-jar', 'spigot.jar'],
+                            server_path)
@@ -1,23 +1,26 @@
 
-import os
-from pathlib import Path
-import shutil
-import toml
+import subprocess
 
-from DarplexAssistant.utils.redis_utils import DEFAULT_TOML_CONF, create_config_if_not_exists
+from ..utils import get_settings
+from .reaper import get_reaper
+from .supervisor import ServerStillRunningException, get_supervisor, read_pidfile
 
-def stop_server(server_name: str) -> None:
-    create_config_if_not_exists()
+def stop_server(server_name: str, keep_directory: bool = False) -> None:
+    """Stops the server (even one started before the monitor restarted) and discards its directory.
+    With `keep_directory` (restarts), the directory stays, so redeploying it only rewrites
+    what changed (see `clear_server_directory`).
+    Raises `ServerStillRunningException` (keeping the directory) if its process survived."""
+    server_path = get_settings().servers_directory / server_name
 
-    with open('../config/config.toml', 'r') as fp:
-        servers_directory = toml.load(fp) \
-                                .get('server_monitor_options', DEFAULT_TOML_CONF['server_monitor_options']) \
-                                .get('servers_directory', Path.home() / 'mineplex' / 'servers')
-
-    server_path = Path(servers_directory) / server_name
-
-    os.system(f'screen -S {server_name}'
-              f'-X kill && screen -S {server_name} -X quit')
-    if server_path.exists(): 
-        shutil.rmtree(server_path)
+    if get_supervisor().stop(server_name, server_path=server_path) is None:
+        # not started by this process (e.g. a `screen` session from an older deploy)
+        try:
+            subprocess.run(['screen', '-S', server_name, '-X', 'quit'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        except FileNotFoundError: # screen not installed
+            pass
+    if (pid := read_pidfile(server_path)) is not None:
+        raise ServerStillRunningException(f'{server_name} (pid {pid}) is still running in {server_path}')
+    if not keep_directory:
+        get_reaper().discard(server_path) # deleted in the background
 
@@ -0,0 +1,281 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import cache
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+from pathlib import Path
+import signal
+import subprocess
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Callable, Optional, Sequence
+
+from ..utils import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+STOP_TIMEOUT_SECONDS = 30
+TERMINATE_TIMEOUT_SECONDS = 5
+STOP_COMMAND = b'stop\n'
+EXIT_HISTORY = 256
+PIDFILE_NAME = 'server.pid'
+PID_POLL_INTERVAL = 0.1
+
+
+class ServerStillRunningException(Exception):
+    pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as fp:
+            return fp.read().rsplit(')', 1)[1].split()[0] != 'Z' # zombies are dead, just not reaped
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_pidfile(server_path: Path) -> Optional[int]:
+    """Returns the PID written into `server_path` by `ProcessSupervisor.launch` if that process is still alive.
+    PIDs reused by another process (not leading its own process group, or running elsewhere) are ignored."""
+    if os.name != 'posix':
+        return None
+    try:
+        pid = int((Path(server_path) / PIDFILE_NAME).read_text().strip())
+        if os.getpgid(pid) != pid or not _pid_alive(pid):
+            return None
+    except (OSError, ValueError):
+        return None
+    try:
+        if os.readlink(f'/proc/{pid}/cwd') != os.path.realpath(server_path):
+            return None
+    except OSError:
+        pass # no /proc or not allowed to look
+    return pid
+
+
+def _remove_pidfile(server_path: Path, pid: int) -> None:
+    pidfile = Path(server_path) / PIDFILE_NAME
+    try:
+        if pidfile.read_text().strip() == str(pid):
+            pidfile.unlink()
+    except OSError:
+        pass
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    """Memory and cpu time of a process, read from `/proc` (Linux only)."""
+    rss_bytes: int
+    cpu_seconds: float
+
+
+@dataclass
+class ServerProcess:
+    """A JVM started by `ProcessSupervisor`."""
+    server_name: str
+    popen: subprocess.Popen
+    log_path: Optional[Path]
+    server_path: Optional[Path] = None
+    started: datetime = field(default_factory=datetime.now)
+    stopped: Optional[datetime] = None
+
+    @property
+    def pid(self) -> int:
+        return self.popen.pid
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        """`None` while running. Negative if killed by a signal."""
+        return self.popen.poll()
+
+    @property
+    def running(self) -> bool:
+        return self.exit_code is None
+
+    def resource_usage(self) -> Optional[ResourceUsage]:
+        """Returns `ResourceUsage` or `None` if it exited or `/proc` is unavailable."""
+        try:
+            with open(f'/proc/{self.pid}/stat', 'r') as fp:
+                fields = fp.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        ticks = os.sysconf('SC_CLK_TCK')
+        # fields start at `state` (3rd field of proc(5)): utime = 14th, stime = 15th, rss = 24th
+        return ResourceUsage(rss_bytes=int(fields[21]) * os.sysconf('SC_PAGE_SIZE'),
+                             cpu_seconds=(int(fields[11]) + int(fields[12])) / ticks)
+
+
+class ProcessSupervisor:
+    """Starts server JVMs as child processes instead of detached `screen` sessions.
+
+    - Tracks every process by server name (PID, start time, exit code).
+    - Streams stdout/stderr of each process into `log_directory/(name).log`,
+      rotated at `max_log_bytes` with `backup_count` old files.
+    - `stop` sends the `stop` console command, waits, then SIGTERM and finally SIGKILL.
+    - Exit statuses are kept in `exits` and passed to `on_exit` listeners.
+
+    Processes get their own session, so they keep running if the supervising process dies
+    (their console output is lost until they are restarted). Their PID is written into
+    `server.pid` of their directory, so a later supervisor can still stop them: `stop` with
+    a `server_path` falls back to signalling that process group (SIGTERM, then SIGKILL).
+    """
+
+    def __init__(self,
+        log_directory: Optional[Path] = None,
+        max_log_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT
+    ) -> None:
+        self.log_directory = Path(log_directory) if log_directory is not None else None
+        self.max_log_bytes = max_log_bytes
+        self.backup_count = backup_count
+        self.exits: list[tuple[str, int, datetime]] = []
+        self._processes: dict[str, ServerProcess] = {}
+        self._listeners: list[Callable[[ServerProcess], None]] = []
+        self._lock = Lock()
+
+    def on_exit(self, listener: Callable[[ServerProcess], None]) -> None:
+        """Calls `listener` (from the log pump thread) whenever a process exits."""
+        self._listeners.append(listener)
+
+    def get(self, server_name: str) -> Optional[ServerProcess]:
+        """Returns the running `ServerProcess` of `server_name`, if any."""
+        with self._lock:
+            process = self._processes.get(server_name)
+        return process if process is not None and process.running else None
+
+    def processes(self) -> list[ServerProcess]:
+        """Returns all running processes."""
+        with self._lock:
+            return [process for process in self._processes.values() if process.running]
+
+    def _open_log(self, server_name: str) -> Optional[RotatingFileHandler]:
+        if self.log_directory is None:
+            return None
+        self.log_directory.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(self.log_directory / f'{server_name}.log',
+                                      maxBytes=self.max_log_bytes,
+                                      backupCount=self.backup_count)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+    def _pump(self, process: ServerProcess, handler: Optional[RotatingFileHandler]) -> None:
+        assert process.popen.stdout is not None
+        try:
+            for line in process.popen.stdout:
+                if handler is not None:
+                    handler.emit(logging.makeLogRecord({'msg': line.decode(errors='replace').rstrip('\n')}))
+        finally:
+            if handler is not None:
+                handler.close()
+        exit_code = process.popen.wait()
+        process.stopped = datetime.now()
+        if process.server_path is not None:
+            _remove_pidfile(process.server_path, process.pid)
+        with self._lock:
+            self.exits.append((process.server_name, exit_code, process.stopped))
+            del self.exits[:-EXIT_HISTORY]
+        logger.info('%s (pid %d) exited with %d', process.server_name, process.pid, exit_code)
+        for listener in list(self._listeners):
+            try:
+                listener(process)
+            except Exception:
+                logger.exception('Exit listener failed for %s', process.server_name)
+
+    def launch(self, server_name: str, command: Sequence[str], cwd: Path) -> ServerProcess:
+        """Starts `command` in `cwd` as `server_name`, stopping a previous process of that name
+        (or one still running in `cwd`) first. Returns right after the process is spawned."""
+        self.stop(server_name, server_path=cwd)
+        handler = self._open_log(server_name)
+        popen = subprocess.Popen(list(command),
+                                 cwd=cwd,
+                                 stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT,
+                                 start_new_session=True)
+        process = ServerProcess(server_name, popen, handler and Path(handler.baseFilename), Path(cwd))
+        try:
+            (Path(cwd) / PIDFILE_NAME).write_text(f'{popen.pid}\n')
+        except OSError as e:
+            logger.warning('Could not write pidfile of %s (%s); it can only be stopped by this process', server_name, e)
+        with self._lock:
+            self._processes[server_name] = process
+        Thread(target=self._pump, args=(process, handler), name=f'supervisor-{server_name}', daemon=True).start()
+        return process
+
+    def _stop_pid(self, server_name: str, pid: int, server_path: Path, timeout: float) -> int:
+        """Stops a process group this supervisor didn't start (no console to send `stop` to).
+        Returns the negated signal which stopped it, as its exit code is only known to its parent."""
+        logger.info('Stopping %s by its pidfile (pid %d)', server_name, pid)
+        for send_signal, wait in ((signal.SIGTERM, timeout), (signal.SIGKILL, TERMINATE_TIMEOUT_SECONDS)):
+            try:
+                os.killpg(pid, send_signal)
+            except ProcessLookupError:
+                break
+            deadline = monotonic() + wait
+            while _pid_alive(pid) and monotonic() < deadline:
+                sleep(PID_POLL_INTERVAL)
+            if not _pid_alive(pid):
+                break
+            logger.warning('%s did not stop within %ss', server_name, wait)
+        _remove_pidfile(server_path, pid)
+        return -send_signal
+
+    def stop(self,
+        server_name: str,
+        timeout: float = STOP_TIMEOUT_SECONDS,
+        server_path: Optional[Path] = None
+    ) -> Optional[int]:
+        """Stops `server_name` gracefully: `stop` console command, then SIGTERM after `timeout`
+        seconds, then SIGKILL. Returns exit code, or `None` if it wasn't running.
+        Processes started by another supervisor are found through the pidfile in `server_path`."""
+        if (process := self.get(server_name)) is None:
+            if server_path is not None and (pid := read_pidfile(server_path)) is not None:
+                return self._stop_pid(server_name, pid, server_path, timeout)
+            return None
+        popen = process.popen
+        try:
+            assert popen.stdin is not None
+            popen.stdin.write(STOP_COMMAND)
+            popen.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass
+        for send_signal, wait in ((None, timeout),
+                                  (signal.SIGTERM, TERMINATE_TIMEOUT_SECONDS),
+                                  (signal.SIGKILL, None)):
+            if send_signal is not None:
+                try:
+                    popen.send_signal(send_signal)
+                except ProcessLookupError:
+                    pass
+            try:
+                return popen.wait(wait)
+            except subprocess.TimeoutExpired:
+                logger.warning('%s did not stop within %ss', server_name, wait)
+        return popen.returncode
+
+    def stop_all(self, timeout: float = STOP_TIMEOUT_SECONDS) -> None:
+        for process in self.processes():
+            self.stop(process.server_name, timeout)
+
+
+@cache
+def get_supervisor() -> ProcessSupervisor:
+    """Process-wide `ProcessSupervisor` logging to `server_log_directory` of `config.toml`."""
+    settings = get_settings()
+    options = settings.server_monitor_options
+    return ProcessSupervisor(settings.log_directory,
+                             int(options.get('server_log_max_bytes', LOG_MAX_BYTES)),
+                             int(options.get('server_log_backup_count', LOG_BACKUP_COUNT)))
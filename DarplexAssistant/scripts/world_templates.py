@@ -0,0 +1,156 @@
+from functools import cache
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+import shutil
+from threading import Lock
+from typing import Optional
+from uuid import uuid4
+from zipfile import ZipFile
+
+from ..utils import CacheStats, LinkMode, clone_tree
+from .reaper import get_reaper
+
+
+INDEX_FILE = 'index.json'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class WorldTemplateCache:
+    """Extracted world zips, content-addressed by the sha256 of the zip.
+
+    - `directory/(digest)/` holds one extracted zip. Identical zips share it.
+    - `directory/index.json` maps each zip path to `(size, mtime_ns, digest)`,
+      so a zip is only rehashed after it changes.
+    - Extraction goes to a temporary directory renamed into place, so a crashed
+      or concurrent extraction never leaves a half-written template.
+    - Templates no zip maps to anymore are renamed out of the way, then deleted by the
+      `Reaper`; one still being materialized is only discarded once that is done.
+
+    `materialize` copies a template into a server directory with `clone_tree`.
+    Reflinks by default, since Minecraft rewrites region files in place. Hardlinks
+    are only safe for worlds that are never saved.
+    """
+
+    def __init__(self, directory: Path, mode: LinkMode = LinkMode.REFLINK) -> None:
+        self.directory = Path(directory)
+        self.mode = mode
+        self._lock = Lock()
+        self._index: Optional[dict[str, list]] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._in_use: dict[str, int] = {}
+        self._unused: set[str] = set()
+
+    def _load_index(self) -> dict[str, list]:
+        if self._index is None:
+            try:
+                with open(self.directory / INDEX_FILE, 'r') as fp:
+                    self._index = json.load(fp)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self) -> None:
+        temp = self.directory / f'.{INDEX_FILE}.{uuid4().hex}'
+        with open(temp, 'w') as fp:
+            json.dump(self._index, fp)
+        os.replace(temp, self.directory / INDEX_FILE)
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        digest = sha256()
+        with open(path, 'rb') as fp:
+            while chunk := fp.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def digest(self, zip_path: Path) -> str:
+        """Returns sha256 of `zip_path`, rehashing only if its size or mtime changed."""
+        stat = zip_path.stat()
+        key = str(zip_path.resolve())
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+                return entry[2]
+        digest = self.hash_file(zip_path)
+        with self._lock:
+            index = self._load_index()
+            previous = index.get(key)
+            index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._save_index()
+            if previous is not None and previous[2] != digest:
+                self._prune(previous[2])
+        return digest
+
+    def _prune(self, digest: str) -> None:
+        """Discards template `digest` if no zip maps to it. Must hold `_lock`.
+        It is renamed first, so `get_template` never returns a template being deleted."""
+        if any(entry[2] == digest for entry in self._load_index().values()):
+            return
+        if self._in_use.get(digest, 0) > 0:
+            self._unused.add(digest) # discarded by the last `materialize` using it
+            return
+        self._unused.discard(digest)
+        template = self.directory / digest
+        discarded = self.directory / f'.{digest}.{uuid4().hex}.old'
+        try:
+            os.rename(template, discarded)
+        except FileNotFoundError:
+            return
+        get_reaper().discard(discarded)
+        self._evictions += 1
+
+    def get_template(self, zip_path: Path) -> Path:
+        """Returns the extracted template of `zip_path`, extracting it on a miss."""
+        zip_path = Path(zip_path)
+        template = self.directory / self.digest(zip_path)
+        if template.is_dir():
+            with self._lock:
+                self._hits += 1
+            return template
+        temp = self.directory / f'.{template.name}.{uuid4().hex}'
+        with ZipFile(zip_path, 'r') as zip_ref:
+            zip_ref.extractall(temp)
+        try:
+            os.rename(temp, template)
+        except OSError:
+            # extracted concurrently by someone else
+            shutil.rmtree(temp, ignore_errors=True)
+        with self._lock:
+            self._misses += 1
+        return template
+
+    def materialize(self, zip_path: Path, destination: Path) -> dict[LinkMode, int]:
+        """Places the contents of `zip_path` in `destination`, like `ZipFile.extractall`.
+        Returns number of files per `LinkMode` used."""
+        while True:
+            template = self.get_template(zip_path)
+            with self._lock:
+                if template.is_dir(): # not pruned since
+                    self._in_use[template.name] = self._in_use.get(template.name, 0) + 1
+                    break
+        try:
+            return clone_tree(template, Path(destination), self.mode)
+        finally:
+            with self._lock:
+                self._in_use[template.name] -= 1
+                if self._in_use[template.name] == 0:
+                    del self._in_use[template.name]
+                    if template.name in self._unused:
+                        self._prune(template.name)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            size = len(set(entry[2] for entry in self._load_index().values()))
+            return CacheStats(self._hits, self._misses, self._evictions, size)
+
+
+@cache
+def get_world_template_cache(directory: str, hardlink: bool = False) -> WorldTemplateCache:
+    """Process-wide `WorldTemplateCache` of `directory`, so hit rates add up across deploys."""
+    return WorldTemplateCache(Path(directory), LinkMode.HARDLINK if hardlink else LinkMode.REFLINK)
@@ -1,9 +1,15 @@
-from .default_server import DefaultServer 
-from .minecraft_server import MinecraftServer
-from .server_group import ServerGroup
+from typing import TYPE_CHECKING
+from .._lazy import attach
 
-__all__ = (
-    'DefaultServer',
-    'ServerGroup',
-    'MinecraftServer',
-)
+if TYPE_CHECKING:
+    from .default_server import DefaultServer
+    from .minecraft_server import MinecraftServer
+    from .minecraft_server_snapshot import MinecraftServerSnapshot
+    from .server_group import ServerGroup
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'DefaultServer': '.default_server',
+    'ServerGroup': '.server_group',
+    'MinecraftServer': '.minecraft_server',
+    'MinecraftServerSnapshot': '.minecraft_server_snapshot',
+})
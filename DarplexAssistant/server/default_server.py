@@ -1,9 +1,28 @@
+from typing import Any, Optional
 from .server_group import ServerGroup
 
-class DefaultServer:
-    Lobby: ServerGroup = ServerGroup('Lobby', 512, 0, 0, None,
-                                     False, 'lobby.zip', 'Hub.jar', 'plugins/Hub/', 'Lobby')
-    Staff: ServerGroup = ServerGroup('Staff', 512, 0, 0, None,
-                                     False, 'arcade.zip', 'StaffServer.jar', 'plugins/StaffServer/', 
-                                     'Staff', serverType='Minigames', staffOnly=True)
 
+class _DefaultServerGroup:
+    """Builds its `ServerGroup` on first access and caches it on the class.
+    Building one reads Redis, which must not happen at import."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.args = args
+        self.kwargs = kwargs
+        self.name = ''
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Optional[object], owner: type) -> ServerGroup:
+        server_group = ServerGroup(*self.args, **self.kwargs)
+        setattr(owner, self.name, server_group)
+        return server_group
+
+
+class DefaultServer:
+    Lobby: ServerGroup = _DefaultServerGroup('Lobby', 512, 0, 0, None,
+                                             False, 'lobby.zip', 'Hub.jar', 'plugins/Hub/', 'Lobby') # type: ignore
+    Staff: ServerGroup = _DefaultServerGroup('Staff', 512, 0, 0, None,
+                                             False, 'arcade.zip', 'StaffServer.jar', 'plugins/StaffServer/', 
+                                             'Staff', serverType='Minigames', staffOnly=True) # type: ignore
@@ -1,68 +1,31 @@
-from dataclasses import dataclass
+from dataclasses import InitVar, dataclass
 from datetime import datetime, timedelta
 import json
-from typing import Callable, Iterator, Optional, Self
+from typing import Iterator, Optional, Self
 
-from DarplexAssistant.scripts.start_server import start_server
-from DarplexAssistant.scripts.stop_server import stop_server
 from ..repository import get_redis_repo, RedisRepository
 from ..utils import GameJoinStatus, GameStatusDisplay, Region
+from .minecraft_server_snapshot import MinecraftServerNotExistsException, MinecraftServerSnapshot, parse_motd
+from .server_cache import get_cached_server_status_dict, get_server_status_cache
 
 
-class MinecraftServerNotExistsException(Exception):
-    pass
-
-
-class Cache:
-    server_status_dicts = dict[tuple[str, Region], dict[str, str]]()
-    times = dict[tuple[str, Region], float]()
-
-
-def cache(func: Callable, timeout: int = 5) -> Callable:
-    """Stores cached `RedisRepository.get_server_status_dict` for minimal repo calls.
-    If `timeout` exceeded, `server_status_dict` is retrieved and is assigned to the `MinecraftServer`'s name and `Region`"""
-
-
-    def check_time(server_name: str, key: str, region: Region) -> str:
-        if not Cache.times.get((server_name, region)) or not Cache.server_status_dicts.get((server_name, region)): # type: ignore
-            Cache.times[(server_name, region)] = datetime.now().timestamp()
-            res = func(server_name, key, region)
-            with get_redis_repo() as repo:
-                Cache.server_status_dicts[(server_name, region)] = repo.get_server_status_dict(server_name, region)
-            return res
-        now = datetime.now().timestamp()
-        difference = now - Cache.times.get((server_name, region), datetime.now().timestamp())
-        if difference <= timeout:
-            return Cache.server_status_dicts[(server_name, region)][key]
-        Cache.times[(server_name, region)] = now
-        res = func(server_name, key, region)
-        with get_redis_repo() as repo:
-            Cache.server_status_dicts[(server_name, region)] = repo.get_server_status_dict(server_name, region)
-        return res
-    return check_time
-
-
-@cache
 def get_minecraft_server_json_value(server_name: str, key: str, region: Region) -> str:
-    """If timeout is active, returns cached key through decorator.
-    Otherwise, returns latest ServerStatus json value."""
-    with get_redis_repo() as repository:
-        response = repository.get_server_status_dict(server_name, region)
-    return response.get(key, '-1')
+    """Returns ServerStatus json value.
+    Served from the server status cache until its `ttl` expires."""
+    return get_cached_server_status_dict(server_name, region).get(key, '-1')
 
 
 def get_attribute_by_motd(motd: str, attribute: str) -> Optional[str]:
-    if motd in ('A Minecraft Server', '-1'):
-        return 
-    motd_json = json.loads(motd)
     if attribute not in ('_game', '_mode', '_status', '_joinable'):
         return
-    return motd_json.get(attribute)
+    value = parse_motd(motd)[('_game', '_mode', '_status', '_joinable').index(attribute)]
+    if isinstance(value, (GameStatusDisplay, GameJoinStatus)):
+        return value.value
+    return value
 
 
 def get_if_exists(server_name: str, region: Region) -> bool:
-    with get_redis_repo() as repository:
-        return repository.get_if_minecraft_server_exists(server_name, region)
+    return len(get_cached_server_status_dict(server_name, region)) > 0
 
 
 @dataclass
@@ -73,7 +36,7 @@ class MinecraftServer:
             - Automatically generated by your -Plex server.
     
     Its properties dynamically updates every 3-5 seconds from when they were last called.
-        - Handle through the `cache` method.
+        - Handled through the server status cache (see `server_cache`).
         - Properties update every couple seconds of *when they are called*.
     """
     name: str
@@ -97,8 +60,12 @@ class MinecraftServer:
     _joinable: Optional[GameJoinStatus] = None
     _exists: bool = False
     region: Region = Region.US
+    snapshot: InitVar[Optional[MinecraftServerSnapshot]] = None
 
-    def __post_init__(self) -> None:
+    def __post_init__(self, snapshot: Optional[MinecraftServerSnapshot] = None) -> None:
+        if snapshot is not None:
+            self._apply_snapshot(snapshot)
+            return
         self._group = self.name.split('-')[0]
         self._max_ram = self.max_ram
         self._public_address = self.public_address
@@ -119,6 +86,34 @@ class MinecraftServer:
         self._joinable = self.joinable
         self._exists = self.exists
 
+    def _apply_snapshot(self, snapshot: MinecraftServerSnapshot) -> None:
+        """Fills fields from an already fetched snapshot (no Redis calls)."""
+        self._group = snapshot.group
+        self._max_ram = snapshot.max_ram
+        self._public_address = snapshot.public_address
+        self._port = snapshot.port
+        self._start_up_date = snapshot.start_up_date
+        self._motd = snapshot.motd
+        self._player_count = snapshot.player_count
+        self._max_player_count = snapshot.max_player_count
+        self._tps = snapshot.tps
+        self._ram = snapshot.ram
+        self._donors_online = snapshot.donors_online
+        self._current_time = snapshot.current_time
+        self._is_online = snapshot.is_online
+        self._uptime = snapshot.uptime
+        self._game = snapshot.game
+        self._mode = snapshot.mode
+        self._status = snapshot.status
+        self._joinable = snapshot.joinable
+        self._exists = True
+
+    def fetch_snapshot(self) -> MinecraftServerSnapshot:
+        """Returns an immutable `MinecraftServerSnapshot` from one ServerStatus fetch."""
+        with get_redis_repo() as repository:
+            server_status = repository.get_server_status_dict(self.name, self.region)
+        return MinecraftServerSnapshot.from_server_status_dict(server_status, self.region)
+
     @property
     def group(self) -> str:
         self._group = self.name.split('-')[0]
@@ -198,24 +193,22 @@ class MinecraftServer:
 
     @property
     def game(self) -> Optional[str]:
-        self._game = get_attribute_by_motd(self.motd, '_game')
+        self._game = parse_motd(self.motd)[0]
         return self._game
 
     @property
     def mode(self) -> Optional[str]:
-        self._mode = get_attribute_by_motd(self.motd, '_mode')
+        self._mode = parse_motd(self.motd)[1]
         return self._mode
 
     @property
     def status(self) -> Optional[GameStatusDisplay]:
-        self._status = None if self.motd in ('A Minecraft Server', '-1') else \
-                GameStatusDisplay(get_attribute_by_motd(self.motd, '_status'))
+        self._status = parse_motd(self.motd)[2]
         return self._status
 
     @property
     def joinable(self) -> Optional[GameJoinStatus]:
-        self._joinable = None if self.motd in ('A Minecraft Server', '-1') else \
-                GameJoinStatus(get_attribute_by_motd(self.motd, '_joinable'))
+        self._joinable = parse_motd(self.motd)[3]
         return self._joinable
 
     @property
@@ -227,11 +220,20 @@ class MinecraftServer:
         """Starts up `MinecraftServer`"""
         if not self.exists:
             raise MinecraftServerNotExistsException
+        from ..scripts import start_server # provisioning is only loaded when a server is deployed
+        with get_redis_repo() as repository:
+            repository.expect_minecraft_servers([self.name], self.region)
         start_server(*self.start_server_params()) # type: ignore
 
-    def kill_server(self) -> None:
-        """Stops the `MinecraftServer`"""
-        stop_server(self.name)
+    def kill_server(self, keep_directory: bool = False) -> None:
+        """Stops the `MinecraftServer` and deletes its directory, unless `keep_directory`."""
+        from ..scripts import stop_server
+        stop_server(self.name, keep_directory)
+
+    def restart_server(self) -> None:
+        """Stops and redeploys the `MinecraftServer` in its existing directory."""
+        self.kill_server(keep_directory=True)
+        self.deploy_server()
 
     def start_server_params(self) -> Optional[tuple[bool | str | int, ...]]:
         """Returns params necessary to start server."""
@@ -300,10 +302,23 @@ class MinecraftServer:
         name: Optional[str] = None
         if minecraft_server is None or (name := minecraft_server.get('_name')) is None:
             raise MinecraftServerNotExistsException()
-        return cls(
-            name = name,
-            region = region,
-        )
+        return cls.from_server_status_dict(minecraft_server, region)
+
+    @classmethod
+    def from_server_status_dict(cls, server_status: dict[str, str], region: Region) -> Self:
+        """
+        Builds a fully populated `MinecraftServer` from a fetched ServerStatus dict.
+        Makes no Redis calls; used by bulk loaders.
+        Will raise `MinecraftServerNotExistsException` if `_name` is missing.
+        """
+        snapshot = MinecraftServerSnapshot.from_server_status_dict(server_status, region)
+        get_server_status_cache().set((snapshot.name, region), server_status)
+        return cls.from_snapshot(snapshot)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: MinecraftServerSnapshot) -> Self:
+        """Builds a `MinecraftServer` from a `MinecraftServerSnapshot` (no Redis calls)."""
+        return cls(name=snapshot.name, region=snapshot.region, snapshot=snapshot)
 
 
 def extract_region_from_server_status_key(server_status_key: str) -> Region:
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+import json
+from typing import Optional, Self
+
+from ..repository import get_redis_repo
+from ..utils import GameJoinStatus, GameStatusDisplay, Region
+
+
+ONLINE_THRESHOLD_SECONDS = 10000
+
+
+class MinecraftServerNotExistsException(Exception):
+    pass
+
+
+MotdAttributes = tuple[Optional[str], Optional[str], Optional[GameStatusDisplay], Optional[GameJoinStatus]]
+
+
+@lru_cache(maxsize=1024)
+def parse_motd(motd: str) -> MotdAttributes:
+    """Returns `(game, mode, status, joinable)` parsed from a ServerStatus `_motd`.
+    Non-arcade motds (plain text, or Json without a valid `_status`/`_joinable`) return `(None, None, None, None)`.
+    Memoized, so the same motd is only decoded once."""
+    if motd in ('A Minecraft Server', '-1'):
+        return None, None, None, None
+    try:
+        motd_json = json.loads(motd)
+        if not isinstance(motd_json, dict):
+            return None, None, None, None
+        return (motd_json.get('_game'),
+                motd_json.get('_mode'),
+                GameStatusDisplay(motd_json.get('_status')),
+                GameJoinStatus(motd_json.get('_joinable')))
+    except ValueError: # JSONDecodeError or unknown enum value
+        return None, None, None, None
+
+
+@dataclass(frozen=True, slots=True)
+class MinecraftServerSnapshot:
+    """Immutable view of one ServerStatus cache at the time it was fetched.
+        - Built from a single decoded ServerStatus payload (no further Redis calls).
+        - Use `refresh` to fetch a newer snapshot.
+    """
+    name: str
+    region: Region
+    group: str
+    max_ram: int
+    public_address: str
+    port: int
+    start_up_date: datetime
+    motd: str
+    player_count: int
+    max_player_count: int
+    tps: int
+    ram: int
+    donors_online: int
+    current_time: datetime
+    is_online: bool
+    uptime: timedelta
+    game: Optional[str]
+    mode: Optional[str]
+    status: Optional[GameStatusDisplay]
+    joinable: Optional[GameJoinStatus]
+
+    @classmethod
+    def from_server_status_dict(cls, server_status: dict[str, str], region: Region) -> Self:
+        """
+        Builds snapshot from a decoded ServerStatus dict.
+        Will raise `MinecraftServerNotExistsException` if `_name` is missing.
+        """
+        if (name := server_status.get('_name')) is None:
+            raise MinecraftServerNotExistsException()
+        motd = server_status.get('_motd', '-1')
+        start_up_date = datetime.fromtimestamp(int(server_status.get('_startUpDate', '-1')))
+        current_time = datetime.fromtimestamp(int(server_status.get('_currentTime', '-1')) / 1000)
+        return cls(name,
+                   region,
+                   name.split('-')[0],
+                   int(server_status.get('_maxRam', '-1')),
+                   server_status.get('_publicAddress', '-1'),
+                   int(server_status.get('_port', '-1')),
+                   start_up_date,
+                   motd,
+                   int(server_status.get('_playerCount', '-1')),
+                   int(server_status.get('_maxPlayerCount', '-1')),
+                   int(server_status.get('_tps', '-1')),
+                   int(server_status.get('_ram', '-1')),
+                   int(server_status.get('_donorsOnline', '-1')),
+                   current_time,
+                   datetime.now().timestamp() - current_time.timestamp() <= ONLINE_THRESHOLD_SECONDS,
+                   current_time - start_up_date,
+                   *parse_motd(motd))
+
+    def refresh(self) -> Self:
+        """Returns a new snapshot with the latest ServerStatus.
+        Will raise `MinecraftServerNotExistsException` if the ServerStatus is gone."""
+        with get_redis_repo() as repository:
+            server_status = repository.get_server_status_dict(self.name, self.region)
+        return type(self).from_server_status_dict(server_status, self.region)
+
+    def needs_restart(self) -> bool:
+        return self.is_online and ('Restarting' in self.motd
+                                   or 'Finished' in self.motd)
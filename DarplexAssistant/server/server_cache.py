@@ -0,0 +1,59 @@
+from functools import cache
+from typing import Optional
+
+from ..repository import get_redis_repo
+from ..utils import CacheStats, get_settings, get_settings_loader, Region, Settings, TTLCache
+
+
+def get_cache_options(settings: Optional[Settings] = None) -> tuple[int, float]:
+    """Returns `(max_size, ttl)` from the `cache` section of `settings` (current `config.toml` by default)."""
+    options = (settings or get_settings()).cache
+    return int(options.get('max_size', 4096)), float(options.get('ttl', 5))
+
+
+def _reloading_cache() -> TTLCache:
+    """`TTLCache` which takes over `max_size` and `ttl` whenever `config.toml` is reloaded."""
+    ttl_cache = TTLCache(*get_cache_options())
+    get_settings_loader().on_reload(lambda settings: ttl_cache.configure(*get_cache_options(settings)))
+    return ttl_cache
+
+
+@cache
+def get_server_status_cache() -> TTLCache[tuple[str, Region], dict[str, str]]:
+    """ServerStatus dicts keyed by `(server_name, Region)`."""
+    return _reloading_cache()
+
+
+@cache
+def get_server_group_cache() -> TTLCache[str, dict[str, str]]:
+    """ServerGroup dicts keyed by prefix."""
+    return _reloading_cache()
+
+
+def get_cached_server_status_dict(server_name: str, region: Region) -> dict[str, str]:
+    """Returns ServerStatus dict, fetching from Redis at most once per `ttl`."""
+    def load() -> dict[str, str]:
+        with get_redis_repo() as repository:
+            return repository.get_server_status_dict(server_name, region)
+    return get_server_status_cache().get_or_load((server_name, region), load)
+
+
+def get_cached_server_group_dict(prefix: str) -> dict[str, str]:
+    """Returns ServerGroup dict (`{}` if DNE), fetching from Redis at most once per `ttl`."""
+    prefix = prefix.replace('servergroups.', '')
+    def load() -> dict[str, str]:
+        with get_redis_repo() as repository:
+            return repository.get_server_group_dict(prefix)
+    return get_server_group_cache().get_or_load(prefix, load)
+
+
+def invalidate_server_group(prefix: str) -> None:
+    """Drops cached ServerGroup dict. Call after writing the ServerGroup hash."""
+    get_server_group_cache().invalidate(prefix.replace('servergroups.', ''))
+
+
+def get_cache_stats() -> dict[str, CacheStats]:
+    return {
+        'server_status': get_server_status_cache().stats(),
+        'server_group': get_server_group_cache().stats(),
+    }
@@ -1,11 +1,15 @@
 from dataclasses import dataclass
 from enum import Enum
 from pprint import pprint
-from typing import Iterator, Optional, Self
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Self
 from .minecraft_server import MinecraftServer, get_minecraft_servers_by_prefix
+from .server_cache import get_cached_server_group_dict, get_server_group_cache, invalidate_server_group
 from ..repository import get_redis_repo
 from ..utils import get_region_by_str, Region
 
+if TYPE_CHECKING:
+    from ..scripts import ProvisionResult
+
 
 class ServerGroupNotExistsException(Exception):
     pass
@@ -74,9 +78,9 @@ class ServerGroup:
     cpu: int = 1
 
     def _exists(self) -> bool:
-        """Returns if ServerGroup exists in Redis DB."""
-        with get_redis_repo() as repository:
-            return repository.server_group_exists(self.prefix) 
+        """Returns if ServerGroup exists in Redis DB.
+        Served from the server group cache until its `ttl` expires."""
+        return len(get_cached_server_group_dict(self.prefix)) > 0
 
     def __post_init__(self) -> None:
         if self._exists():
@@ -110,6 +114,41 @@ class ServerGroup:
                 f' {convert_to_str(self.addNoCheat)}'
                 f' {convert_to_str(self.addWorldEdit)}')
 
+    def start_server_params(self, server_num: int) -> tuple[bool | str | int, ...]:
+        """Returns `start_server` params for the `server_num`th server of this group."""
+        assert isinstance(self.portSection, int)
+        return (self.portSection + server_num,
+                self.ram,
+                self.worldZip,
+                self.plugin,
+                self.configPath,
+                self.prefix,
+                f'{self.prefix}-{server_num}',
+                self.region in (Region.US, Region.ALL),
+                self.addNoCheat,
+                self.addWorldEdit)
+
+    def expect_servers(self, server_nums: Iterable[int]) -> None:
+        """Indexes the ServerStatus keys of servers about to be deployed (see `ServerStatusIndex.expect`)."""
+        region = Region.US if self.region in (Region.US, Region.ALL) else self.region
+        with get_redis_repo() as repo:
+            repo.expect_minecraft_servers((f'{self.prefix}-{server_num}' for server_num in server_nums), region)
+
+    def deploy_server(self, server_num: int) -> None:
+        """Starts up the `server_num`th `MinecraftServer` of this group."""
+        from ..scripts import start_server # provisioning is only loaded when a server is deployed
+        self.expect_servers([server_num])
+        start_server(*self.start_server_params(server_num)) # type: ignore
+
+    def deploy_servers(self, server_nums: Iterable[int]) -> list['ProvisionResult']:
+        """Starts up many servers of this group in parallel (see `provision_many`).
+        Returns per-server timings and failures."""
+        from ..scripts import ServerSpec, provision_many
+        server_nums = list(server_nums)
+        self.expect_servers(server_nums)
+        return provision_many(ServerSpec(*self.start_server_params(server_num)) # type: ignore
+                              for server_num in server_nums)
+
     def get_delete_cmd(self, server_num: int) -> str:
         """Gets delete server command for the `stopServer.py` script"""
         return f'python3 stopServer.py 127.0.0.1 {self.prefix}-{server_num}'
@@ -122,41 +161,56 @@ class ServerGroup:
         """Returns `True` if `ServerGroup` is a COM (Community) ServerGroup"""
         return self.serverType == 'Community'
 
+    def _scale_total_servers(self, delta: int) -> None:
+        with get_redis_repo() as repo:
+            total_servers = repo.scale_total_servers(self.prefix, delta)
+        invalidate_server_group(self.prefix)
+        if total_servers is None:
+            raise ServerGroupNotExistsException()
+        self.totalServers = total_servers
+
     def increment_total_servers(self) -> None:
         """Increments `totalServers` by one.
         (Internal method)."""
         # TODO: Fix for Lobby creation
-        with get_redis_repo() as repo:
-            repo.redis.hset(f'servergroups.{self.prefix}', 'totalServers', f'{self.totalServers+1}')
-            self.totalServers += 1
+        self._scale_total_servers(1)
 
     def decrement_total_servers(self) -> None:
         """Decrements `totalServers` by one. (`totalServers` >= 0).
         (Internal method)."""
-        with get_redis_repo() as repo:
-            if self.totalServers - 1 < 0:
-                return
-            repo.redis.hset(f'servergroups.{self.prefix}', 'totalServers', f'{self.totalServers-1}')
-            self.totalServers -= 1
+        self._scale_total_servers(-1)
 
     def set_total_servers(self, count: int) -> None:
         """Set totalServers to specified `count`"""
         with get_redis_repo() as repo:
-            repo.redis.hset(f'servergroups.{self.prefix}', 'totalServers', f'{count}')
+            total_servers = repo.set_total_servers(self.prefix, count)
+        invalidate_server_group(self.prefix)
+        if total_servers is None:
+            raise ServerGroupNotExistsException()
+        self.totalServers = total_servers
 
     def deploy_minecraft_servers(self, count: int) -> None:
         """Creates `count` number of `MinecraftServer`s.
-        Check `RedisRepository`.`server_group_exists` before expecting new instances"""
-        for _ in range(count):
-            self.increment_total_servers()
+        One atomic round trip regardless of `count`.
+        Raises `ServerGroupNotExistsException` if ServerGroup DNE in Redis."""
+        self._scale_total_servers(count)
 
     def remove_minecraft_servers(self, count: int) -> None:
-        """Deletes `count` number of `MinecraftServer`s.
-        Will only work if server group exists in Redis.
-        (Check with `RedisRepository`'s `server_group_exists`).
+        """Deletes `count` number of `MinecraftServer`s (`totalServers` >= 0).
+        One atomic round trip regardless of `count`.
+        Raises `ServerGroupNotExistsException` if ServerGroup DNE in Redis.
         """
-        for _ in range(count):
-            self.decrement_total_servers()
+        self._scale_total_servers(-count)
+
+    @staticmethod
+    def scale_many(deltas: dict[str, int]) -> dict[str, Optional[int]]:
+        """Scales many ServerGroups by prefix in a single pipeline.
+        Returns prefix mapped to new `totalServers` (`None` if ServerGroup DNE)."""
+        with get_redis_repo() as repo:
+            result = repo.scale_server_groups(deltas)
+        for prefix in deltas:
+            invalidate_server_group(prefix)
+        return result
 
     def create(self) -> None:
         """Creates the ServerGroup key in Redis.
@@ -173,9 +227,10 @@ class ServerGroup:
         None
         """
         with get_redis_repo() as repo:
-            while self.portSection is None or (not self._exists() and repo.get_if_port_conflicts(self.portSection)):
-                self.portSection = repo.generate_random_port()
+            if not self._exists():
+                self.portSection = repo.reserve_port_section(self.prefix, self.portSection)
             repo.create_server_group(self.prefix, self._convert_to_dict())
+        invalidate_server_group(self.prefix)
 
     def overwrite(self) -> None:
         """Recreates Redis ServerGroup."""
@@ -202,17 +257,26 @@ class ServerGroup:
         """
         with get_redis_repo() as repo:
             repo.delete_server_group(self.prefix)
+        invalidate_server_group(self.prefix)
 
     @staticmethod
     def parameterize_server_group_dict(prefix: str) -> dict[str, str | int | Region | bool]:
-        with get_redis_repo() as repository:
-            data = repository.get_server_group_dict(prefix).copy()
+        data = get_cached_server_group_dict(prefix).copy()
+        if 'portSection' not in data:
+            with get_redis_repo() as repository:
+                data['portSection'] = str(repository.next_available_port())
+        return ServerGroup.parse_server_group_dict(data)
+
+    @staticmethod
+    def parse_server_group_dict(data: dict[str, str]) -> dict[str, str | int | Region | bool | None]:
+        """Converts ServerGroup Redis hash into `ServerGroup` keyword arguments (no Redis calls)."""
+        port_section = data.get('portSection', '')
         return dict(
             prefix = data.get('prefix', ''),
             ram = int(data.get('ram', 512)),
             totalServers = int(data.get('totalServers', 0)),
             joinableServers = int(data.get('joinableServers', 0)),
-            portSection = int(data.get('portSection', repository.next_available_port())),
+            portSection = int(port_section) if port_section.isdigit() else None,
             arcadeGroup = data.get('arcadeGroup') == 'true',
             worldZip = data.get('worldZip', 'lobby.zip'),
             plugin = data.get('plugin', 'Hub.jar'),
@@ -269,3 +333,11 @@ class ServerGroup:
         """
         return cls(**ServerGroup.parameterize_server_group_dict(prefix)) # type: ignore
 
+    @classmethod
+    def from_server_group_dict(cls, data: dict[str, str]) -> Self:
+        """Builds ServerGroup from an already fetched Redis hash.
+        Primes the server group cache, so construction makes no Redis calls
+        (unless the hash has no `portSection`)."""
+        get_server_group_cache().set(data.get('prefix', ''), data)
+        return cls(**ServerGroup.parse_server_group_dict(data)) # type: ignore
+
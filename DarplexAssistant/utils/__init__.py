@@ -5,6 +5,7 @@ from .server_utils import (BUKKIT_YML_DICT,
                            REDIS_CONN_TYPES,
                            SERVER_PROPERTIES,
                            SPIGOT_YML_DICT,
+                           format_config,
                            write_to_file)
 from .game_join_status import GameJoinStatus
 from .game_status_display import GameStatusDisplay
@@ -20,6 +21,14 @@ from .redis_utils import (ARCADE_DICT,
                           get_region_by_str,
                           create_config_if_not_exists,
                           CONFIG_PATH)
+from .settings import (InvalidSettingsException,
+                       Settings,
+                       SettingsLoader,
+                       get_settings,
+                       get_settings_loader)
+from .ttl_cache import CacheStats, TTLCache
+from .file_utils import LinkMode, clone_file, clone_tree
+from .terminal import DiffRenderer, KeyWatcher, clear_screen
 
 __all__ = (
     'GameJoinStatus',
@@ -42,7 +51,21 @@ __all__ = (
     'REDIS_CONN_TYPES',
     'REDIS_CONN_NAMES',
     'DATABASES',
+    'format_config',
     'write_to_file',
     'CONFIG_PATH',
+    'InvalidSettingsException',
+    'Settings',
+    'SettingsLoader',
+    'get_settings',
+    'get_settings_loader',
+    'CacheStats',
+    'TTLCache',
+    'LinkMode',
+    'clone_file',
+    'clone_tree',
+    'DiffRenderer',
+    'KeyWatcher',
+    'clear_screen',
 )
 
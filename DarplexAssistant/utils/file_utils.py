@@ -0,0 +1,75 @@
+from enum import Enum
+import errno
+import os
+from pathlib import Path
+import shutil
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+class LinkMode(Enum):
+    HARDLINK = 'hardlink'
+    SYMLINK = 'symlink'
+    REFLINK = 'reflink'
+    COPY = 'copy'
+
+
+def reflink_file(source: Path, destination: Path) -> bool:
+    """Clones `source` to `destination` sharing extents (copy-on-write, btrfs/XFS).
+    Returns `False` (leaving no `destination`) if the filesystem can't reflink."""
+    if fcntl is None:
+        return False
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            cloned = False
+        else:
+            cloned = True
+    if not cloned:
+        destination.unlink()
+        return cloned
+    shutil.copystat(source, destination)
+    return cloned
+
+
+def clone_file(source: Path, destination: Path, mode: LinkMode = LinkMode.REFLINK) -> LinkMode:
+    """Places `source` at `destination` as cheaply as `mode` allows.
+    Falls back to reflink, then to a full copy (e.g. across filesystems).
+    Returns the `LinkMode` actually used.
+    - `HARDLINK`/`SYMLINK` share the file, so writes show up in `source`; only use them for files nobody writes.
+    - `REFLINK`/`COPY` are private copies.
+    """
+    try:
+        if mode == LinkMode.HARDLINK:
+            os.link(source, destination)
+            return LinkMode.HARDLINK
+        if mode == LinkMode.SYMLINK:
+            os.symlink(Path(source).resolve(), destination)
+            return LinkMode.SYMLINK
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise
+    if mode != LinkMode.COPY and reflink_file(source, destination):
+        return LinkMode.REFLINK
+    shutil.copy2(source, destination)
+    return LinkMode.COPY
+
+
+def clone_tree(source: Path, destination: Path, mode: LinkMode = LinkMode.REFLINK) -> dict[LinkMode, int]:
+    """Recreates directory `source` under `destination` using `clone_file` for every file.
+    Directories are always created (never linked). Returns number of files per `LinkMode` used."""
+    counts = dict((link_mode, 0) for link_mode in LinkMode)
+    for root, dirs, files in os.walk(source):
+        target = destination / Path(root).relative_to(source)
+        target.mkdir(parents=True, exist_ok=True)
+        for file in files:
+            counts[clone_file(Path(root) / file, target / file, mode)] += 1
+    return counts
@@ -129,9 +129,31 @@ DEFAULT_TOML_CONF: dict[str, dict[str, str | int | list]] = {
         'ram': 6000,
         'servers_directory': 'home/mineplex/servers',
         'jars_directory': 'home/mineplex/jars',
+        'artifact_link_mode': 'hardlink',
         'world_zip_folder_directory': 'home/mineplex/worlds',
+        'world_template_directory': 'home/mineplex/templates',
+        'hardlink_worlds': False,
         'traditional_db_config': False,
         'excluded_servers': [],
+        'tick_interval': 5,
+        'max_concurrent_actions': 4,
+        'tick_budget_ms': 250,
+        'provision_workers': 4,
+        'launch_stagger': 2.0,
+        'standby_groups': [],
+        'standby_min': 1,
+        'standby_max': 3,
+        'standby_window': 600,
+        'server_log_directory': 'home/mineplex/logs',
+        'server_log_max_bytes': 10485760,
+        'server_log_backup_count': 3,
+        'teardown_bytes_per_second': 67108864,
+        'teardown_files_per_second': 5000,
+        'change_feed': True,
+        'change_feed_configure_redis': False,
+        'node_name': '',
+        'nodes': [],
+        'max_group_share': 0.5,
     },
     'sql': {
         'address': '127.0.0.1',
@@ -148,6 +170,14 @@ DEFAULT_TOML_CONF: dict[str, dict[str, str | int | list]] = {
         'antispam': 1000,
         'enderchest': 1000,
         'banner': 1000
+    },
+    'cache': {
+        'max_size': 4096,
+        'ttl': 5,
+        'index_rebuild_interval': 300
+    },
+    'dashboard': {
+        'refresh_interval': 2.0
     }
 }
 
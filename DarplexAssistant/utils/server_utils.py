@@ -27,10 +27,14 @@ REDIS_CONN_NAMES = ('DefaultConnection', 'ServerStatus')
 DATABASES = ('ACCOUNT', 'QUEUE', 'MINEPLEX', 'MINEPLEX_STATS', 'PLAYER_STATS', 'MSSQL_MOCK')
 
 
+def format_config(data: dict[str, str | bool] | dict[str, str], symbol = ': ') -> str:
+    return '\n'.join((name + symbol + (str(data[name]).lower() 
+                                       if isinstance(data[name], bool) 
+                                       else str(data[name])) 
+                      for name in data))
+
+
 def write_to_file(path: Path, data: dict[str, str | bool] | dict[str, str], symbol = ': ') -> None:
     with open(path, 'w') as writer:
-        writer.write('\n'.join((name + symbol + (str(data[name]).lower() 
-                                                 if isinstance(data[name], bool) 
-                                                 else str(data[name])) 
-                                for name in data)))
+        writer.write(format_config(data, symbol))
 
@@ -0,0 +1,228 @@
+from functools import cache
+import logging
+import os
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional
+
+import toml
+from .redis_utils import CONFIG_PATH, DEFAULT_TOML_CONF, create_config_if_not_exists, get_region_by_str
+from .region import Region
+
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 1.0
+DEFAULT_BASE_DIR = Path.home() / 'mineplex'
+
+
+class InvalidSettingsException(Exception):
+    pass
+
+
+def _check_type(name: str, value: Any, default: Any) -> None:
+    if isinstance(default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(default, (int, float)):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, type(default))
+    if not valid:
+        raise InvalidSettingsException(f'{name} should be {type(default).__name__}, got {value!r}')
+
+
+def validate_settings(data: dict) -> dict:
+    """Checks `data` (a loaded `config.toml`) against `DEFAULT_TOML_CONF`.
+    - Missing sections are taken from `DEFAULT_TOML_CONF`; missing keys are left out,
+      so callers keep their own fallbacks.
+    - Keys known to `DEFAULT_TOML_CONF` must have the type of their default.
+    Returns the completed dict. Raises `InvalidSettingsException`."""
+    validated = dict(data)
+    for section, defaults in DEFAULT_TOML_CONF.items():
+        if section not in data:
+            validated[section] = dict(defaults)
+            continue
+        if not isinstance(data[section], dict):
+            raise InvalidSettingsException(f'[{section}] should be a table')
+        for key, value in data[section].items():
+            if key in defaults:
+                _check_type(f'{section}.{key}', value, defaults[key])
+    return validated
+
+
+class Settings:
+    """Validated contents of `config.toml` (see `validate_settings`).
+    Sections are dicts; the options used across modules are typed properties
+    with the fallbacks they always had."""
+
+    def __init__(self, data: dict, mtime_ns: int = 0) -> None:
+        self.data = data
+        self.mtime_ns = mtime_ns
+
+    def __getitem__(self, section: str) -> dict:
+        return self.data[section]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Settings) and self.data == other.data
+
+    @property
+    def redis_user(self) -> dict:
+        return self.data['redis_user']
+
+    @property
+    def server_monitor_options(self) -> dict:
+        return self.data['server_monitor_options']
+
+    @property
+    def sql(self) -> dict:
+        return self.data['sql']
+
+    @property
+    def api(self) -> dict:
+        return self.data['api']
+
+    @property
+    def microservice_ports(self) -> dict:
+        return self.data['microservice_ports']
+
+    @property
+    def cache(self) -> dict:
+        return self.data['cache']
+
+    @property
+    def dashboard(self) -> dict:
+        return self.data['dashboard']
+
+    def _directory(self, key: str, default: str) -> Path:
+        return Path(self.server_monitor_options.get(key, DEFAULT_BASE_DIR / default))
+
+    @property
+    def servers_directory(self) -> Path:
+        return self._directory('servers_directory', 'servers')
+
+    @property
+    def jars_directory(self) -> Path:
+        return self._directory('jars_directory', 'jars')
+
+    @property
+    def world_directory(self) -> Path:
+        return self._directory('world_zip_folder_directory', 'worlds')
+
+    @property
+    def template_directory(self) -> Path:
+        return self._directory('world_template_directory', 'templates')
+
+    @property
+    def log_directory(self) -> Path:
+        return self._directory('server_log_directory', 'logs')
+
+    @property
+    def max_ram(self) -> int:
+        return int(self.server_monitor_options.get('ram', 512))
+
+    @property
+    def region(self) -> Region:
+        return get_region_by_str(self.server_monitor_options.get('region', 'US'))
+
+    @property
+    def excluded_servers(self) -> list[str]:
+        return self.server_monitor_options.get('excluded_servers', [])
+
+
+class SettingsLoader:
+    """Loads `config.toml` once and reloads it when it changes.
+
+    `get` is cheap enough for hot paths: it only stats the file every `check_interval`
+    seconds and reloads if its mtime or size changed. An invalid file on reload is
+    logged and the previous `Settings` are kept. Listeners added with `on_reload`
+    are called with the new `Settings` whenever a reload changed them.
+
+    Anything calling `get_settings` at use time sees edits right away; the process-wide
+    objects built from settings (TTL caches, `Reaper`, `StandbyPool`, `PlacementScheduler`,
+    `RamLedger`, `ServerMonitor`) take them over from their `on_reload` listeners.
+    These keys still need a restart:
+    - `redis_user`: `redis_address`, `redis_port` (the shared connection pool keeps its address).
+    - `server_monitor_options`: the directories, `max_concurrent_actions`, `change_feed`,
+      `change_feed_configure_redis`, `node_name`, and turning `standby_groups` or `nodes`
+      on (or `nodes` off) when they were empty (or set) at start.
+    """
+
+    def __init__(self, path: Path = CONFIG_PATH, check_interval: float = CHECK_INTERVAL_SECONDS) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._settings: Optional[Settings] = None
+        self._stat: Optional[tuple[int, int]] = None
+        self._checked = 0.0
+        self._listeners: list[Callable[[Settings], None]] = []
+        self._lock = Lock()
+
+    def _stat_file(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Settings:
+        if self.path == CONFIG_PATH:
+            create_config_if_not_exists()
+        self._stat = self._stat_file()
+        with open(self.path, 'r') as fp:
+            try:
+                data = toml.load(fp)
+            except toml.TomlDecodeError as e:
+                raise InvalidSettingsException(f'{self.path}: {e}') from e
+        return Settings(validate_settings(data), self._stat[0] if self._stat else 0)
+
+    def get(self) -> Settings:
+        """Returns current `Settings`, reloading them if the file changed."""
+        settings = self._settings
+        if settings is None:
+            return self.reload()
+        if monotonic() - self._checked < self.check_interval:
+            return settings
+        self._checked = monotonic()
+        if self._stat_file() == self._stat:
+            return settings
+        try:
+            return self.reload()
+        except (InvalidSettingsException, OSError) as e:
+            logger.error('Keeping previous settings, could not reload %s: %s', self.path, e)
+            return settings
+
+    def reload(self) -> Settings:
+        """Reads the file now and notifies listeners if the settings changed.
+        Raises `InvalidSettingsException` if it is invalid."""
+        with self._lock:
+            previous = self._settings
+            try:
+                settings = self._load()
+            finally:
+                self._checked = monotonic()
+            self._settings = settings
+        if previous is not None and settings != previous:
+            logger.info('Reloaded %s', self.path)
+            for listener in list(self._listeners):
+                try:
+                    listener(settings)
+                except Exception:
+                    logger.exception('Settings reload listener failed')
+        return settings
+
+    def on_reload(self, listener: Callable[[Settings], None]) -> Callable[[], None]:
+        """Calls `listener` with the new `Settings` after every reload which changed them.
+        Returns a function removing the listener."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+
+@cache
+def get_settings_loader() -> SettingsLoader:
+    """Process-wide `SettingsLoader` of `config.toml`."""
+    return SettingsLoader()
+
+
+def get_settings() -> Settings:
+    """Returns current `Settings` of `config.toml` (see `SettingsLoader.get`)."""
+    return get_settings_loader().get()
@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+from time import monotonic, sleep
+from typing import Optional, Self, Sequence, TextIO
+
+
+CSI = '\x1b['
+CLEAR_SCREEN = CSI + '2J' + CSI + 'H'
+CLEAR_LINE = CSI + 'K'
+CLEAR_BELOW = CSI + 'J'
+HIDE_CURSOR = CSI + '?25l'
+SHOW_CURSOR = CSI + '?25h'
+
+
+def move_to(row: int) -> str:
+    """ANSI sequence moving the cursor to the start of `row` (0-based)."""
+    return f'{CSI}{row + 1};1H'
+
+
+class DiffRenderer:
+    """Draws frames of lines in place, rewriting only rows which changed since the last frame.
+
+    Frames are cropped to the terminal size (the last visible row says how many lines were cut),
+    so drawing costs O(terminal rows) however long the frame is. Each frame is one write.
+    A terminal resize redraws everything.
+    """
+
+    def __init__(self, stream: TextIO = sys.stdout) -> None:
+        self.stream = stream
+        self._rows: list[str] = []
+        self._size: Optional[os.terminal_size] = None
+
+    def _fit(self, lines: Sequence[str], size: os.terminal_size) -> list[str]:
+        height = max(1, size.lines - 1)
+        rows = [line[:size.columns] for line in lines[:height]]
+        if len(lines) > height:
+            rows[-1] = f'... {len(lines) - height + 1} more lines'[:size.columns]
+        return rows
+
+    def draw(self, lines: Sequence[str]) -> int:
+        """Draws `lines`. Returns how many rows were rewritten."""
+        size = shutil.get_terminal_size()
+        rows = self._fit(lines, size)
+        output = []
+        if size != self._size:
+            output.append(CLEAR_SCREEN)
+            self._rows = []
+            self._size = size
+        changed = 0
+        for row, line in enumerate(rows):
+            if row < len(self._rows) and self._rows[row] == line:
+                continue
+            output.append(move_to(row) + line + CLEAR_LINE)
+            changed += 1
+        if len(rows) < len(self._rows):
+            output.append(move_to(len(rows)) + CLEAR_BELOW)
+        self._rows = rows
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+        return changed
+
+    def __enter__(self) -> Self:
+        self.stream.write(HIDE_CURSOR)
+        self.stream.flush()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stream.write(move_to(len(self._rows)) + SHOW_CURSOR)
+        self.stream.flush()
+
+
+class KeyWatcher:
+    """Watches stdin for a single keypress without waiting for Enter.
+    On POSIX stdin is put in cbreak mode while the watcher is open."""
+
+    def __init__(self, stream: TextIO = sys.stdin) -> None:
+        self.stream = stream
+        self._saved = None
+
+    def __enter__(self) -> Self:
+        if os.name == 'posix' and self.stream.isatty():
+            import termios
+            import tty
+            self._saved = termios.tcgetattr(self.stream.fileno())
+            tty.setcbreak(self.stream.fileno())
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self._saved is not None:
+            import termios
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self._saved)
+            self._saved = None
+
+    def wait(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for a key. Returns if one was pressed (and consumes it)."""
+        if os.name == 'nt':
+            import msvcrt
+            deadline = monotonic() + timeout
+            while not msvcrt.kbhit():
+                if monotonic() >= deadline:
+                    return False
+                sleep(0.02)
+            msvcrt.getwch()
+            return True
+        import select
+        ready, _, _ = select.select([self.stream], [], [], timeout)
+        if not ready:
+            return False
+        os.read(self.stream.fileno(), 1024)
+        return True
+
+
+def clear_screen(stream: TextIO = sys.stdout) -> None:
+    """Clears the terminal with ANSI codes instead of spawning `clear`."""
+    stream.write(CLEAR_SCREEN)
+    stream.flush()
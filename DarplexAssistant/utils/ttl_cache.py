@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Event, Lock
+from time import monotonic
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _Flight:
+    """In-flight load shared by concurrent misses of the same key."""
+    def __init__(self) -> None:
+        self.done = Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe cache bounded by `max_size` (least recently used evicted first).
+    Entries older than `ttl` seconds are reloaded.
+    Concurrent misses of one key share a single load (single-flight).
+    """
+
+    def __init__(self,
+        max_size: int = 4096,
+        ttl: float = 5,
+        clock: Callable[[], float] = monotonic
+    ) -> None:
+        assert max_size > 0, 'max_size must be positive.'
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._flights: dict[K, _Flight] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_fresh(self, key: K) -> tuple[bool, Optional[V]]:
+        """Returns `(found, value)`. Must hold `_lock`."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        stored_at, value = entry
+        if self._clock() - stored_at > self.ttl:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: K, value: V) -> None:
+        """Must hold `_lock`."""
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key: K) -> Optional[V]:
+        """Returns cached value or `None` if missing or expired."""
+        with self._lock:
+            found, value = self._get_fresh(key)
+            if found:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key: K, loader: Callable[[], V]) -> V:
+        """Returns cached value, calling `loader` once on a miss.
+        Threads missing the same key meanwhile wait for that load instead of calling `loader`."""
+        with self._lock:
+            found, value = self._get_fresh(key)
+            if found:
+                self._hits += 1
+                return value # type: ignore
+            self._misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value # type: ignore
+        try:
+            flight.value = loader()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._store(key, flight.value) # type: ignore
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def configure(self, max_size: int, ttl: float) -> None:
+        """Changes `max_size` and `ttl` in place, evicting entries over the new `max_size`."""
+        assert max_size > 0, 'max_size must be positive.'
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries))
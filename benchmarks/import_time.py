@@ -0,0 +1,102 @@
+"""Benchmarks package import time and guards it against regressions.
+
+    python benchmarks/import_time.py [runs] [--max-ms MS]
+
+Imports `DarplexAssistant` and `DarplexAssistant.cli` in fresh interpreters (`-X importtime`)
+and prints the median cumulative import time of each, plus the slowest modules pulled in.
+Exits with 1 if:
+- either fails to import (e.g. because it needs Redis),
+- importing them opens a file or socket (config, Redis) or starts a process,
+- importing them loads any of `HEAVY_MODULES` (those belong to the command that needs them),
+- the median of either is above `--max-ms` (default 150ms).
+"""
+from pathlib import Path
+import json
+import statistics
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGETS = ('DarplexAssistant', 'DarplexAssistant.cli')
+HEAVY_MODULES = ('redis',
+                 'asyncio',
+                 'toml',
+                 'DarplexAssistant.scripts.start_server',
+                 'DarplexAssistant.scripts.provision',
+                 'DarplexAssistant.server.server_group',
+                 'DarplexAssistant.monitor.reconciler')
+
+# Run in the child as `-c PROBE target heavy...`: records I/O while importing `target`,
+# then reports it with the heavy modules loaded.
+PROBE = """
+import importlib, json, sys
+target, heavy = sys.argv[1], sys.argv[2:]
+events = []
+def hook(event, args):
+    if event == 'open' and isinstance(args[0], str) and not args[0].endswith(('.py', '.pyc', '.pth')) \\
+            and not args[0].startswith(sys.base_prefix) and '__pycache__' not in args[0]:
+        events.append(f'open {args[0]}')
+    elif event in ('socket.connect', 'subprocess.Popen', 'os.system'):
+        events.append(event)
+sys.addaudithook(hook)
+importlib.import_module(target)
+print(json.dumps({'io': events, 'heavy': [name for name in heavy if name in sys.modules]}))
+"""
+
+
+def run_importtime(target: str) -> list[tuple[str, int, int]]:
+    """Imports `target` in a fresh interpreter. Returns `(module, self us, cumulative us)` rows."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line.removeprefix('import time:').split('|')
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def probe(target: str) -> dict:
+    result = subprocess.run([sys.executable, '-c', PROBE, target, *HEAVY_MODULES],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    max_ms = 150.0
+    if '--max-ms' in args:
+        i = args.index('--max-ms')
+        max_ms = float(args[i + 1])
+        del args[i:i + 2]
+    runs = int(args[0]) if args else 10
+    failures = []
+    for target in TARGETS:
+        try:
+            run_importtime(target) # warm up .pyc files
+        except subprocess.CalledProcessError as e:
+            failures.append(f'{target} fails to import: {e.stderr.strip().splitlines()[-1]}')
+            continue
+        timings = []
+        for _ in range(runs):
+            rows = run_importtime(target)
+            timings.append(next(cumulative for name, _, cumulative in reversed(rows) if name == target))
+        median_ms = statistics.median(timings) / 1000
+        slowest = sorted(rows, key=lambda row: -row[1])[:5]
+        report = probe(target)
+        print(f'import {target}: median {median_ms:.1f}ms over {runs} runs')
+        print('    slowest: ' + ', '.join(f'{name} {own / 1000:.1f}ms' for name, own, _ in slowest))
+        if report['io']:
+            failures.append(f'{target} does I/O at import: {report["io"]}')
+        if report['heavy']:
+            failures.append(f'{target} imports {report["heavy"]}')
+        if median_ms > max_ms:
+            failures.append(f'{target} takes {median_ms:.1f}ms to import (limit {max_ms:.0f}ms)')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmarks `PlacementScheduler` on a synthetic fleet.
+
+    python benchmarks/placement.py [groups] [nodes]
+
+Places every server of `groups` ServerGroups (2-30 servers each, 512-4096MB) on `nodes`
+nodes, with a fifth of the servers already running on random nodes.
+Nodes have 10% more RAM and twice the cpu the fleet needs. Prints the median plan time,
+how many servers were placed and how well the spread constraint held.
+"""
+from pathlib import Path
+import random
+import statistics
+import sys
+from time import perf_counter, time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from DarplexAssistant.monitor.placement import Node, PlacementScheduler
+from DarplexAssistant.server import MinecraftServerSnapshot, ServerGroup
+from DarplexAssistant.utils import Region
+
+
+def build_fleet(group_count: int, node_count: int, seed: int = 0):
+    rng = random.Random(seed)
+    groups = [ServerGroup.from_server_group_dict({'prefix': f'G{i}',
+                                                  'ram': str(rng.choice((512, 1024, 2048, 4096))),
+                                                  'cpu': str(rng.choice((1, 1, 2))),
+                                                  'totalServers': str(rng.randint(2, 30)),
+                                                  'joinableServers': '0',
+                                                  'portSection': str(25000 + i * 40)})
+              for i in range(group_count)]
+    ram = sum(group.ram * group.totalServers for group in groups)
+    cpu = sum(group.cpu * group.totalServers for group in groups)
+    nodes = [Node(f'node-{i}', f'10.0.0.{i}', ram=int(ram * 1.1 / node_count), cpu=int(cpu * 2 / node_count) + 1)
+             for i in range(node_count)]
+    now = int(time())
+    snapshots = [MinecraftServerSnapshot.from_server_status_dict({'_name': f'{group.prefix}-{num}',
+                                                                   '_publicAddress': rng.choice(nodes).address,
+                                                                   '_ram': str(group.ram),
+                                                                   '_startUpDate': str(now - 60),
+                                                                   '_currentTime': str(now * 1000)},
+                                                                  Region.US)
+                 for group in groups
+                 for num in range(1, group.totalServers // 5 + 1)]
+    return groups, nodes, snapshots
+
+
+def main() -> None:
+    group_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    node_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    groups, nodes, snapshots = build_fleet(group_count, node_count)
+    scheduler = PlacementScheduler(nodes)
+    timings = []
+    for _ in range(20):
+        started = perf_counter()
+        plan = scheduler.plan(groups, snapshots)
+        timings.append(perf_counter() - started)
+    servers = sum(group.totalServers for group in groups)
+    per_node: dict[tuple[str, str], int] = {}
+    for snapshot in snapshots:
+        key = (snapshot.group, next(node.name for node in nodes if node.address == snapshot.public_address))
+        per_node[key] = per_node.get(key, 0) + 1
+    for server_name, node_name in plan.placements.items():
+        key = (server_name.split('-')[0], node_name)
+        per_node[key] = per_node.get(key, 0) + 1
+    totals = dict((group.prefix, group.totalServers) for group in groups)
+    over_cap = sum(1 for (prefix, _), count in per_node.items() if count > scheduler._group_cap(totals[prefix]))
+    print(f'{group_count} groups, {servers} servers ({len(snapshots)} running), {node_count} nodes')
+    print(f'placed {len(plan.placements)}, unplaced {len(plan.unplaced)}')
+    print(f'median {statistics.median(timings) * 1000:.2f}ms, max {max(timings) * 1000:.2f}ms')
+    print(f'group/node pairs over the spread limit: {over_cap} (running servers are never moved)')
+    print(f'free ram left: {sum(plan.free_ram.values())}MB of {sum(node.ram for node in nodes)}MB')
+
+
+if __name__ == '__main__':
+    main()
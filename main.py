@@ -5,12 +5,16 @@ import os
 from pprint import pprint
 import sys
 from typing import Callable, Iterable, Iterator, Optional, Set
+from DarplexAssistant.cli import format_key_info, format_prefix_stats, format_server_statuses, format_servers, main as cli_main
 from DarplexAssistant.game.game_options import Game, GameOptions
+from DarplexAssistant.monitor.fleet_view import FleetPoller, get_fleet_view, get_refresh_interval
 
+from DarplexAssistant.repository.key_browser import KEY_PAGE_SIZE
 from DarplexAssistant.repository.redis_repository import get_redis_repo
 from DarplexAssistant.server.default_server import DefaultServer
 from DarplexAssistant.server.minecraft_server import MinecraftServer
 from DarplexAssistant.server.server_group import ServerGroup
+from DarplexAssistant.utils.terminal import DiffRenderer, KeyWatcher, clear_screen
 
 LOGO = """
 
@@ -24,21 +28,15 @@ LOGO = """
 
 """
 
-def clear_screen() -> None:
-    if os.name == 'posix':
-        os.system('clear')
-    else:
-        os.system('cls')
-
-
 def menu() -> None:
     print(LOGO)
     print(70 * ' ' + 'Welcome to Redis Assistant!\n\n')
     print(79 * ' ' + 'Commands\n\n')
     print(52 * ' ' + 'tutorial : Takes you into the tutorial.\n\n')
     print(52 * ' ' + 'printservers : Returns all servers and their online statuses.\n')
-    print(52 * ' ' + 'server-status-info : Returns detailed server uptime statistics.\n')
-    print(52 * ' ' + 'redis-info : View all current redis keys.')
+    print(52 * ' ' + 'server-status-info : Returns detailed server uptime statistics.')
+    print(52 * ' ' + 'server-status-live : Detailed server statistics, refreshed until a key is pressed.\n')
+    print(52 * ' ' + 'redis-info : Browse redis keys by pattern, a page at a time, or summarize them by prefix.')
     print(52 * ' ' + 'setup-redis : Sets up multiple game redis keys. Sends you into setup mode.')
     print(52 * ' ' + 'create-server-group : Create particular game server. Enters you into setup mode.')
     print(52 * ' ' + 'edit-server-group : Edit existing redis key options. Enters you into setup mode.')
@@ -57,100 +55,69 @@ def print_servers() -> None:
     """
     Returns all servers and their online statuses.
     (Simplified version of view_server_statuses)
+    Rendered from one `FleetView` fetch.
     """
-    with get_redis_repo() as repo:
-        server_group_names = set(repo.get_server_groups())
-    if len(set(server_group_names)) > 0:
-        largest_sg_name: str = next(iter(sorted(server_group_names, key=len, reverse=True)))
-        largest_output_str_len = len(f'[{largest_sg_name}] |')
-    else:
-        print('No ServerGroups found.')
-        return
-    for server_group_name in sorted(server_group_names):
-        output_str = f'[{server_group_name}]'
-        output_str += ' ' * (largest_output_str_len - len(output_str) - 1) + '| '
-        init_output_len = len(output_str)
-        prefix = server_group_name.replace('servergroups.', '')
-        server_group = ServerGroup.convert_to_server_group(prefix)
-        total_servers = set(server_group.servers)
-        online_servers: set[MinecraftServer] = set(server for server in total_servers if server.is_online)
-        player_count = sum(server.player_count for server in online_servers)
-        status = 'Online' if len(online_servers) > 0 else 'Offline'
-        output_str += f'Port Section: {server_group.portSection} | Servers {status} '
-        if len(online_servers) > 0:
-            output_str += f'| Players: {player_count} ' \
-                          f'| {len(online_servers)}/{len(total_servers)} servers launched ' \
-                           '|\n'
-            output_str += f'\n'.join(f'{' ' * (init_output_len - 2)}' 
-                                     f'| {online_serv.name} '
-                                     f'| Port: {online_serv.port} '
-                                     f'| Players: {online_serv.player_count}/{online_serv.max_player_count} '
-                                      '|'
-                                     for online_serv in online_servers)
-        print(output_str)
+    print('\n'.join(format_servers(get_fleet_view())))
+
 
 def tutorial() -> None:
     """Gives tutorial of features included DarplexAssistant"""
     pass
 
 
-def view_server_statuses() -> None: #TODO: Update every 2-3 seconds until user input received. 
+def view_server_statuses() -> None:
     """
     Returns detailed server uptime statistics.
+    Rendered from one `FleetView` fetch.
     """
-    with get_redis_repo() as repo:
-        server_group_names = list(repo.get_server_groups()).copy()
-    max_ram = 0
-    ram_usage = 0
-    if len(set(server_group_names)) == 0:
-        print('No ServerGroups found.')
-        return
-    for server_group_name in server_group_names:
-        prefix = server_group_name.replace('servergroups.', '')
-        server_group: ServerGroup = ServerGroup.convert_to_server_group(prefix)
-        servers = set(server_group.servers)
-        online_servers = set(server for server in servers if server.is_online)
-        offline_servers: Set[MinecraftServer] = servers.difference(online_servers)
-        print(f'- {prefix}:')
-        print(f'    - Port Section: {server_group.portSection}')
-        print(f'    - Max Ram: {server_group.ram}MB')
-        print(f'    - Total Servers: {server_group.totalServers}')
-        print(f'    - Joinable Servers: {server_group.joinableServers}')
-        if len(online_servers) + len(offline_servers) > 0:
-            print(f'    - Servers Launched: {len(online_servers)}/{len(servers)}')
-            print(f'    - Total Players: {sum(server.player_count for server in online_servers)}')
-            print(f'    - Servers:')
-        for online_server in online_servers:
-            max_ram += server_group.ram
-            ram = online_server.ram
-            ram_usage += ram
-            print(f'        - {online_server.name} (Online):')
-            print(f'            - Port: {online_server.port}')
-            print(f'            - Startup Date: {online_server.start_up_date}')
-            print(f'            - Uptime: {online_server.uptime} hours')
-            print(f'            - RAM usage: {ram}MB/{server_group.ram}MB')
-            print(f'            - Players: {online_server.player_count}/{server_group.maxPlayers}')
-            if online_server.game is not None:
-                print(f'            - Arcade Stats:')
-                print(f'                - Game: {online_server.game}')
-                print(f'                - Mode: {online_server.mode}')
-                print(f'                - Status: {online_server.status.value}') # type: ignore
-                print(f'                - Joinable: {online_server.joinable.value}') # type: ignore
-        for offline_server in offline_servers:
-            print(f'        - {offline_server.name} (Offline):')
-            print(f'            - Port: {offline_server.port}')
-            print(f'            - Offline since: {offline_server.current_time}') 
-            print(f'            - Last uptime: {offline_server.uptime} hours') 
-        print()
-    if max_ram != 0: 
-        print(f'Total ram usage: {ram_usage}MB/{max_ram}MB; {round((ram_usage / max_ram) * 100)}% of ram allocated has been used.')
+    print('\n'.join(format_server_statuses(get_fleet_view())))
+
+
+def live_server_statuses() -> None:
+    """
+    Detailed server uptime statistics, refreshed every `refresh_interval` seconds of `dashboard`
+    until a key is pressed. A `FleetPoller` fetches in the background; only changed lines are redrawn.
+    """
+    with FleetPoller(format_server_statuses, get_refresh_interval()) as poller, \
+         KeyWatcher() as keys, \
+         DiffRenderer() as renderer:
+        while True:
+            frame = poller.frame
+            if frame.fetched_at is None:
+                header = 'Fetching servers...' if frame.error is None else f'Redis unavailable: {frame.error}'
+            else:
+                header = f'Fleet status at {frame.fetched_at:%H:%M:%S} ({frame.fetch_seconds * 1000:.0f}ms)'
+                if frame.error is not None:
+                    header += f' | last refresh failed: {frame.error}'
+            renderer.draw((header + ' | press any key to exit', '', *frame.lines))
+            if keys.wait(0.1):
+                break
 
 
 def get_redis_info() -> None:
-    """View all current redis keys."""
+    """
+    View current redis keys matching a pattern, a page at a time.
+    - keys: key names only.
+    - details: adds TYPE, MEMORY USAGE and TTL columns.
+    - summary: key count and memory by prefix (e.g. `servergroups.*`).
+    """
+    pattern = input('Key pattern (default *)> ').strip() or '*'
+    mode = input('Mode: keys, details or summary (default keys)> ').strip() or 'keys'
     with get_redis_repo() as repo:
-        for key in sorted(repo.redis.scan_iter('*')):
-            print(key)
+        browser = repo.browse_keys(pattern)
+        if mode == 'summary':
+            print('\n'.join(format_prefix_stats(browser.summarize())))
+            return
+        shown = 0
+        for page in browser.pages(KEY_PAGE_SIZE, details=mode == 'details'):
+            print('\n'.join(map(format_key_info, page)))
+            shown += len(page)
+            if len(page) < KEY_PAGE_SIZE:
+                break
+            if input(f'-- {shown} keys shown; Enter for more, q to stop --').strip() == 'q':
+                return
+        if shown == 0:
+            print(f'No keys match {pattern}.')
 
 
 def print_setup_menu(groups: dict[int, ServerGroup], selected: set[str]) -> None:
@@ -277,6 +244,7 @@ COMMAND_TO_FUNC: dict[str, Callable] = {
     'tutorial': tutorial,
     'printservers': print_servers,
     'server-status-info': view_server_statuses,
+    'server-status-live': live_server_statuses,
     'redis-info': get_redis_info,
     'setup-redis': setup_redis,
     'create-server-group': create_server_group, # prints menu
@@ -307,5 +275,7 @@ def main() -> None:
         input('')
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli_main(sys.argv[1:]))
     main()
 
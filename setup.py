@@ -1,3 +1,5 @@
 from setuptools import setup
 
-setup(name='DarplexAssistant', version='0.0.1')
+setup(name='DarplexAssistant',
+      version='0.0.1',
+      entry_points={'console_scripts': ['darplex=DarplexAssistant.cli:main']})
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Awaitable, Callable
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.repository.async_redis_repository import AsyncRedisRepository
+from DarplexAssistant.repository.port_allocator import MAX_PORT, MIN_PORT, PORT_SECTION_WIDTH
+from DarplexAssistant.repository.server_status_index import BUILT_KEY, ServerStatusIndex
+from DarplexAssistant.utils import Region
+
+
+def run(test: Callable[[AsyncRedisRepository], Awaitable[None]]) -> None:
+    """Runs `test` against an `AsyncRedisRepository` backed by an empty in-memory Redis."""
+    async def main() -> None:
+        repository = AsyncRedisRepository('fake', 6379, redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+        try:
+            await test(repository)
+        finally:
+            await repository.close_connection()
+    asyncio.run(main())
+
+
+def server_status(name: str) -> str:
+    return json.dumps({'_name': name, '_group': name.split('-')[0], '_motd': 'A Minecraft Server',
+                       '_playerCount': 0, '_maxPlayerCount': 16, '_ram': 512})
+
+
+async def create_group(repository: AsyncRedisRepository, prefix: str, total_servers: int = 2) -> None:
+    await repository.create_server_group(prefix, {'prefix': prefix, 'ram': '512', 'totalServers': str(total_servers)})
+
+
+def test_scale_total_servers() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        await create_group(repository, 'MB')
+        assert await repository.scale_total_servers('MB', 3) == 5
+        assert await repository.scale_total_servers('MB', -10) == 0 # clamped
+        assert await repository.set_total_servers('MB', 4) == 4
+        assert (await repository.get_server_group_dict('MB'))['totalServers'] == '4'
+        assert await repository.scale_total_servers('NOPE', 1) is None
+        assert await repository.set_total_servers('NOPE', 1) is None
+        assert not await repository.server_group_exists('NOPE')
+    run(test)
+
+
+def test_scale_server_groups_in_one_round_trip() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        await create_group(repository, 'MB', 1)
+        await create_group(repository, 'SKY', 5)
+        assert await repository.scale_server_groups({'MB': 2, 'SKY': -2, 'NOPE': 1}) == {'MB': 3, 'SKY': 3, 'NOPE': None}
+        assert await repository.scale_server_groups({}) == {}
+    run(test)
+
+
+def test_reserve_port_sections() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        assert await repository.reserve_port_section('MB', 25100) == 25100
+        assert await repository.reserve_port_section('MB', 25100) == 25100 # already its own
+        assert await repository.get_if_port_conflicts(25100 + PORT_SECTION_WIDTH)
+        assert not await repository.get_if_port_conflicts(25100 + PORT_SECTION_WIDTH + 1)
+        other = await repository.reserve_port_section('SKY', 25105) # preferred one conflicts
+        assert MIN_PORT <= other <= MAX_PORT and abs(other - 25100) > PORT_SECTION_WIDTH
+        free = await repository.next_available_port()
+        assert not await repository.get_if_port_conflicts(free)
+        assert (await repository.get_port_range_stats()).allocated == 2
+    run(test)
+
+
+def test_create_server_group_reserves_its_port_section() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        await repository.create_server_group('MB', {'prefix': 'MB', 'portSection': '25200'})
+        assert await repository.get_if_port_conflicts(25205)
+        await repository.delete_server_group('MB')
+        assert not await repository.get_if_port_conflicts(25205)
+    run(test)
+
+
+def test_load_server_statuses() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        redis = repository.redis
+        for key in ('US.MB-1', 'US.MB-2', 'US.SKY-1', 'EU.MB-1'):
+            await redis.set(f'serverstatus.minecraft.{key}', server_status(key.split('.')[1]))
+        await redis.set('serverstatus.minecraft.US.BAD-1', 'not json')
+
+        loaded = dict([item async for item in repository.load_server_statuses(batch_size=2)])
+        assert sorted(loaded) == ['serverstatus.minecraft.EU.MB-1',
+                                  'serverstatus.minecraft.US.MB-1',
+                                  'serverstatus.minecraft.US.MB-2',
+                                  'serverstatus.minecraft.US.SKY-1']
+        assert loaded['serverstatus.minecraft.US.MB-2']['_name'] == 'MB-2'
+
+        us = [key async for key, _ in repository.load_server_statuses(region=Region.US, group='MB')]
+        assert sorted(us) == ['serverstatus.minecraft.US.MB-1', 'serverstatus.minecraft.US.MB-2']
+        everywhere = [key async for key, _ in repository.load_server_statuses(region=Region.ALL, group='MB')]
+        assert len(everywhere) == 3
+    run(test)
+
+
+def test_load_server_statuses_drops_expired_keys_from_index() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        redis = repository.redis
+        await redis.set('serverstatus.minecraft.US.MB-1', server_status('MB-1'))
+        await redis.set('serverstatus.minecraft.US.MB-2', server_status('MB-2'))
+        assert await repository.server_status_index.rebuild() == 2
+        # only the marker expires, so a rebuild is never racing an index set which just vanished
+        assert await redis.ttl(ServerStatusIndex.index_key()) == -1
+        assert await redis.ttl(BUILT_KEY) > 0
+
+        await redis.delete('serverstatus.minecraft.US.MB-2')
+        assert [key async for key, _ in repository.load_server_statuses()] == ['serverstatus.minecraft.US.MB-1']
+        assert await redis.smembers(ServerStatusIndex.index_key(Region.US, 'MB')) == {'serverstatus.minecraft.US.MB-1'}
+    run(test)
+
+
+def test_create_server_group_moves_conflicting_port_section() -> None:
+    async def test(repository: AsyncRedisRepository) -> None:
+        await repository.create_server_group('MB', {'prefix': 'MB', 'portSection': '25200'})
+        # written by another tool, so the allocator only learns about it from the hash
+        await repository.redis.sadd('servergroups', 'SKY')
+        await repository.redis.hset('servergroups.SKY', mapping={'prefix': 'SKY', 'portSection': '25300'})
+        await repository.create_server_group('CW', {'prefix': 'CW', 'portSection': '25305'})
+        port = int((await repository.get_server_group_dict('CW'))['portSection'])
+        assert abs(port - 25200) > PORT_SECTION_WIDTH and abs(port - 25300) > PORT_SECTION_WIDTH
+        assert (await repository.get_port_range_stats()).allocated == 3
+    run(test)
@@ -0,0 +1,159 @@
+import json
+import logging
+from time import monotonic, sleep
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.repository.change_feed import ChangeEvent, ChangeEventKind, ChangeFeed
+from DarplexAssistant.repository.redis_repository import RedisRepository
+
+SERVER_KEY = 'serverstatus.minecraft.US.MB-1'
+
+
+class ConfigRedis(fakeredis.FakeRedis):
+    """Answers CONFIG GET/SET like a real Redis (fakeredis has no CONFIG GET)."""
+    notify_keyspace_events = ''
+    config_sets: list[str] = []
+
+    def config_get(self, pattern: str = '*', *args, **kwargs) -> dict[str, str]:
+        return {'notify-keyspace-events': self.notify_keyspace_events}
+
+    def config_set(self, name: str, value: str, *args, **kwargs) -> bool:
+        self.config_sets.append(value)
+        return True
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def repository() -> RedisRepository:
+    return RedisRepository('fake', 6379, fakeredis.FakeRedis(decode_responses=True).connection_pool)
+
+
+@pytest.fixture
+def events() -> list[ChangeEvent]:
+    return []
+
+
+def kinds(events: list[ChangeEvent]) -> list[tuple[ChangeEventKind, str]]:
+    return [(event.kind, event.name) for event in events]
+
+
+def create_group(repository: RedisRepository, prefix: str, total: str = '1') -> None:
+    repository.redis.sadd('servergroups', prefix)
+    repository.redis.hset(f'servergroups.{prefix}', mapping={'prefix': prefix, 'totalServers': total})
+
+
+def test_resync_loads_mirror_and_publishes_differences(repository: RedisRepository, events: list[ChangeEvent]) -> None:
+    feed = ChangeFeed(repository)
+    feed.subscribe(events.append)
+    create_group(repository, 'MB')
+    repository.redis.set(SERVER_KEY, json.dumps({'_name': 'MB-1'}))
+    repository.redis.set('serverstatus.minecraft.US.BAD-1', 'not json')
+    feed.resync()
+    assert feed.synced.is_set()
+    groups, servers = feed.mirror()
+    assert groups == {'MB': {'prefix': 'MB', 'totalServers': '1'}}
+    assert servers == {SERVER_KEY: {'_name': 'MB-1'}}
+    assert kinds(events) == [(ChangeEventKind.GROUP_CREATED, 'MB'), (ChangeEventKind.SERVER_UP, 'MB-1')]
+
+    # changes missed while disconnected
+    events.clear()
+    repository.redis.hset('servergroups.MB', 'totalServers', '2')
+    create_group(repository, 'SKY')
+    repository.redis.delete(SERVER_KEY)
+    feed.resync()
+    assert sorted(kinds(events), key=str) == sorted([(ChangeEventKind.GROUP_CHANGED, 'MB'),
+                                                     (ChangeEventKind.GROUP_CREATED, 'SKY'),
+                                                     (ChangeEventKind.SERVER_DOWN, 'MB-1')], key=str)
+    assert feed.mirror()[1] == {}
+    events.clear()
+    feed.resync()
+    assert events == [] # nothing changed
+
+
+def test_stale_servers_are_reported_once(repository: RedisRepository, events: list[ChangeEvent]) -> None:
+    feed = ChangeFeed(repository, stale_after=0.05)
+    feed.subscribe(events.append)
+    repository.redis.set(SERVER_KEY, json.dumps({'_name': 'MB-1'}))
+    feed.resync()
+    sleep(0.1)
+    feed._last_stale_check = 0
+    feed._check_stale()
+    feed._last_stale_check = 0
+    feed._check_stale()
+    assert kinds(events) == [(ChangeEventKind.SERVER_UP, 'MB-1'), (ChangeEventKind.SERVER_STALE, 'MB-1')]
+    feed.resync() # rewritten since: up again
+    assert kinds(events)[-1] == (ChangeEventKind.SERVER_UP, 'MB-1')
+
+
+def test_notifications_update_mirror(repository: RedisRepository, events: list[ChangeEvent]) -> None:
+    feed = ChangeFeed(repository)
+    feed.subscribe(events.append)
+    feed.start()
+    try:
+        assert wait_until(feed.synced.is_set)
+        create_group(repository, 'MB')
+        assert wait_until(lambda: 'MB' in feed.groups)
+        repository.redis.hset('servergroups.MB', 'totalServers', '3')
+        assert wait_until(lambda: feed.groups['MB'].get('totalServers') == '3')
+        repository.redis.set(SERVER_KEY, json.dumps({'_name': 'MB-1', '_ram': 512}))
+        assert wait_until(lambda: SERVER_KEY in feed.servers)
+        assert repository.server_status_index.members() == {SERVER_KEY}
+        repository.redis.set('serverstatus.minecraft.US.MB-2', 'not json') # skipped, feed keeps running
+        repository.redis.delete(SERVER_KEY)
+        assert wait_until(lambda: SERVER_KEY not in feed.servers)
+        repository.redis.delete('servergroups.MB')
+        assert wait_until(lambda: 'MB' not in feed.groups)
+        assert feed.running and feed.synced.is_set()
+    finally:
+        feed.stop()
+    assert kinds(events) == [(ChangeEventKind.GROUP_CREATED, 'MB'),
+                             (ChangeEventKind.GROUP_CHANGED, 'MB'),
+                             (ChangeEventKind.SERVER_UP, 'MB-1'),
+                             (ChangeEventKind.SERVER_DOWN, 'MB-1'),
+                             (ChangeEventKind.GROUP_DELETED, 'MB')]
+    assert events[2].data == {'_name': 'MB-1', '_ram': 512}
+    assert repository.server_status_index.members() == set()
+
+
+def test_failing_listener_does_not_stop_others(repository: RedisRepository, events: list[ChangeEvent]) -> None:
+    feed = ChangeFeed(repository)
+    feed.subscribe(lambda event: 1 / 0)
+    unsubscribe = feed.subscribe(events.append)
+    create_group(repository, 'MB')
+    feed.resync()
+    assert len(events) == 1
+    unsubscribe()
+    repository.redis.delete('servergroups.MB')
+    feed.resync()
+    assert len(events) == 1
+
+
+@pytest.mark.parametrize('flags, configure, expected', [
+    ('', False, []),
+    ('', True, ['Kg$hsxe']),
+    ('Ex', True, ['EKg$hsxe']),
+    ('AK', True, []), # `A` covers every class
+    ('KEA', False, []),
+])
+def test_notifications_are_only_configured_when_asked(repository: RedisRepository, flags: str, configure: bool,
+                                                      expected: list[str], caplog: pytest.LogCaptureFixture) -> None:
+    repository.redis = ConfigRedis(decode_responses=True)
+    ConfigRedis.notify_keyspace_events = flags
+    ConfigRedis.config_sets = []
+    with caplog.at_level(logging.WARNING):
+        ChangeFeed(repository, configure=configure)._enable_notifications()
+    assert [''.join(sorted(value)) for value in ConfigRedis.config_sets] == [''.join(sorted(value))
+                                                                             for value in expected]
+    warned = 'Keyspace notifications are off' in caplog.text
+    assert warned == (not configure and 'A' not in flags)
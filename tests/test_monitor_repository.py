@@ -0,0 +1,42 @@
+import json
+from time import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.monitor.monitor_repository import MonitorRepository
+from DarplexAssistant.repository.redis_repository import RedisRepository
+from DarplexAssistant.utils import Region
+
+
+@pytest.fixture
+def repository() -> MonitorRepository:
+    return MonitorRepository(RedisRepository('fake', 6379, fakeredis.FakeRedis(decode_responses=True).connection_pool))
+
+
+def server_status(name: str, **fields: object) -> str:
+    return json.dumps({'_name': name, '_motd': 'A Minecraft Server', '_ram': 512,
+                       '_startUpDate': int(time()), '_currentTime': int(time() * 1000), **fields})
+
+
+def test_get_server_snapshots_skips_malformed_caches(repository: MonitorRepository) -> None:
+    redis = repository.repository.redis
+    redis.set('serverstatus.minecraft.US.MB-1', server_status('MB-1'))
+    redis.set('serverstatus.minecraft.EU.MB-1', server_status('MB-1', _ram=1024))
+    redis.set('serverstatus.minecraft.US.MB-2', server_status('MB-2', _port='abc'))
+    redis.set('serverstatus.minecraft.US.MB-3', server_status('MB-3', _tps=None))
+    redis.set('serverstatus.minecraft.US.MB-4', json.dumps({'_motd': 'no name'}))
+
+    snapshots = sorted(repository.get_server_snapshots(batch_size=2), key=lambda snapshot: snapshot.region.value)
+    assert [(snapshot.name, snapshot.region, snapshot.ram) for snapshot in snapshots] == [
+        ('MB-1', Region.EU, 1024), ('MB-1', Region.US, 512)]
+    assert repository.get_ram_in_use() == 1536
+
+
+def test_snapshot_of() -> None:
+    key = 'serverstatus.minecraft.US.MB-1'
+    assert MonitorRepository.snapshot_of(key, json.loads(server_status('MB-1'))).group == 'MB'
+    assert MonitorRepository.snapshot_of(key, json.loads(server_status('MB-1', _playerCount='x'))) is None
+    assert MonitorRepository.snapshot_of(key, json.loads(server_status('MB-1', _currentTime=10 ** 30))) is None
+    assert MonitorRepository.snapshot_of(key, {}) is None
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.repository.port_allocator import (PORT_SECTIONS_KEY, PortRangeExhaustedException,
+                                                        PortSectionAllocator, compute_port_range_stats)
+
+
+@pytest.fixture
+def redis() -> 'fakeredis.FakeRedis':
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def add_group(redis, prefix: str, port: int) -> None:
+    """Creates a ServerGroup the way other tools do: without the allocator."""
+    redis.sadd('servergroups', prefix)
+    redis.hset(f'servergroups.{prefix}', mapping={'prefix': prefix, 'portSection': port})
+
+
+def test_gap_search(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=100, high=200, width=10)
+    assert allocator.reserve('A') == 100
+    assert allocator.reserve('B') == 111
+    assert allocator.reserve('C', 150) == 150
+    assert allocator.reserve('D') == 122 # first gap wide enough
+    assert allocator.reserve('E', 155) == 133 # preferred one conflicts with C
+    assert allocator.reserve('A', 190) == 100 # already its own
+    assert allocator.peek() == 161
+    allocator.release('B')
+    assert allocator.peek() == 111
+    assert allocator.reserve('F') == 111
+
+
+def test_exhausted_range(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=100, high=120, width=10)
+    assert allocator.reserve('A') == 100
+    assert allocator.reserve('B') == 111
+    with pytest.raises(PortRangeExhaustedException):
+        allocator.reserve('C')
+    with pytest.raises(PortRangeExhaustedException):
+        allocator.peek()
+    assert redis.zscore(PORT_SECTIONS_KEY, 'C') is None
+
+
+def test_groups_created_without_allocator_are_never_handed_out(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=100, high=200, width=10)
+    assert allocator.reserve('A') == 100
+    add_group(redis, 'B', 111) # after the sorted set exists
+    assert allocator.conflicts(115)
+    assert allocator.reserve('C') == 122
+    add_group(redis, 'D', 140)
+    redis.hset('servergroups.B', 'portSection', 160) # moved by hand
+    assert allocator.stats().allocated == 4
+    assert not allocator.conflicts(111)
+    assert allocator.reserve('E', 111) == 111
+
+
+def test_reserve_keeps_port_section_of_own_hash(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=100, high=200, width=10)
+    add_group(redis, 'A', 150)
+    assert allocator.reserve('A') == 150
+    redis.sadd('servergroups', 'B') # hash written after the set, e.g. by `create_server_group`
+    redis.hset('servergroups.B', 'portSection', 155)
+    assert allocator.reserve('B') == 100 # its own hash conflicts with A
+
+
+def test_concurrent_reserve_never_overlaps(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=25000, high=26000, width=10)
+    prefixes = [f'G{i}' for i in range(60)]
+    with ThreadPoolExecutor(8) as executor:
+        ports = list(executor.map(lambda prefix: allocator.reserve(prefix, 25500), prefixes))
+    assert len(set(ports)) == len(prefixes)
+    ports.sort()
+    assert all(b - a > 10 for a, b in zip(ports, ports[1:]))
+    assert dict(redis.zrange(PORT_SECTIONS_KEY, 0, -1, withscores=True)) == dict(
+        (prefix, float(port)) for prefix, port in zip(prefixes, [allocator.reserve(p) for p in prefixes]))
+
+
+def test_stats_math() -> None:
+    empty = compute_port_range_stats([], low=100, high=200, width=10)
+    assert (empty.allocated, empty.free_ports, empty.gaps, empty.largest_gap) == (0, 101, 1, 101)
+    assert empty.remaining_groups == 10 # 100, 111, ..., 199
+    assert empty.fragmentation == 0.0
+
+    # 150 blocks 140..160 as starting ports
+    stats = compute_port_range_stats([150], low=100, high=200, width=10)
+    assert (stats.free_ports, stats.gaps, stats.largest_gap) == (80, 2, 40)
+    assert stats.remaining_groups == 4 + 4
+    assert stats.fragmentation == 0.5
+
+    full = compute_port_range_stats([100, 111, 122], low=100, high=130, width=10)
+    assert (full.free_ports, full.gaps, full.largest_gap, full.remaining_groups) == (0, 0, 0, 0)
+    assert full.fragmentation == 0.0
+
+
+def test_stats_match_allocator(redis) -> None:
+    allocator = PortSectionAllocator(redis, low=100, high=200, width=10)
+    for _ in range(allocator.stats().remaining_groups):
+        allocator.reserve(f'G{redis.zcard(PORT_SECTIONS_KEY)}')
+    assert allocator.stats().remaining_groups == 0
+    with pytest.raises(PortRangeExhaustedException):
+        allocator.peek()
@@ -0,0 +1,115 @@
+from importlib import import_module
+import json
+from threading import Barrier, Lock, Thread
+from time import time
+
+import pytest
+
+from DarplexAssistant.monitor.ram_ledger import RamLedger
+from DarplexAssistant.server import MinecraftServerSnapshot
+from DarplexAssistant.utils import Region
+
+ram_ledger_module = import_module('DarplexAssistant.monitor.ram_ledger')
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(ram_ledger_module, 'monotonic', clock)
+    return clock
+
+
+def snapshot(name: str, ram: int = 512, online: bool = True) -> MinecraftServerSnapshot:
+    now = time() if online else time() - 86400
+    return MinecraftServerSnapshot.from_server_status_dict(json.loads(json.dumps({
+        '_name': name, '_motd': 'A Minecraft Server', '_ram': ram, '_playerCount': 0, '_maxPlayerCount': 16,
+        '_publicAddress': '127.0.0.1', '_startUpDate': int(now) - 60, '_currentTime': int(now * 1000)})), Region.US)
+
+
+def test_concurrent_reserve_never_exceeds_max_ram() -> None:
+    ledger = RamLedger(2048)
+    threads = 16
+    barrier = Barrier(threads)
+    admitted: list[str] = []
+    peak = [0]
+    admitted_lock = Lock()
+
+    def deploy(thread: int) -> None:
+        barrier.wait()
+        for i in range(50):
+            server_name = f'MB-{thread}-{i}'
+            if ledger.reserve(server_name, 'MB', 100):
+                with admitted_lock:
+                    admitted.append(server_name)
+            committed = ledger.max_ram - ledger.available
+            with admitted_lock:
+                peak[0] = max(peak[0], committed)
+
+    workers = [Thread(target=deploy, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert peak[0] <= 2048
+    assert len(admitted) == 20
+    assert ledger.reserved == 2000 and ledger.available == 48
+    assert ledger.stats().reservations == 20
+
+
+def test_reservations_expire_after_ttl(clock: Clock) -> None:
+    ledger = RamLedger(1024, reservation_ttl=120)
+    assert ledger.reserve('MB-1', 'MB', 512)
+    clock.now += 60
+    assert ledger.reserve('MB-2', 'MB', 512)
+    assert not ledger.reserve('MB-3', 'MB', 512) # full
+    clock.now += 61 # MB-1 never came up
+    assert ledger.reserved == 512
+    assert ledger.group_usage('MB') == (0, 512)
+    assert ledger.reserve('MB-3', 'MB', 512)
+    clock.now += 121
+    assert ledger.available == 1024
+
+
+def test_reserving_again_keeps_the_first_expiry(clock: Clock) -> None:
+    ledger = RamLedger(1024, reservation_ttl=120)
+    assert ledger.reserve('MB-1', 'MB', 512)
+    clock.now += 100
+    assert ledger.reserve('MB-1', 'MB', 512) # already reserved, not extended
+    assert ledger.reserved == 512
+    clock.now += 21
+    assert ledger.reserved == 0
+
+
+def test_mark_online_turns_reservation_into_used_ram(clock: Clock) -> None:
+    ledger = RamLedger(1024, reservation_ttl=120)
+    assert ledger.reserve('MB-1', 'MB', 512)
+    ledger.mark_online('MB-1', 'MB', 600) # reports what it really uses
+    assert (ledger.used, ledger.reserved) == (600, 0)
+    assert ledger.group_usage('MB') == (600, 0)
+    clock.now += 121 # used RAM doesn't expire
+    assert ledger.used == 600
+    assert ledger.reserve('MB-1', 'MB', 512) # online, admitted without reserving
+    assert ledger.reserved == 0
+    ledger.release('MB-1')
+    assert ledger.available == 1024
+
+
+def test_sync_drops_reservations_of_online_servers() -> None:
+    ledger = RamLedger(4096)
+    assert ledger.reserve('MB-1', 'MB', 512)
+    assert ledger.reserve('MB-2', 'MB', 512)
+    ledger.mark_online('SKY-1', 'SKY', 1024) # went down since
+    ledger.sync([snapshot('MB-1', 700), snapshot('CW-1', 256), snapshot('MB-3', 512, online=False)])
+    assert (ledger.used, ledger.reserved) == (956, 512)
+    assert ledger.group_usage('MB') == (700, 512)
+    assert ledger.group_usage('SKY') == (0, 0)
+    assert ledger.stats().servers == 2
+    assert ledger.is_fresh(60)
@@ -0,0 +1,72 @@
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+
+from DarplexAssistant.scripts.reaper import TRASH_DIRECTORY, Reaper
+
+reaper_module = import_module('DarplexAssistant.scripts.reaper')
+
+
+def make_server(path: Path, files: int = 3) -> None:
+    (path / 'world' / 'region').mkdir(parents=True)
+    for i in range(files):
+        (path / 'world' / 'region' / f'r.{i}.mca').write_bytes(b'\0' * 1024)
+    (path / 'server.properties').write_text('server-port=25565')
+
+
+def test_discarded_path_can_be_reused_right_away(tmp_path: Path) -> None:
+    reaper = Reaper(tmp_path / TRASH_DIRECTORY)
+    server_path = tmp_path / 'MB-1'
+    make_server(server_path)
+    reaper.discard(server_path)
+    assert not server_path.exists()
+
+    make_server(server_path) # redeployed under the same name
+    reaper.discard(server_path) # and torn down again before the first one is gone
+    make_server(server_path)
+    assert reaper.wait_idle(5)
+    assert list((tmp_path / TRASH_DIRECTORY).iterdir()) == []
+    assert (server_path / 'server.properties').read_text() == 'server-port=25565'
+    assert len(list((server_path / 'world' / 'region').iterdir())) == 3
+
+
+def test_discard_of_missing_path_does_nothing(tmp_path: Path) -> None:
+    reaper = Reaper(tmp_path / TRASH_DIRECTORY)
+    reaper.discard(tmp_path / 'MB-1')
+    assert not (tmp_path / TRASH_DIRECTORY).exists()
+    assert reaper.wait_idle(0)
+
+
+def test_wait_idle_waits_for_throttled_deletion(tmp_path: Path) -> None:
+    reaper = Reaper(tmp_path / TRASH_DIRECTORY, files_per_second=10)
+    make_server(tmp_path / 'MB-1', files=25)
+    reaper.discard(tmp_path / 'MB-1')
+    assert not reaper.wait_idle(0.5) # 25 files at 10 per second
+    assert reaper.wait_idle(5)
+    assert list((tmp_path / TRASH_DIRECTORY).iterdir()) == []
+
+
+class FakeSettings:
+    def __init__(self, servers_directory: Path) -> None:
+        self.servers_directory = servers_directory
+        self.server_monitor_options = {}
+
+
+class FakeSettingsLoader:
+    def on_reload(self, listener) -> None:
+        pass
+
+
+def test_get_reaper_reclaims_trash_of_previous_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    make_server(tmp_path / TRASH_DIRECTORY / 'MB-1.0123456789ab') # left behind by a crash
+    (tmp_path / TRASH_DIRECTORY / 'stray.tmp').write_text('')
+    monkeypatch.setattr(reaper_module, 'get_settings', lambda: FakeSettings(tmp_path))
+    monkeypatch.setattr(reaper_module, 'get_settings_loader', FakeSettingsLoader)
+    reaper_module.get_reaper.cache_clear()
+    try:
+        reaper = reaper_module.get_reaper() # nothing discarded yet
+        assert reaper.wait_idle(5)
+        assert list((tmp_path / TRASH_DIRECTORY).iterdir()) == []
+    finally:
+        reaper_module.get_reaper.cache_clear()
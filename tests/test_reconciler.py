@@ -0,0 +1,205 @@
+from contextlib import contextmanager
+import json
+from threading import Event
+from time import monotonic, sleep, time
+from typing import Iterator
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.monitor import reconciler
+from DarplexAssistant.monitor.monitor_repository import MonitorRepository
+from DarplexAssistant.monitor.reconciler import (ActionKind, ReconcilePlan, ServerAction, ServerMonitor,
+                                                 plan_reconcile, plan_restarts, plan_scaling)
+from DarplexAssistant.repository.change_feed import ChangeFeed
+from DarplexAssistant.repository.redis_repository import RedisRepository
+from DarplexAssistant.server import MinecraftServerSnapshot, ServerGroup
+from DarplexAssistant.utils import Region
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.02)
+    return True
+
+
+def server_status(name: str, online: bool = True, motd: str = 'A Minecraft Server', ram: int = 512,
+                  players: int = 0, max_players: int = 16) -> dict:
+    now = time() if online else time() - 86400
+    return {'_name': name, '_motd': motd, '_ram': ram, '_playerCount': players, '_maxPlayerCount': max_players,
+            '_publicAddress': '127.0.0.1', '_startUpDate': int(now) - 60, '_currentTime': int(now * 1000)}
+
+
+def snapshot(name: str, **kwargs) -> MinecraftServerSnapshot:
+    return MinecraftServerSnapshot.from_server_status_dict(
+        json.loads(json.dumps(server_status(name, **kwargs))), Region.US)
+
+
+def arcade_motd(status: str, joinable: str = 'OPEN') -> str:
+    return json.dumps({'_game': 'Micro Battle', '_mode': '', '_status': status, '_joinable': joinable})
+
+
+def group_dict(prefix: str, total: int, joinable: int = 0, ram: int = 512, region: str = 'US',
+               port_section: int = 25000) -> dict[str, str]:
+    return {'prefix': prefix, 'name': prefix, 'ram': str(ram), 'totalServers': str(total),
+            'joinableServers': str(joinable), 'portSection': str(port_section), 'region': region}
+
+
+def group(prefix: str, total: int, **kwargs) -> ServerGroup:
+    return ServerGroup.from_server_group_dict(group_dict(prefix, total, **kwargs))
+
+
+def names(actions: list[ServerAction]) -> list[str]:
+    return [action.server_name for action in actions]
+
+
+def test_plan_scaling_up_and_down() -> None:
+    starts, stops = plan_scaling(group('MB', 3), [snapshot('MB-2')])
+    assert names(starts) == ['MB-1', 'MB-3'] and stops == []
+    starts, stops = plan_scaling(group('MB', 1), [snapshot(f'MB-{num}') for num in (1, 2, 5)])
+    assert starts == [] and names(stops) == ['MB-5', 'MB-2'] # highest numbers first
+    assert all(action.kind == ActionKind.STOP for action in stops)
+
+
+def test_plan_scaling_keeps_joinable_servers() -> None:
+    in_progress = [snapshot(f'MB-{num}', motd=arcade_motd('IN_PROGRESS')) for num in (1, 2)]
+    # 2 running but none joinable: 1 more so one can be joined
+    starts, stops = plan_scaling(group('MB', 2, joinable=1), in_progress)
+    assert names(starts) == ['MB-3'] and stops == []
+    full = snapshot('MB-3', players=16)
+    assert names(plan_scaling(group('MB', 2, joinable=1), [*in_progress, full])[0]) == ['MB-4']
+    waiting = snapshot('MB-3', motd=arcade_motd('WAITING'))
+    assert plan_scaling(group('MB', 2, joinable=1), [*in_progress, waiting]) == ([], [])
+
+
+def test_plan_restarts() -> None:
+    restarts = plan_restarts([snapshot('MB-1'),
+                              snapshot('MB-2', online=False),
+                              snapshot('MB-3', motd='Restarting'),
+                              snapshot('MB-4', motd='Finished'),
+                              snapshot('MB', online=False)]) # not numbered
+    assert [(action.server_name, action.reason) for action in restarts] == [
+        ('MB-2', 'Dead'), ('MB-3', 'Restart'), ('MB-4', 'Restart')]
+
+
+def test_plan_reconcile() -> None:
+    groups = [group('MB', 2), group('SKY', 1), group('CW', 3, ram=1024)]
+    snapshots = [snapshot('MB-1'), snapshot('MB-2', online=False), snapshot('MB-3'),
+                 snapshot('OLD-1'), snapshot('SKY-1'), snapshot('SKY-2')]
+    plan = plan_reconcile(groups, snapshots)
+    assert sorted(names(plan.stops)) == ['MB-3', 'OLD-1', 'SKY-2']
+    assert [action.reason for action in plan.stops if action.group == 'OLD'] == ['No ServerGroup']
+    assert names(plan.restarts) == ['MB-2']
+    assert names(plan.starts) == ['CW-1', 'CW-2', 'CW-3']
+    assert plan.actions[:len(plan.stops)] == plan.stops
+    assert len(plan) == 7
+
+
+def test_plan_reconcile_excluded_in_flight_and_ram() -> None:
+    groups = [group('MB', 3), group('SKY', 2)]
+    snapshots = [snapshot('MB-1', online=False), snapshot('SKY-5')]
+    plan = plan_reconcile(groups, snapshots, excluded=['SKY'], in_flight=['MB-1', 'MB-2'], ram_available=600)
+    assert plan.stops == [] and plan.restarts == [] # SKY is excluded, MB-1 is in flight
+    assert names(plan.starts) == ['MB-3'] # MB-2 in flight; 600 MB only fit one more
+    assert names(plan_reconcile(groups, snapshots, excluded=['SKY'], ram_available=0).starts) == []
+    assert len(plan_reconcile(groups, [], ram_available=512 * 4).starts) == 4
+
+
+@pytest.fixture
+def repository() -> RedisRepository:
+    return RedisRepository('fake', 6379, fakeredis.FakeRedis(decode_responses=True).connection_pool)
+
+
+def test_stop_honours_timeout_and_stops_own_feed(repository: RedisRepository, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = Event()
+    monitor = ServerMonitor(tick_interval=60, feed=ChangeFeed(repository, configure=False))
+    monkeypatch.setattr(monitor, 'tick', lambda: ReconcilePlan())
+    monkeypatch.setattr(monitor, 'execute', lambda action, group: release.wait(5))
+    monitor.start()
+    assert wait_until(lambda: monitor.feed.synced.is_set())
+    monitor._dispatch(ServerAction(ActionKind.STOP, 'MB', 1), None)
+    started = monotonic()
+    monitor.stop(timeout=0.2)
+    assert monotonic() - started < 1 # the action is still running
+    assert not monitor.running
+    assert wait_until(lambda: not monitor.feed.running)
+    release.set()
+
+
+def test_stop_leaves_feed_started_by_others(repository: RedisRepository, monkeypatch: pytest.MonkeyPatch) -> None:
+    feed = ChangeFeed(repository, configure=False)
+    feed.start()
+    try:
+        monitor = ServerMonitor(tick_interval=60, feed=feed)
+        monkeypatch.setattr(monitor, 'tick', lambda: ReconcilePlan())
+        monitor.start()
+        monitor.stop(timeout=1)
+        assert feed.running
+    finally:
+        feed.stop()
+
+
+def test_restart_after_slow_stop_never_runs_two_loops(monkeypatch: pytest.MonkeyPatch) -> None:
+    release = Event()
+    ticks: list[float] = []
+    monitor = ServerMonitor(tick_interval=0.01)
+    def tick() -> ReconcilePlan:
+        ticks.append(monotonic())
+        release.wait(5)
+        return ReconcilePlan()
+    monkeypatch.setattr(monitor, 'tick', tick)
+    monitor.start()
+    assert wait_until(lambda: len(ticks) == 1)
+    monitor.stop(timeout=0.05)
+    assert monitor.running # still in its tick, so it is kept
+    release.set()
+    monitor.start() # joins the stopping loop first
+    assert wait_until(lambda: len(ticks) > 1)
+    monitor.stop(timeout=1)
+    assert not monitor.running
+
+
+def seed(repository: RedisRepository, groups: int, servers_per_group: int) -> None:
+    """`groups` ServerGroups with `servers_per_group` online servers each (and 1 too many)."""
+    pipeline = repository.redis.pipeline(transaction=False)
+    for num in range(groups):
+        prefix = f'G{num}'
+        pipeline.sadd('servergroups', prefix)
+        pipeline.hset(f'servergroups.{prefix}', mapping=group_dict(prefix, servers_per_group - 1,
+                                                                  port_section=25000 + num * 11))
+        for server_num in range(1, servers_per_group + 1):
+            name = f'{prefix}-{server_num}'
+            pipeline.set(f'serverstatus.minecraft.US.{name}', json.dumps(server_status(name)))
+    pipeline.execute()
+
+
+def test_tick_at_scale_stays_within_budget(repository: RedisRepository, monkeypatch: pytest.MonkeyPatch) -> None:
+    seed(repository, 50, 12)
+    @contextmanager
+    def get_monitor_repo() -> Iterator[MonitorRepository]:
+        yield MonitorRepository(repository)
+    monkeypatch.setattr(reconciler, 'get_monitor_repo', get_monitor_repo)
+    monitor = ServerMonitor(tick_budget=0.25, region=Region.US)
+    monitor.tick() # builds the ServerStatus index
+    plan = monitor.tick()
+    assert sorted(names(plan.stops)) == sorted(f'G{num}-12' for num in range(50))
+    assert plan.starts == [] and plan.restarts == []
+    assert monitor.last_tick_seconds < monitor.tick_budget
+
+
+def test_tick_from_change_feed_at_scale(repository: RedisRepository) -> None:
+    seed(repository, 50, 12)
+    feed = ChangeFeed(repository, configure=False)
+    feed.start()
+    try:
+        assert wait_until(feed.synced.is_set)
+        monitor = ServerMonitor(tick_budget=0.25, region=Region.US, feed=feed)
+        plan = monitor.tick()
+        assert len(plan.stops) == 50 and len(feed.servers) == 600
+        assert monitor.last_tick_seconds < monitor.tick_budget
+    finally:
+        feed.stop()
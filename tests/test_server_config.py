@@ -0,0 +1,96 @@
+from copy import deepcopy
+from importlib import import_module
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from DarplexAssistant.scripts.server_config import (RENDER_MANIFEST_FILE, read_render_manifest, render_server_files,
+                                                    write_rendered_files)
+from DarplexAssistant.utils import Settings
+from DarplexAssistant.utils.redis_utils import DEFAULT_TOML_CONF
+from DarplexAssistant.utils.settings import validate_settings
+
+server_config_module = import_module('DarplexAssistant.scripts.server_config')
+
+
+def render(is_us: bool = True, port: int = 25565) -> dict[str, str]:
+    settings = Settings(validate_settings(deepcopy(DEFAULT_TOML_CONF)))
+    return render_server_files(settings, port, 'plugins/Core', 'MB', 'MB-1', is_us)
+
+
+def test_unchanged_files_are_skipped(tmp_path: Path) -> None:
+    files = render()
+    first = write_rendered_files(tmp_path, files)
+    assert sorted(first.written) == sorted(files) and first.unchanged == [] and first.removed == []
+    assert (tmp_path / 'plugins/Core/config.yml').read_text() == files['plugins/Core/config.yml']
+    stats = dict((name, (tmp_path / name).stat().st_mtime_ns) for name in files)
+    manifest = (tmp_path / RENDER_MANIFEST_FILE).stat().st_mtime_ns
+
+    second = write_rendered_files(tmp_path, files)
+    assert second.written == [] and sorted(second.unchanged) == sorted(files)
+    assert dict((name, (tmp_path / name).stat().st_mtime_ns) for name in files) == stats
+    assert (tmp_path / RENDER_MANIFEST_FILE).stat().st_mtime_ns == manifest # nothing to update
+
+    third = write_rendered_files(tmp_path, render(port=25570))
+    assert third.written == ['server.properties']
+    assert 'server-port=25570' in (tmp_path / 'server.properties').read_text()
+
+
+def test_stale_manifest_falls_back_to_content(tmp_path: Path) -> None:
+    files = render()
+    write_rendered_files(tmp_path, files)
+    edited = tmp_path / 'server.properties'
+    edited.write_text('edited by hand')
+    touched = tmp_path / 'bukkit.yml'
+    os.utime(touched, ns=(0, 0)) # same content, but no longer what the manifest recorded
+
+    result = write_rendered_files(tmp_path, files)
+    assert result.written == ['server.properties']
+    assert 'bukkit.yml' in result.unchanged
+    assert edited.read_text() == files['server.properties']
+    manifest = read_render_manifest(tmp_path)
+    assert manifest['bukkit.yml']['mtime_ns'] == 0
+    assert manifest['server.properties']['size'] == edited.stat().st_size
+
+
+def test_missing_or_corrupt_manifest_compares_files_on_disk(tmp_path: Path) -> None:
+    files = render()
+    write_rendered_files(tmp_path, files)
+    (tmp_path / RENDER_MANIFEST_FILE).write_text('{not json')
+    assert read_render_manifest(tmp_path) == {}
+    result = write_rendered_files(tmp_path, files)
+    assert result.written == [] and sorted(result.unchanged) == sorted(files)
+    assert sorted(read_render_manifest(tmp_path)) == sorted(files)
+
+
+def test_files_not_rendered_anymore_are_removed(tmp_path: Path) -> None:
+    eu = write_rendered_files(tmp_path, render(is_us=False))
+    assert 'eu.dat' in eu.written and (tmp_path / 'eu.dat').exists()
+    us = write_rendered_files(tmp_path, render(is_us=True))
+    assert us.removed == ['eu.dat'] and us.written == ['plugins/Core/config.yml'] # `us: true`
+    assert not (tmp_path / 'eu.dat').exists()
+    assert 'eu.dat' not in json.loads((tmp_path / RENDER_MANIFEST_FILE).read_text())
+    assert write_rendered_files(tmp_path, render(is_us=True)).removed == []
+
+
+def test_write_is_atomic(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    files = render()
+    write_rendered_files(tmp_path, files)
+    path = tmp_path / 'server.properties'
+    inode = path.stat().st_ino
+
+    def fail(*args) -> None:
+        raise OSError('disk full')
+    monkeypatch.setattr(server_config_module.os, 'replace', fail)
+    with pytest.raises(OSError):
+        write_rendered_files(tmp_path, render(port=25570))
+    assert path.read_text() == files['server.properties'] # old file left whole
+    assert list(tmp_path.glob('.*.tmp')) == []
+    monkeypatch.undo()
+
+    write_rendered_files(tmp_path, render(port=25570))
+    assert path.stat().st_ino != inode # replaced by rename, not rewritten in place
+    assert 'server-port=25570' in path.read_text()
+    assert list(tmp_path.glob('.*.tmp')) == []
@@ -0,0 +1,104 @@
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from DarplexAssistant.repository.redis_repository import RedisRepository
+from DarplexAssistant.repository.server_status_index import BUILT_KEY, EXPECTED_KEY, ServerStatusIndex
+from DarplexAssistant.utils import Region
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """Counts SCAN calls, i.e. full index rebuilds."""
+    scans = 0
+
+    def scan(self, *args, **kwargs):
+        type(self).scans += 1
+        return super().scan(*args, **kwargs)
+
+
+@pytest.fixture
+def redis() -> CountingRedis:
+    CountingRedis.scans = 0
+    return CountingRedis(decode_responses=True)
+
+
+@pytest.fixture
+def repository(redis: CountingRedis) -> RedisRepository:
+    repository = RedisRepository('fake', 6379)
+    repository.redis = redis
+    repository.server_status_index = ServerStatusIndex(redis, rebuild_interval=300)
+    return repository
+
+
+def key(name: str, region: Region = Region.US) -> str:
+    return ServerStatusIndex.server_status_key(name, region)
+
+
+def loaded(repository: RedisRepository, **kwargs) -> list[str]:
+    return sorted(key for key, _ in repository.load_server_statuses(**kwargs))
+
+
+def test_index_keys_of() -> None:
+    assert ServerStatusIndex.index_keys_of('serverstatus.minecraft.EU.MB-2') == (
+        'darplexassistant.index.serverstatus',
+        'darplexassistant.index.serverstatus.EU',
+        'darplexassistant.index.serverstatus.EU.MB')
+    assert ServerStatusIndex.index_keys_of('serverstatus.minecraft.MB-2') == ()
+    assert len(ServerStatusIndex.member_index_keys(Region.ALL, 'MB')) == 2 # US and EU
+
+
+def test_reads_do_not_rescan(repository: RedisRepository, redis: CountingRedis) -> None:
+    redis.set(key('MB-1'), '{"_name": "MB-1"}')
+    assert loaded(repository) == [key('MB-1')]
+    scans = redis.scans
+    for _ in range(5):
+        assert loaded(repository) == [key('MB-1')]
+    assert redis.scans == scans
+    assert 0 < redis.ttl(BUILT_KEY) <= 300
+
+
+def test_add_and_remove_keep_index_current(repository: RedisRepository, redis: CountingRedis) -> None:
+    index = repository.server_status_index
+    assert index.members() == set()
+    scans = redis.scans
+    redis.set(key('MB-1'), '{"_name": "MB-1"}')
+    assert index.members() == set() # nobody reported it
+    index.add(key('MB-1'))
+    index.add('serverstatus.minecraft.MB-1') # not a ServerStatus key
+    assert index.members() == {key('MB-1')}
+    assert index.members(Region.US, 'MB') == {key('MB-1')}
+    index.remove([key('MB-1')])
+    assert index.members() == set()
+    assert redis.scans == scans
+
+
+def test_invalidate_rebuilds_on_next_read(repository: RedisRepository, redis: CountingRedis) -> None:
+    index = repository.server_status_index
+    assert index.members() == set()
+    redis.set(key('MB-1'), '{"_name": "MB-1"}')
+    redis.set(key('MB-1', Region.EU), '{"_name": "MB-1"}')
+    index.invalidate()
+    assert index.members(Region.ALL, 'MB') == {key('MB-1'), key('MB-1', Region.EU)}
+    assert index.members(Region.EU) == {key('MB-1', Region.EU)}
+
+
+def test_expected_keys_survive_reads_until_they_boot(repository: RedisRepository, redis: CountingRedis) -> None:
+    repository.expect_minecraft_servers(['MB-1', 'MB-2'], Region.US)
+    redis.set(key('MB-2'), '{"_name": "MB-2"}')
+    assert loaded(repository) == [key('MB-2')]
+    assert repository.server_status_index.members() == {key('MB-1'), key('MB-2')} # MB-1 is still booting
+    repository.server_status_index.rebuild()
+    assert repository.server_status_index.members() == {key('MB-1'), key('MB-2')}
+    redis.set(key('MB-1'), '{"_name": "MB-1"}')
+    assert loaded(repository) == [key('MB-1'), key('MB-2')]
+
+
+def test_missing_keys_are_pruned_once_no_longer_expected(repository: RedisRepository, redis: CountingRedis) -> None:
+    redis.set(key('MB-1'), '{"_name": "MB-1"}')
+    repository.server_status_index.expect([key('MB-2')], within=-1) # deploy window is over
+    assert loaded(repository) == [key('MB-1')]
+    assert repository.server_status_index.members() == {key('MB-1')}
+    assert redis.zcard(EXPECTED_KEY) == 0
+    redis.delete(key('MB-1'))
+    assert loaded(repository) == []
+    assert repository.server_status_index.members() == set()
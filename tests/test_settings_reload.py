@@ -0,0 +1,97 @@
+from copy import deepcopy
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+import toml
+
+from DarplexAssistant.utils import SettingsLoader
+from DarplexAssistant.utils.redis_utils import DEFAULT_TOML_CONF
+
+ACCESSORS = {
+    'DarplexAssistant.server.server_cache': ('get_server_status_cache', 'get_server_group_cache'),
+    'DarplexAssistant.scripts.reaper': ('get_reaper',),
+    'DarplexAssistant.scripts.standby_pool': ('get_standby_pool',),
+    'DarplexAssistant.monitor.placement': ('get_placement_scheduler',),
+    'DarplexAssistant.monitor.ram_ledger': ('get_ram_ledger',),
+}
+
+
+class Config:
+    """`config.toml` in `tmp_path` which every process-wide accessor reads through `loader`."""
+
+    def __init__(self, tmp_path: Path) -> None:
+        self.path = tmp_path / 'config.toml'
+        self.data = deepcopy(DEFAULT_TOML_CONF)
+        self.data['server_monitor_options']['servers_directory'] = str(tmp_path / 'servers')
+        self.write()
+        self.loader = SettingsLoader(self.path, check_interval=0)
+
+    @property
+    def options(self) -> dict:
+        return self.data['server_monitor_options']
+
+    def write(self) -> None:
+        self.path.write_text(toml.dumps(self.data))
+
+    def reload(self) -> None:
+        self.write()
+        self.loader.reload()
+
+
+@pytest.fixture
+def config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Config:
+    config = Config(tmp_path)
+    for name, accessors in ACCESSORS.items():
+        module = import_module(name)
+        monkeypatch.setattr(module, 'get_settings', config.loader.get)
+        monkeypatch.setattr(module, 'get_settings_loader', lambda: config.loader)
+        for accessor in accessors:
+            getattr(module, accessor).cache_clear()
+    yield config
+    for name, accessors in ACCESSORS.items():
+        for accessor in accessors:
+            getattr(import_module(name), accessor).cache_clear()
+
+
+def test_caches_follow_reload(config: Config) -> None:
+    server_cache = import_module('DarplexAssistant.server.server_cache')
+    ttl_cache = server_cache.get_server_group_cache()
+    for prefix in ('MB', 'SKY', 'CW'):
+        ttl_cache.set(prefix, {'prefix': prefix})
+    config.data['cache'].update(max_size=2, ttl=1.5)
+    config.reload()
+    assert server_cache.get_cache_options() == (2, 1.5)
+    assert (ttl_cache.max_size, ttl_cache.ttl) == (2, 1.5)
+    assert len(ttl_cache) == 2 and ttl_cache.get('MB') is None # least recently used went first
+    assert server_cache.get_server_status_cache().max_size == 2
+
+
+def test_reaper_and_ledger_follow_reload(config: Config) -> None:
+    reaper = import_module('DarplexAssistant.scripts.reaper').get_reaper()
+    ledger = import_module('DarplexAssistant.monitor.ram_ledger').get_ram_ledger()
+    config.options.update(teardown_bytes_per_second=1024, teardown_files_per_second=10, ram=2048)
+    config.reload()
+    assert (reaper.bytes_per_second, reaper.files_per_second) == (1024, 10)
+    assert ledger.max_ram == 2048
+
+
+def test_standby_pool_and_scheduler_follow_reload(config: Config) -> None:
+    standby_pool = import_module('DarplexAssistant.scripts.standby_pool')
+    placement = import_module('DarplexAssistant.monitor.placement')
+    config.options.update(standby_groups=['MB'], nodes=[{'name': 'a', 'ram': 4096}])
+    config.reload()
+    pool = standby_pool.get_standby_pool()
+    scheduler = placement.get_placement_scheduler()
+    assert pool.groups == {'MB'} and [node.name for node in scheduler.nodes] == ['a']
+
+    config.options.update(standby_groups=['SKY'], standby_max=5, max_group_share=0.25,
+                          nodes=[{'name': 'a', 'ram': 4096}, {'name': 'b', 'ram': 8192, 'cpu': 8}])
+    config.reload()
+    assert pool.groups == {'SKY'} and pool.max_size == 5
+    assert pool.target_size('MB') == 0
+    assert [node.name for node in scheduler.nodes] == ['a', 'b'] and scheduler.max_group_share == 0.25
+
+    config.options.update(nodes=[])
+    config.reload()
+    assert len(scheduler.nodes) == 2 # turning placement off needs a restart
@@ -0,0 +1,152 @@
+from importlib import import_module
+import os
+from pathlib import Path
+import signal
+import sys
+from time import monotonic, sleep
+
+import pytest
+
+from DarplexAssistant.scripts.supervisor import (PIDFILE_NAME, ProcessSupervisor, ServerStillRunningException,
+                                                 read_pidfile)
+
+pytestmark = pytest.mark.skipif(not Path('/proc').is_dir(), reason='needs /proc and process groups')
+
+# Stands in for the JVM: a console which exits on `stop`, and dies on SIGTERM like a JVM does.
+DUMMY_SERVER = """
+import signal, sys
+if 'ignore-term' in sys.argv:
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+print('Done', flush=True)
+for line in sys.stdin:
+    if line.strip() == 'stop':
+        print('Stopping server', flush=True)
+        sys.exit(0)
+"""
+
+stop_server_module = import_module('DarplexAssistant.scripts.stop_server')
+
+
+def dummy_command(*args: str) -> list[str]:
+    return [sys.executable, '-c', DUMMY_SERVER, *args]
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.02)
+    return True
+
+
+def launch_orphan(server_path: Path, *args: str) -> int:
+    """Launches a dummy server and forgets about it, like a monitor which was restarted."""
+    server_path.mkdir(parents=True, exist_ok=True)
+    process = ProcessSupervisor(server_path.parent / 'logs').launch(server_path.name, dummy_command(*args), server_path)
+    assert wait_until(lambda: (server_path.parent / 'logs' / f'{server_path.name}.log').read_text().startswith('Done'))
+    return process.pid
+
+
+def test_launch_writes_pidfile_and_stop_removes_it(tmp_path: Path) -> None:
+    supervisor = ProcessSupervisor(tmp_path / 'logs')
+    process = supervisor.launch('MB-1', dummy_command(), tmp_path)
+    assert (tmp_path / PIDFILE_NAME).read_text().strip() == str(process.pid)
+    assert read_pidfile(tmp_path) == process.pid
+    assert supervisor.stop('MB-1') == 0
+    assert wait_until(lambda: not (tmp_path / PIDFILE_NAME).exists())
+    assert read_pidfile(tmp_path) is None
+    assert 'Stopping server' in (tmp_path / 'logs' / 'MB-1.log').read_text()
+
+
+def test_stop_finds_process_of_previous_supervisor(tmp_path: Path) -> None:
+    server_path = tmp_path / 'MB-1'
+    pid = launch_orphan(server_path)
+    supervisor = ProcessSupervisor()
+    assert supervisor.get('MB-1') is None
+    assert supervisor.stop('MB-1') is None # nothing known by name
+    assert supervisor.stop('MB-1', server_path=server_path) == -signal.SIGTERM
+    assert read_pidfile(server_path) is None
+    assert not (server_path / PIDFILE_NAME).exists()
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_stop_kills_process_ignoring_sigterm(tmp_path: Path) -> None:
+    server_path = tmp_path / 'MB-1'
+    launch_orphan(server_path, 'ignore-term')
+    assert ProcessSupervisor().stop('MB-1', timeout=0.2, server_path=server_path) == -signal.SIGKILL
+    assert read_pidfile(server_path) is None
+
+
+def test_launch_stops_process_left_in_directory(tmp_path: Path) -> None:
+    server_path = tmp_path / 'MB-1'
+    old_pid = launch_orphan(server_path)
+    supervisor = ProcessSupervisor()
+    process = supervisor.launch('MB-1', dummy_command(), server_path)
+    try:
+        assert process.pid != old_pid
+        assert read_pidfile(server_path) == process.pid
+        assert wait_until(lambda: not Path(f'/proc/{old_pid}').exists())
+    finally:
+        supervisor.stop_all()
+
+
+def test_read_pidfile_ignores_dead_and_invalid_pids(tmp_path: Path) -> None:
+    assert read_pidfile(tmp_path) is None
+    (tmp_path / PIDFILE_NAME).write_text('not a pid\n')
+    assert read_pidfile(tmp_path) is None
+    (tmp_path / PIDFILE_NAME).write_text(f'{os.getpid()}\n') # alive, but not a server's process group
+    assert read_pidfile(tmp_path) is None
+
+
+class FakeSettings:
+    def __init__(self, servers_directory: Path) -> None:
+        self.servers_directory = servers_directory
+
+
+class FakeReaper:
+    def __init__(self) -> None:
+        self.discarded: list[Path] = []
+
+    def discard(self, path: Path) -> None:
+        self.discarded.append(path)
+
+
+@pytest.fixture
+def reaper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeReaper:
+    reaper = FakeReaper()
+    monkeypatch.setattr(stop_server_module, 'get_settings', lambda: FakeSettings(tmp_path))
+    monkeypatch.setattr(stop_server_module, 'get_reaper', lambda: reaper)
+    monkeypatch.setattr(stop_server_module, 'get_supervisor', ProcessSupervisor) # a fresh one knows no process
+    return reaper
+
+
+def test_stop_server_after_restart_stops_then_discards(tmp_path: Path, reaper: FakeReaper) -> None:
+    pid = launch_orphan(tmp_path / 'MB-1')
+    stop_server_module.stop_server('MB-1')
+    assert wait_until(lambda: not Path(f'/proc/{pid}').exists())
+    assert reaper.discarded == [tmp_path / 'MB-1']
+
+
+def test_stop_server_keeps_directory_of_live_process(tmp_path: Path, reaper: FakeReaper,
+                                                     monkeypatch: pytest.MonkeyPatch) -> None:
+    server_path = tmp_path / 'MB-1'
+    launch_orphan(server_path)
+    monkeypatch.setattr(ProcessSupervisor, 'stop', lambda *args, **kwargs: None) # e.g. not allowed to signal it
+    try:
+        with pytest.raises(ServerStillRunningException):
+            stop_server_module.stop_server('MB-1')
+        assert reaper.discarded == []
+        assert server_path.is_dir()
+    finally:
+        monkeypatch.undo()
+        ProcessSupervisor().stop('MB-1', server_path=server_path)
+
+
+def test_stop_server_keeps_directory_when_restarting(tmp_path: Path, reaper: FakeReaper) -> None:
+    pid = launch_orphan(tmp_path / 'MB-1')
+    stop_server_module.stop_server('MB-1', keep_directory=True)
+    assert wait_until(lambda: not Path(f'/proc/{pid}').exists())
+    assert reaper.discarded == []
+    assert (tmp_path / 'MB-1').is_dir()
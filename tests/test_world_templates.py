@@ -0,0 +1,69 @@
+from importlib import import_module
+import os
+from pathlib import Path
+from zipfile import ZipFile
+
+import pytest
+
+from DarplexAssistant.scripts.reaper import Reaper
+from DarplexAssistant.scripts.world_templates import WorldTemplateCache
+from DarplexAssistant.utils import LinkMode
+
+world_templates = import_module('DarplexAssistant.scripts.world_templates')
+
+
+def write_zip(path: Path, level: str) -> Path:
+    with ZipFile(path, 'w') as zip_file:
+        zip_file.writestr('world/level.dat', level)
+    return path
+
+
+def change_zip(path: Path, level: str) -> None:
+    stat = path.stat()
+    write_zip(path, level)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def reaper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Reaper:
+    reaper = Reaper(tmp_path / 'trash')
+    monkeypatch.setattr(world_templates, 'get_reaper', lambda: reaper)
+    return reaper
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> WorldTemplateCache:
+    return WorldTemplateCache(tmp_path / 'templates', LinkMode.COPY)
+
+
+def templates(cache: WorldTemplateCache) -> list[str]:
+    return sorted(path.name for path in cache.directory.iterdir() if path.is_dir())
+
+
+def test_changed_zip_discards_old_template(tmp_path: Path, cache: WorldTemplateCache, reaper: Reaper) -> None:
+    zip_path = write_zip(tmp_path / 'lobby.zip', 'v1')
+    cache.materialize(zip_path, tmp_path / 'MB-1')
+    old = cache.digest(zip_path)
+    change_zip(zip_path, 'v2')
+    cache.materialize(zip_path, tmp_path / 'MB-2')
+    assert (tmp_path / 'MB-2' / 'world' / 'level.dat').read_text() == 'v2'
+    assert reaper.wait_idle(5)
+    assert templates(cache) == [cache.digest(zip_path)] and old not in templates(cache)
+    assert cache.stats().evictions == 1
+
+
+def test_template_in_use_is_discarded_after_materialize(tmp_path: Path, cache: WorldTemplateCache, reaper: Reaper,
+                                                        monkeypatch: pytest.MonkeyPatch) -> None:
+    zip_path = write_zip(tmp_path / 'lobby.zip', 'v1')
+    old = cache.digest(zip_path)
+    clone_tree = world_templates.clone_tree
+    def clone_while_zip_changes(source: Path, destination: Path, mode: LinkMode) -> dict[LinkMode, int]:
+        change_zip(zip_path, 'v2')
+        cache.digest(zip_path) # e.g. another deploy: prunes the template being copied
+        assert source.is_dir()
+        return clone_tree(source, destination, mode)
+    monkeypatch.setattr(world_templates, 'clone_tree', clone_while_zip_changes)
+    cache.materialize(zip_path, tmp_path / 'MB-1')
+    assert (tmp_path / 'MB-1' / 'world' / 'level.dat').read_text() == 'v1'
+    assert reaper.wait_idle(5)
+    assert old not in templates(cache)